@@ -1,25 +1,177 @@
-from fastapi import APIRouter, UploadFile, File
-import shutil
-import os
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
 from app.automation.application.automation_service import AutomationService
+from app.automation.application.transcription_jobs import TranscriptionJobManager, QueueFullError, FINISHED, COMPLETED
+from app.automation.infrastructure.transcription_cache import get_transcription_cache
 
 router = APIRouter(prefix="/automation", tags=["Automation"])
-service = AutomationService()
+
+# Instancias globales (lazy loading): ni el servicio, ni los procesos, ni Whisper se cargan al importar las rutas
+_service = None
+_transcriptions = None
+
+def get_automation_service():
+    global _service
+    if _service is None:
+        _service = AutomationService()
+    return _service
+
+def get_transcription_jobs():
+    global _transcriptions
+    if _transcriptions is None:
+        _transcriptions = TranscriptionJobManager(
+            workers=settings.WHISPER_WORKERS,
+            max_queue=settings.WHISPER_QUEUE_MAX,
+            cache=get_transcription_cache(),
+            preload=settings.WHISPER_PRELOAD,
+        )
+    return _transcriptions
+
+def _validar_modelo(model: Optional[str]) -> str:
+    service = get_automation_service()
+    try:
+        return service.engine.residency.validar(model or service.engine.model_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _encolar(file: UploadFile, model: str, **opciones) -> dict:
+    """Encola los bytes del audio tal cual (429 si la cola está llena); se decodifican en el trabajador."""
+    audio = await file.read()
+    if not audio:
+        raise HTTPException(status_code=400, detail="El archivo de audio está vacío")
+    try:
+        # En un hilo: calcular el hash de un audio grande (caché) no debe frenar el event loop
+        return await run_in_threadpool(get_transcription_jobs().submit, audio, model, filename=file.filename, **opciones)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
 
 @router.post("/voice-to-text")
-async def voice_to_text(file: UploadFile = File(...)):
-    # Guardar audio temporal
-    temp_path = f"temp_{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+async def voice_to_text(
+    file: UploadFile = File(...),
+    model: Optional[str] = Query(None, description="Tamaño del modelo Whisper (solo los de WHISPER_MODELS)")
+):
+    """
+    Transcribe el audio y espera el resultado.
+    Pasa por la misma cola que /transcriptions (mismos procesos, misma contrapresión),
+    pero la espera es asíncrona: el event loop sigue atendiendo otras rutas.
+    """
+    model = _validar_modelo(model)
+    job = await _encolar(file, model)
+    future = get_transcription_jobs().future(job["id"])
+    if future is not None:
+        espera = asyncio.wrap_future(future)
+        await asyncio.wait([espera])  # no lanza: el estado final se lee del job
+        if not espera.cancelled():
+            espera.exception()  # marcar el error como leído (ya quedó registrado en el job)
+
+    job = get_transcription_jobs().get(job["id"])
+    if job["status"] != COMPLETED:
+        raise HTTPException(status_code=500, detail=job["error"] or f"Transcripción {job['status']}")
+    return {"transcription": job["result"]["text"], "model": model, "cached": job["result"].get("cached", False)}
+
+@router.post("/transcriptions", status_code=202)
+async def submit_transcription(
+    file: UploadFile = File(...),
+    model: Optional[str] = Query(None, description="Tamaño del modelo Whisper (solo los de WHISPER_MODELS)")
+):
+    """
+    Encola una transcripción y responde al instante con el id del job.
+    Si ya hay demasiadas pendientes responde 429 (reintentar más tarde).
+    """
+    job = await _encolar(file, _validar_modelo(model))
+    return {
+        **job,
+        "status_url": f"{router.prefix}/transcriptions/{job['id']}",
+        "result_url": f"{router.prefix}/transcriptions/{job['id']}/result",
+    }
 
-    # Transcribir con Whisper
-    text = service.voice_to_text(temp_path)
+@router.post("/transcriptions/stream")
+async def stream_transcription(
+    file: UploadFile = File(...),
+    model: Optional[str] = Query(None, description="Tamaño del modelo Whisper (solo los de WHISPER_MODELS)"),
+    window_s: Optional[float] = Query(None, gt=5, le=120, description="Duración aproximada de cada ventana (segundos)")
+):
+    """
+    Transcripción por ventanas para audios largos: responde con Server-Sent Events.
+    Primero `job` (id del job), luego un `segment` por cada fragmento transcrito
+    (inicio, fin, texto) y `status` cuando cambia el estado. El primer texto llega
+    tras la primera ventana, no al final del audio.
+    """
+    job = await _encolar(file, _validar_modelo(model), stream=True,
+                         window_s=window_s or settings.WHISPER_STREAM_WINDOW_S)
+    return StreamingResponse(_eventos_transcripcion(job["id"]), media_type="text/event-stream")
 
-    # Eliminar temporal
-    os.remove(temp_path)
+@router.get("/transcriptions/{job_id}/events")
+def transcription_events(job_id: str):
+    """SSE de una transcripción ya encolada (ej. para reconectarse): reenvía todos sus segmentos."""
+    if get_transcription_jobs().get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Transcripción no encontrada")
+    return StreamingResponse(_eventos_transcripcion(job_id), media_type="text/event-stream")
 
-    return {"transcription": text}
+async def _eventos_transcripcion(job_id: str):
+    jobs = get_transcription_jobs()
+    yield f"event: job\ndata: {json.dumps({'id': job_id})}\n\n"
+    enviados, last_status = 0, None
+    while True:
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        # Segmentos nuevos desde el último envío
+        for segmento in job["segments"][enviados:]:
+            yield f"event: segment\ndata: {json.dumps(segmento, ensure_ascii=False)}\n\n"
+        enviados = len(job["segments"])
+
+        if job["status"] != last_status:
+            last_status = job["status"]
+            payload = {"status": job["status"], "error": job["error"]}
+            yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+        if job["status"] in FINISHED:
+            return
+        await asyncio.sleep(0.5)
+
+@router.get("/transcriptions")
+def transcriptions_stats():
+    """Procesos trabajadores, transcripciones en curso / en cola, modelos residentes y aciertos de la caché."""
+    return get_transcription_jobs().stats()
+
+@router.get("/transcriptions/{job_id}")
+def get_transcription(job_id: str):
+    job = get_transcription_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcripción no encontrada")
+    return job
+
+@router.get("/transcriptions/{job_id}/result")
+def get_transcription_result(job_id: str):
+    """200 con el texto cuando terminó, 202 mientras sigue en cola o en proceso."""
+    job = get_transcription_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcripción no encontrada")
+    if job["status"] not in FINISHED:
+        return JSONResponse(status_code=202, content={"id": job_id, "status": job["status"]})
+    if job["status"] != COMPLETED:
+        raise HTTPException(status_code=409, detail=job["error"] or f"Transcripción {job['status']}")
+    return {"id": job_id, "transcription": job["result"]["text"], "model": job["params"]["model"]}
+
+@router.delete("/transcriptions/{job_id}")
+def cancel_transcription(job_id: str):
+    """Cancela una transcripción que aún está en cola."""
+    job = get_transcription_jobs().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcripción no encontrada")
+    return job
+
+@router.get("/models")
+def models_status():
+    """Modelos Whisper permitidos y configuración de residencia (los modelos viven en los procesos trabajadores)."""
+    estado = get_automation_service().models_status()
+    estado.pop("cargados", None)
+    return {**estado, "workers": get_transcription_jobs().stats()["workers_info"]}
 
 
 """
@@ -33,16 +185,25 @@ Rol dentro de la arquitectura:
 
 Flujo del endpoint `/voice-to-text`:
 1. Recibe un archivo de audio (`UploadFile`) vía POST.
-2. Guarda temporalmente el archivo en disco con un nombre dinámico `temp_<nombre>`.
-   - Se usa `shutil.copyfileobj` para copiar el contenido del archivo subido al temporal.
-3. Llama al servicio de aplicación (`AutomationService`) para transcribir el audio.
+2. Lee sus bytes: nada se escribe a disco. El trabajador los decodifica en memoria
+   (16 kHz mono float32) y le pasa el array directamente a Whisper.
+3. Los encola en `TranscriptionJobManager` (procesos trabajadores con su propio Whisper) y espera
+   el resultado sin bloquear el event loop. Con la cola llena responde 429.
+   - `/transcriptions` hace lo mismo pero responde de una con el id del job (consultar luego el resultado).
    - Aquí no sabemos si es Whisper u otro motor, porque el service se encarga de esa lógica.
-4. Borra el archivo temporal (`os.remove`) para no dejar basura en disco.
-5. Devuelve un JSON con la transcripción en la clave `"transcription"`.
+   - El servicio se crea en la primera petición y el modelo se carga la primera vez que se usa
+     (`?model=` permite elegir otro tamaño de la lista blanca).
+4. Devuelve un JSON con la transcripción en la clave `"transcription"`.
+   - Si el mismo audio ya se transcribió (mismo hash, modelo e idioma) la respuesta sale de la
+     caché de transcripciones sin pasar por Whisper (`"cached": true`).
+
+Audios largos: `/transcriptions/stream` usa la misma cola pero transcribe por ventanas
+(`WhisperEngine.transcribe_stream`) y va enviando cada segmento por Server-Sent Events
+(mismo formato que el progreso de entrenamiento en /vision).
 
 Ventaja de este diseño:
 - La API no tiene que saber nada de IA ni de cómo funciona Whisper.
-- Solo orquesta: recibe archivo → guarda temporal → pide al servicio la transcripción → responde.
+- Solo orquesta: recibe archivo → encola los bytes → pide al servicio la transcripción → responde.
 - Esto mantiene la separación de responsabilidades: 
   la API maneja HTTP, el servicio maneja negocio, y la infraestructura maneja la implementación técnica.
 """
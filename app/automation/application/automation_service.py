@@ -1,11 +1,30 @@
+from app.core.config import settings
 from app.automation.infrastructure.whisper_engine import WhisperEngine
+from app.automation.infrastructure.transcription_cache import get_transcription_cache
 
 class AutomationService:
-    def __init__(self):
-        self.engine = WhisperEngine(model_size="base")  # 👈 puedes cambiarlo
+    def __init__(self, model_size: str = None, cache=None):
+        self.engine = WhisperEngine(model_size=model_size)  # 👈 por defecto WHISPER_DEFAULT_MODEL (no carga nada aún)
+        self.cache = cache if cache is not None else get_transcription_cache()
 
-    def voice_to_text(self, audio_path: str) -> str:
-        return self.engine.transcribe(audio_path)
+    def voice_to_text(self, audio, model_size: str = None) -> str:
+        model_size = model_size or self.engine.model_size
+        if self.cache is None:
+            return self.engine.transcribe(audio, model_size=model_size)
+
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                audio = f.read()
+        clave = self.cache.clave(audio, model_size, settings.WHISPER_LANGUAGE)
+        guardado = self.cache.get(clave)
+        if guardado is not None:
+            return guardado["text"]
+        text = self.engine.transcribe(audio, model_size=model_size)
+        self.cache.put(clave, {"text": text})
+        return text
+
+    def models_status(self) -> dict:
+        return self.engine.residency.estado()
 
 
 """
@@ -18,9 +37,11 @@ Rol dentro de la arquitectura:
 
 Detalles:
 - En el constructor (`__init__`) inicializamos `WhisperEngine` indicando el tamaño del modelo
-  (por defecto "base", pero puede cambiarse a "tiny", "small", "medium", etc.).
-- El método `voice_to_text(audio_path: str)` recibe la ruta de un archivo de audio y delega
-  la transcripción al motor (`self.engine.transcribe`).
+  por defecto (WHISPER_DEFAULT_MODEL). Crear el servicio es barato: Whisper se carga en el primer uso.
+- El método `voice_to_text(audio, model_size=None)` recibe el audio (bytes subidos o la ruta
+  de un archivo), opcionalmente otro tamaño de modelo permitido, y delega la transcripción al motor.
+  Antes consulta la caché de transcripciones (hash del audio + modelo + idioma): un audio repetido
+  no vuelve a pasar por Whisper.
 
 Ventaja de esta capa:
 - La API nunca habla directamente con Whisper ni con ninguna librería externa.
@@ -0,0 +1,319 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.config import settings
+
+# Estados posibles de una transcripción
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED = {COMPLETED, FAILED, CANCELLED}
+
+
+class QueueFullError(Exception):
+    """La cola de transcripciones está llena (la API responde 429)."""
+
+
+def _precargar_whisper(nombres):
+    """
+    Inicializador de cada proceso trabajador: carga los modelos de WHISPER_PRELOAD antes del
+    primer job (es el proceso que transcribe, no el de la API, el que debe tenerlos residentes).
+    """
+    from app.automation.infrastructure.whisper_engine import get_whisper_residency
+
+    get_whisper_residency().preload(nombres, en_segundo_plano=False)
+
+
+def _transcribe_in_worker(audio, model_size: str) -> dict:
+    """
+    Punto de entrada de cada proceso trabajador (`audio`: bytes subidos o ruta; se decodifica aquí,
+    fuera del proceso de la API).
+    Cada proceso tiene su propio administrador de modelos: Whisper se carga en el primer job
+    y queda residente para los siguientes (hasta la descarga por inactividad).
+    """
+    from app.automation.infrastructure.whisper_engine import WhisperEngine, get_whisper_residency
+
+    inicio = time.perf_counter()
+    text = WhisperEngine(model_size=model_size).transcribe(audio)
+    return {
+        "text": text,
+        "worker_pid": os.getpid(),
+        "transcribe_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        "resident_models": get_whisper_residency().cargados(),
+    }
+
+
+def _transcribe_stream_in_worker(audio, model_size: str, job_id: str, eventos, window_s: float) -> dict:
+    """
+    Igual que `_transcribe_in_worker` pero por ventanas: cada segmento se envía apenas sale
+    por la cola `eventos` (y al final se devuelven todos).
+    """
+    from app.automation.infrastructure.whisper_engine import WhisperEngine, get_whisper_residency
+
+    inicio = time.perf_counter()
+    segmentos = []
+    for segmento in WhisperEngine(model_size=model_size).transcribe_stream(audio, window_s=window_s):
+        segmentos.append(segmento)
+        eventos.put((job_id, segmento))
+    return {
+        "text": " ".join(s["text"] for s in segmentos),
+        "segments": segmentos,
+        "worker_pid": os.getpid(),
+        "transcribe_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        "resident_models": get_whisper_residency().cargados(),
+    }
+
+
+class TranscriptionJobManager:
+    """
+    Cola de transcripciones en segundo plano.
+
+    - Cada audio se transcribe en un pool de procesos "spawn" (`workers` procesos, cada uno
+      con su propio modelo Whisper): varios audios se procesan en paralelo y el event loop
+      de la API nunca se bloquea.
+    - Contrapresión: como máximo `workers + max_queue` transcripciones pendientes;
+      más allá `submit` lanza QueueFullError (la API responde 429).
+    - Los jobs se consultan por id (estado y resultado) y los que siguen en cola se pueden cancelar.
+    - Modo streaming (`stream=True`): el trabajador manda cada segmento apenas sale; se van
+      acumulando en `job["segments"]` (la API los reenvía por SSE).
+    - Con `cache` (TranscriptionCache), un audio ya transcrito con el mismo modelo e idioma
+      no vuelve a la cola: el job nace terminado con el resultado guardado.
+    - `preload`: modelos que cada trabajador carga al arrancar (con `initializer`), así el
+      primer job no paga la carga de Whisper.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 16, target=_transcribe_in_worker,
+                 stream_target=_transcribe_stream_in_worker, max_history: int = 200, cache=None,
+                 preload=(), initializer=_precargar_whisper):
+        self.workers = max(1, workers)
+        self.preload = list(preload)
+        self._initializer = initializer
+        self.max_queue = max(0, max_queue)
+        self.cache = cache
+        self._claves = {}          # job_id → clave de caché de los jobs sin terminar
+        self._target = target
+        self._stream_target = stream_target
+        self._mp_manager = None    # proceso Manager con la cola de segmentos (solo si se usa streaming)
+        self._eventos = None
+        self._max_history = max_history
+        self._ctx = mp.get_context("spawn")
+        self._executor = None      # se crea en el primer submit
+        self._jobs = {}            # job_id → dict con el estado
+        self._futures = {}         # job_id → Future de los jobs sin terminar
+        self._workers_info = {}    # pid → modelos residentes según su último job
+        self._done = {}            # job_id → Event que se marca cuando el job queda cerrado
+        self._lock = threading.Lock()
+
+    # ─────────────────────────────────────────────
+    # API pública
+    # ─────────────────────────────────────────────
+    def submit(self, audio, model_size: str, filename: str = None, cleanup: bool = True,
+               stream: bool = False, window_s: float = 30.0) -> dict:
+        """
+        Encola la transcripción de `audio`: los bytes del archivo (se decodifican en memoria dentro
+        del trabajador) o una ruta. Si es una ruta y `cleanup`, el archivo se borra al terminar.
+        - stream: transcripción por ventanas de `window_s` segundos con segmentos parciales.
+        Lanza QueueFullError si ya hay demasiados pendientes.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "params": {"model": model_size, "filename": filename, "stream": stream},
+            "segments": [],
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+
+        clave = None
+        if self.cache is not None and isinstance(audio, (bytes, bytearray)):
+            variante = f"stream:{window_s:g}" if stream else "texto"
+            clave = self.cache.clave(audio, model_size, settings.WHISPER_LANGUAGE, variante)
+            guardado = self.cache.get(clave)
+            if guardado is not None:
+                # 🎯 Ya transcrito: el job queda terminado sin pasar por los procesos
+                job.update(status=COMPLETED, result={**guardado, "cached": True},
+                           segments=list(guardado.get("segments", [])), finished_at=time.time())
+                with self._lock:
+                    self._jobs[job_id] = job
+                    self._prune()
+                return self.get(job_id)
+
+        if stream:
+            self._iniciar_eventos()
+        with self._lock:
+            if len(self._futures) >= self.workers + self.max_queue:
+                raise QueueFullError(
+                    f"Hay {len(self._futures)} transcripciones pendientes (máximo {self.workers + self.max_queue}). "
+                    "Intenta de nuevo en unos segundos."
+                )
+            self._done[job_id] = threading.Event()
+            if stream:
+                future = self._submit_job(self._stream_target, audio, model_size, job_id, self._eventos, window_s)
+            else:
+                future = self._submit_job(self._target, audio, model_size)
+            self._jobs[job_id] = job
+            self._futures[job_id] = future
+            if clave is not None:
+                self._claves[job_id] = clave
+            self._prune()
+
+        cleanup_path = audio if cleanup and isinstance(audio, str) else None
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f, cleanup_path))
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job, segments=list(job["segments"]))
+            future = self._futures.get(job_id)
+            if future is not None and future.running():
+                snapshot["status"] = RUNNING
+            if snapshot["status"] == QUEUED:
+                pendientes = [jid for jid, f in self._futures.items() if not f.running()]
+                snapshot["queue_position"] = pendientes.index(job_id) + 1 if job_id in pendientes else None
+            return snapshot
+
+    def future(self, job_id: str):
+        """Future del job (para esperarlo sin bloquear, ej. asyncio.wrap_future). None si ya terminó."""
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def wait(self, job_id: str, timeout: float = None):
+        """Bloquea hasta que el job termine (útil en tests y scripts). Devuelve el job."""
+        with self._lock:
+            evento = self._done.get(job_id)
+        if evento is not None:
+            evento.wait(timeout)
+        return self.get(job_id)
+
+    def cancel(self, job_id: str):
+        """Cancela un job que sigue en cola (uno en ejecución no se puede interrumpir)."""
+        with self._lock:
+            if job_id not in self._jobs:
+                return None
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()  # el callback de fin marca el job como cancelado
+        return self.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            corriendo = sum(f.running() for f in self._futures.values())
+            stats = {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": corriendo,
+                "queued": len(self._futures) - corriendo,
+                "workers_info": [{"pid": pid, **info} for pid, info in self._workers_info.items()],
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.estado()
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            mp_manager, self._mp_manager, self._eventos = self._mp_manager, None, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if mp_manager is not None:
+            mp_manager.shutdown()
+
+    # ─────────────────────────────────────────────
+    # Internos
+    # ─────────────────────────────────────────────
+    def _submit_job(self, target, *args):
+        # (con self._lock tomado)
+        if self._executor is None:
+            self._executor = self._nuevo_pool()
+        try:
+            return self._executor.submit(target, *args)
+        except BrokenProcessPool:
+            # Si un trabajador murió (ej. sin memoria), se levanta un pool nuevo
+            self._executor = self._nuevo_pool()
+            return self._executor.submit(target, *args)
+
+    def _nuevo_pool(self):
+        # "spawn": procesos limpios, sin heredar hilos ni el estado de la API
+        if not self.preload:
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._ctx)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._ctx,
+                                   initializer=self._initializer, initargs=(self.preload,))
+
+    def _iniciar_eventos(self):
+        # Una cola compartida (vía Manager, se puede pasar a los trabajadores del pool)
+        # y un hilo que reparte cada segmento a su job
+        with self._lock:
+            if self._eventos is not None:
+                return
+            self._mp_manager = self._ctx.Manager()
+            self._eventos = self._mp_manager.Queue()
+            eventos = self._eventos
+        threading.Thread(target=self._escuchar_eventos, args=(eventos,), name="transcription-events", daemon=True).start()
+
+    def _escuchar_eventos(self, eventos):
+        while True:
+            try:
+                job_id, segmento = eventos.get()
+            except (EOFError, OSError, BrokenPipeError):
+                return  # el Manager se cerró (shutdown)
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and job["status"] not in FINISHED:
+                    job["segments"].append(segmento)
+
+    def _on_done(self, job_id, future, cleanup_path):
+        if cleanup_path and os.path.exists(cleanup_path):
+            os.remove(cleanup_path)
+
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._futures.pop(job_id, None)
+            clave = self._claves.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if job is None:
+                self._done.pop(job_id, None)
+                return
+            job["finished_at"] = time.time()
+            if future.cancelled():
+                job["status"] = CANCELLED
+            elif error is not None:
+                job["status"] = FAILED
+                job["error"] = str(error) or type(error).__name__
+            else:
+                resultado = future.result()
+                job["status"] = COMPLETED
+                job["result"] = resultado
+                if isinstance(resultado, dict) and "segments" in resultado:
+                    job["segments"] = list(resultado["segments"])  # la lista completa manda (por si faltó algún evento)
+                if isinstance(resultado, dict) and "worker_pid" in resultado:
+                    self._workers_info[resultado["worker_pid"]] = {
+                        "resident_models": resultado.get("resident_models", []),
+                        "last_job_at": job["finished_at"],
+                    }
+
+            evento = self._done.pop(job_id, None)
+
+        if clave is not None and error is None and not future.cancelled():
+            resultado = future.result()
+            # Solo lo que depende del audio (no el pid ni los tiempos del trabajador)
+            self.cache.put(clave, {k: resultado[k] for k in ("text", "segments") if k in resultado})
+        if evento is not None:
+            evento.set()
+
+        if error is not None:
+            print(f"⚠️ Error en la transcripción {job_id}:", error)
+
+    def _prune(self):
+        # (con self._lock tomado) conserva solo los últimos `max_history` jobs terminados
+        terminados = [jid for jid, j in self._jobs.items() if jid not in self._futures and j["status"] in FINISHED]
+        for job_id in terminados[:-self._max_history]:
+            del self._jobs[job_id]
@@ -1,17 +1,24 @@
-import subprocess
+import wave
 from pathlib import Path
 
-# Ruta absoluta a tu ffmpeg
-ffmpeg_path = r"C:\Users\USER\ffmpeg-8.0-essentials_build\bin\ffmpeg.exe"
+import numpy as np
+
+from app.automation.infrastructure.audio_stream import SAMPLE_RATE, cargar_audio
 
 def convert_to_wav(input_file: str, output_file: str):
     """
-    Convierte un archivo de audio (mp3, m4a, etc.) a wav usando ffmpeg.
+    Convierte un archivo de audio (mp3, m4a, etc.) a wav mono de 16 kHz (el formato de Whisper).
+    Usa la misma decodificación que la API (ffmpeg del PATH o FFMPEG_BIN, solo si no es WAV).
     """
     if not Path(input_file).exists():
         raise FileNotFoundError(f"❌ No se encontró el archivo de entrada: {input_file}")
 
-    subprocess.run([ffmpeg_path, "-i", input_file, output_file], check=True)
+    muestras = cargar_audio(input_file)
+    with wave.open(output_file, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(muestras, -1.0, 1.0) * 32767).astype("<i2").tobytes())
     print(f"✅ Conversión lista: {output_file}")
 
 
@@ -1,8 +1,8 @@
 from typing import Protocol
 
 class VoiceToTextInterface(Protocol):
-    def transcribe(self, audio_path: str) -> str:
-        """Transcribe un archivo de audio y devuelve texto"""
+    def transcribe(self, audio) -> str:
+        """Transcribe un audio (bytes o ruta de archivo) y devuelve texto"""
         ...
 
 
@@ -10,8 +10,8 @@ class VoiceToTextInterface(Protocol):
 Esta clase define una INTERFAZ usando `Protocol`, que funciona como un contrato.
 - `Protocol` en Python → permite declarar métodos que otras clases deben implementar,
   parecido a las interfaces en Java o C#.
-- Aquí declaramos el método `transcribe(audio_path: str) -> str`, que recibe la ruta de un
-  archivo de audio y devuelve el texto transcrito.
+- Aquí declaramos el método `transcribe(audio) -> str`, que recibe el audio (los bytes
+  subidos o la ruta de un archivo) y devuelve el texto transcrito.
 
 El `...` (ellipsis) significa:
 - "Aquí no pongo implementación, solo marco que este método existe".
@@ -0,0 +1,203 @@
+import io
+import os
+import subprocess
+import tempfile
+import threading
+import wave
+from math import gcd
+
+import numpy as np
+
+from app.core.config import settings
+
+SAMPLE_RATE = 16000          # Whisper trabaja con audio mono a 16 kHz
+FRAME_S = 0.03               # tamaño de cuadro para medir energía (30 ms)
+
+
+# ─────────────────────────────────────────────
+# 🎧 Decodificación en memoria
+# ─────────────────────────────────────────────
+def cargar_audio(fuente, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Audio completo como float32 mono a `sr`, listo para `model.transcribe`.
+    `fuente` puede ser los bytes subidos, la ruta de un archivo o un array ya decodificado.
+    """
+    if isinstance(fuente, np.ndarray):
+        return fuente.astype(np.float32, copy=False)
+    bloques = list(iter_pcm(fuente, bloque_s=60.0, sr=sr))
+    return np.concatenate(bloques) if bloques else np.zeros(0, dtype=np.float32)
+
+
+def iter_pcm(fuente, bloque_s: float = 10.0, sr: int = SAMPLE_RATE):
+    """
+    Decodifica el audio por bloques de `bloque_s` segundos (float32 mono a `sr`).
+    - WAV PCM: se lee y remuestrea en el mismo proceso (sin ffmpeg ni disco).
+    - Otros formatos: ffmpeg leyendo de un pipe (los bytes nunca se escriben a disco).
+    Nunca tiene el archivo completo decodificado en memoria.
+    """
+    if isinstance(fuente, str):
+        with open(fuente, "rb") as f:
+            cabecera = f.read(12)
+    else:
+        cabecera = bytes(fuente[:12])
+
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WAVE":
+        try:
+            yield from _iter_wav(fuente, bloque_s, sr)
+            return
+        except wave.Error:
+            pass  # WAV no PCM (float, extensible...): lo resuelve ffmpeg
+    yield from _iter_ffmpeg(fuente, bloque_s, sr)
+
+
+def _iter_wav(fuente, bloque_s: float, sr: int):
+    with wave.open(fuente if isinstance(fuente, str) else io.BytesIO(fuente), "rb") as wav:
+        canales, ancho, sr_origen = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        if ancho not in (1, 2, 3, 4):
+            raise wave.Error(f"Ancho de muestra no soportado: {ancho}")
+        cuadros = max(1, int(bloque_s * sr_origen))
+        while True:
+            datos = wav.readframes(cuadros)
+            if not datos:
+                break
+            muestras = _pcm_a_float(datos, ancho).reshape(-1, canales).mean(axis=1)
+            yield remuestrear(muestras, sr_origen, sr)
+
+
+def _pcm_a_float(datos: bytes, ancho: int) -> np.ndarray:
+    if ancho == 1:  # 8 bits sin signo
+        return (np.frombuffer(datos, np.uint8).astype(np.float32) - 128.0) / 128.0
+    if ancho == 3:  # 24 bits: se completa a int32 por la izquierda
+        crudo = np.frombuffer(datos, np.uint8).reshape(-1, 3)
+        enteros = np.zeros((len(crudo), 4), dtype=np.uint8)
+        enteros[:, 1:] = crudo
+        return enteros.view("<i4").ravel().astype(np.float32) / 2147483648.0
+    tipo = {2: "<i2", 4: "<i4"}[ancho]
+    return np.frombuffer(datos, tipo).astype(np.float32) / float(2 ** (8 * ancho - 1))
+
+
+def remuestrear(muestras: np.ndarray, sr_origen: int, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Cambia la frecuencia de muestreo con un filtro polifásico (44.1 kHz → 16 kHz, etc.)."""
+    muestras = muestras.astype(np.float32, copy=False)
+    if sr_origen == sr or not len(muestras):
+        return muestras
+    from scipy.signal import resample_poly
+
+    divisor = gcd(sr, sr_origen)
+    return resample_poly(muestras, sr // divisor, sr_origen // divisor).astype(np.float32)
+
+
+def _iter_ffmpeg(fuente, bloque_s: float, sr: int):
+    if isinstance(fuente, str):
+        yield from _ffmpeg_pcm(fuente, None, bloque_s, sr)
+        return
+    emitidos = False
+    try:
+        for bloque in _ffmpeg_pcm("pipe:0", fuente, bloque_s, sr):
+            emitidos = True
+            yield bloque
+    except RuntimeError:
+        if emitidos:
+            raise  # ya se entregó audio: reintentar lo repetiría (el error real es el del pipe)
+        # Algunos contenedores (m4a/mp4 con el índice al final) no se pueden leer desde un pipe:
+        # solo para ellos se usa un temporal
+        with tempfile.NamedTemporaryFile(delete=False, prefix="audio_") as tmp:
+            tmp.write(fuente)
+        try:
+            yield from _ffmpeg_pcm(tmp.name, None, bloque_s, sr)
+        finally:
+            os.remove(tmp.name)
+
+
+def _ffmpeg_pcm(entrada: str, datos, bloque_s: float, sr: int):
+    cmd = [
+        settings.FFMPEG_BIN, "-hide_banner", *(["-nostdin"] if datos is None else []), "-threads", "0", "-i", entrada,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr), "-",
+    ]
+    bytes_bloque = int(bloque_s * sr) * 2
+    try:
+        proceso = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE if datos is not None else None,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        raise RuntimeError(f"No se encontró ffmpeg ('{settings.FFMPEG_BIN}'); configura FFMPEG_BIN")
+
+    errores = []
+    hilos = [threading.Thread(target=lambda: errores.append(proceso.stderr.read()), daemon=True)]
+    if datos is not None:
+        hilos.append(threading.Thread(target=_escribir_stdin, args=(proceso, datos), daemon=True))
+    for hilo in hilos:
+        hilo.start()  # stdin y stderr en hilos: ffmpeg nunca se queda bloqueado esperando
+
+    try:
+        while True:
+            datos_pcm = proceso.stdout.read(bytes_bloque)
+            if not datos_pcm:
+                break
+            datos_pcm = datos_pcm[:len(datos_pcm) - len(datos_pcm) % 2]
+            yield np.frombuffer(datos_pcm, np.int16).astype(np.float32) / 32768.0
+        # Cualquier salida con error falla, aunque ya haya salido audio (ej. un final corrupto):
+        # una transcripción truncada nunca debe quedar como COMPLETED ni guardarse en la caché
+        if proceso.wait() != 0:
+            for hilo in hilos:
+                hilo.join()
+            error = b"".join(errores).decode(errors="ignore")[-500:]
+            raise RuntimeError(f"No se pudo decodificar el audio completo (código {proceso.returncode}): {error}")
+    finally:
+        if proceso.poll() is None:
+            proceso.kill()
+            proceso.wait()
+
+
+def _escribir_stdin(proceso, datos):
+    try:
+        proceso.stdin.write(datos)
+    except (BrokenPipeError, OSError):
+        pass  # ffmpeg cerró la entrada (error de formato): se informa por el código de salida
+    finally:
+        try:
+            proceso.stdin.close()
+        except OSError:
+            pass
+
+
+# ─────────────────────────────────────────────
+# ✂️ Ventanas para la transcripción en streaming
+# ─────────────────────────────────────────────
+def punto_de_corte(muestras: np.ndarray, sr: int = SAMPLE_RATE, buscar_s: float = 5.0) -> int:
+    """
+    Posición donde cortar la ventana: el cuadro de 30 ms con menos energía dentro de
+    los últimos `buscar_s` segundos (una pausa), así no se parte una palabra por la mitad.
+    """
+    frame = max(1, int(FRAME_S * sr))
+    zona = min(len(muestras), int(buscar_s * sr)) // frame * frame
+    if zona < frame:
+        return len(muestras)
+    inicio = len(muestras) - zona
+    energia = np.square(muestras[inicio:]).reshape(-1, frame).mean(axis=1)
+    return inicio + int(np.argmin(energia)) * frame + frame // 2
+
+
+def ventanas(bloques, window_s: float = 30.0, sr: int = SAMPLE_RATE, vad: bool = True, buscar_s: float = 5.0):
+    """
+    Reagrupa los bloques de audio en ventanas de ~`window_s` segundos.
+    - vad=True: cada ventana termina en la pausa más silenciosa de sus últimos `buscar_s` segundos
+      (lo que sobra pasa a la siguiente ventana).
+    - vad=False: ventanas fijas.
+    Produce (inicio_en_segundos, muestras). En memoria hay como máximo una ventana más un bloque.
+    """
+    tamano = int(window_s * sr)
+    buffer = np.zeros(0, dtype=np.float32)
+    consumidas = 0  # muestras ya entregadas (para calcular el inicio de cada ventana)
+
+    for bloque in bloques:
+        buffer = np.concatenate([buffer, bloque])
+        while len(buffer) >= tamano:
+            corte = punto_de_corte(buffer[:tamano], sr, buscar_s) if vad else tamano
+            yield consumidas / sr, buffer[:corte]
+            consumidas += corte
+            buffer = buffer[corte:]
+
+    if len(buffer) >= int(0.1 * sr):  # el final (se ignora si es menos de 100 ms)
+        yield consumidas / sr, buffer
@@ -0,0 +1,180 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class ModelResidency:
+    """
+    Administra qué modelos están cargados en memoria.
+
+    - Carga perezosa: un modelo se carga la primera vez que se usa (`usar`), no al importar.
+    - LRU: como máximo `max_resident` modelos cargados; al cargar otro se descarga
+      el que lleva más tiempo sin usarse (nunca uno que se está usando).
+    - Inactividad: un hilo de fondo descarga los modelos sin uso durante `idle_timeout` segundos
+      (0 = nunca).
+    - Lista blanca: solo se aceptan los nombres de `permitidos`.
+    - `preload` los deja cargados de antemano (por ejemplo al arrancar, en segundo plano).
+
+    `loader(nombre)` es la función que carga un modelo; el resto del sistema no sabe qué es.
+    """
+
+    def __init__(self, loader, permitidos, max_resident: int = 1, idle_timeout: float = 0, nombre: str = "modelo"):
+        self._loader = loader
+        self.permitidos = tuple(permitidos)
+        self.max_resident = max(1, max_resident)
+        self.idle_timeout = idle_timeout
+        self.nombre = nombre
+        self._modelos = OrderedDict()   # nombre → modelo (el último es el más reciente)
+        self._ultimo_uso = {}           # nombre → time.monotonic()
+        self._en_uso = {}               # nombre → préstamos activos
+        self._cargando = {}             # nombre → Lock (una sola carga por modelo)
+        self._lock = threading.Lock()
+        self._vigilante = None
+
+    def validar(self, nombre: str) -> str:
+        if nombre not in self.permitidos:
+            raise ValueError(f"Modelo '{nombre}' no permitido. Opciones: {', '.join(self.permitidos)}")
+        return nombre
+
+    @contextmanager
+    def usar(self, nombre: str):
+        """Presta el modelo (cargándolo si hace falta). Mientras se usa no se descarga."""
+        modelo = self._obtener(self.validar(nombre))
+        try:
+            yield modelo
+        finally:
+            with self._lock:
+                self._en_uso[nombre] -= 1
+                self._ultimo_uso[nombre] = time.monotonic()
+
+    def _obtener(self, nombre: str):
+        with self._lock:
+            if nombre in self._modelos:
+                return self._prestar(nombre)
+            carga = self._cargando.setdefault(nombre, threading.Lock())
+
+        with carga:  # si otro hilo ya lo está cargando, se espera a que termine
+            with self._lock:
+                if nombre in self._modelos:
+                    return self._prestar(nombre)
+
+            print(f"⏳ Cargando {self.nombre} '{nombre}'...")
+            inicio = time.perf_counter()
+            modelo = self._loader(nombre)
+            print(f"✅ {self.nombre} '{nombre}' cargado en {time.perf_counter() - inicio:.1f}s")
+
+            with self._lock:
+                self._modelos[nombre] = modelo
+                self._en_uso.setdefault(nombre, 0)
+                prestado = self._prestar(nombre)
+                descartados = self._desalojar_lru()
+        self._liberar(descartados)
+        self._iniciar_vigilante()
+        return prestado
+
+    def _prestar(self, nombre: str):
+        # (con self._lock tomado)
+        self._modelos.move_to_end(nombre)
+        self._en_uso[nombre] = self._en_uso.get(nombre, 0) + 1
+        self._ultimo_uso[nombre] = time.monotonic()
+        return self._modelos[nombre]
+
+    def _desalojar_lru(self) -> list:
+        # (con self._lock tomado) quita los menos usados recientemente que no estén prestados
+        descartados = []
+        for candidato in list(self._modelos):
+            if len(self._modelos) <= self.max_resident:
+                break
+            if self._en_uso.get(candidato, 0) == 0:
+                descartados.append(candidato)
+                del self._modelos[candidato]
+        return descartados
+
+    def _liberar(self, nombres):
+        if not nombres:
+            return
+        for nombre in nombres:
+            print(f"🧹 {self.nombre} '{nombre}' descargado de memoria")
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    # ─────────────────────────────────────────────
+    # 💤 Descarga por inactividad
+    # ─────────────────────────────────────────────
+    def descargar_inactivos(self, ahora: float = None) -> list:
+        """Descarga los modelos sin uso durante más de `idle_timeout` segundos. Devuelve sus nombres."""
+        if not self.idle_timeout:
+            return []
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            descartados = [
+                nombre for nombre in self._modelos
+                if self._en_uso.get(nombre, 0) == 0 and ahora - self._ultimo_uso.get(nombre, ahora) >= self.idle_timeout
+            ]
+            for nombre in descartados:
+                del self._modelos[nombre]
+        self._liberar(descartados)
+        return descartados
+
+    def _iniciar_vigilante(self):
+        if not self.idle_timeout or self._vigilante is not None:
+            return
+        with self._lock:
+            if self._vigilante is not None:
+                return
+            self._vigilante = threading.Thread(target=self._vigilar, name=f"{self.nombre}-idle", daemon=True)
+        self._vigilante.start()
+
+    def _vigilar(self):
+        intervalo = max(1.0, self.idle_timeout / 4)
+        while True:
+            time.sleep(intervalo)
+            self.descargar_inactivos()
+
+    # ─────────────────────────────────────────────
+    # 🚀 Precarga y estado
+    # ─────────────────────────────────────────────
+    def preload(self, nombres, en_segundo_plano: bool = True):
+        """Carga de antemano los modelos indicados (sin bloquear el arranque si `en_segundo_plano`)."""
+        nombres = [self.validar(n) for n in nombres]
+
+        def cargar():
+            for nombre in nombres:
+                try:
+                    with self.usar(nombre):
+                        pass
+                except Exception as e:
+                    print(f"⚠️ No se pudo precargar {self.nombre} '{nombre}':", e)
+
+        if en_segundo_plano:
+            threading.Thread(target=cargar, name=f"{self.nombre}-preload", daemon=True).start()
+        else:
+            cargar()
+
+    def cargados(self) -> list:
+        with self._lock:
+            return list(self._modelos)
+
+    def estado(self) -> dict:
+        ahora = time.monotonic()
+        with self._lock:
+            return {
+                "permitidos": list(self.permitidos),
+                "max_resident": self.max_resident,
+                "idle_timeout_s": self.idle_timeout,
+                "cargados": [
+                    {
+                        "modelo": nombre,
+                        "en_uso": self._en_uso.get(nombre, 0),
+                        "inactivo_s": round(ahora - self._ultimo_uso.get(nombre, ahora), 1),
+                    }
+                    for nombre in reversed(self._modelos)  # el más reciente primero
+                ],
+            }
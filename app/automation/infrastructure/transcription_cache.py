@@ -0,0 +1,166 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from app.core.config import settings
+
+
+class TranscriptionCache:
+    """
+    Caché de transcripciones direccionada por contenido.
+
+    - Clave: SHA-256 de los bytes del audio + modelo + idioma (+ variante, ej. streaming por ventanas):
+      el mismo audio subido otra vez, con otro nombre, da la misma clave.
+    - Dos niveles: LRU en memoria (`max_memoria` entradas) y SQLite en disco (`max_disco` entradas,
+      sobrevive a reinicios y se comparte entre procesos).
+    - TTL: las entradas con más de `ttl` segundos se descartan (0 = no caducan).
+    - Contadores de aciertos (memoria / disco), fallos, escrituras y descartes.
+    """
+
+    def __init__(self, ruta=None, max_memoria: int = 256, max_disco: int = 20_000, ttl: float = 0):
+        self.ruta = Path(ruta) if ruta else None
+        self.max_memoria = max(0, max_memoria)
+        self.max_disco = max(0, max_disco)
+        self.ttl = ttl
+        self._memoria = OrderedDict()  # clave → (creado, resultado); el último es el más reciente
+        self._lock = threading.Lock()
+        self._db = None
+        self._metricas = dict.fromkeys(
+            ["hits_memoria", "hits_disco", "misses", "escrituras", "expirados", "desalojados"], 0
+        )
+        if self.ruta is not None and self.max_disco:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.ruta), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcripciones ("
+                "clave TEXT PRIMARY KEY, resultado TEXT NOT NULL, creado REAL NOT NULL, usado REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_transcripciones_usado ON transcripciones (usado)")
+
+    @staticmethod
+    def clave(audio: bytes, model: str, language: str, variante: str = "texto") -> str:
+        h = hashlib.sha256(audio)
+        h.update(f"|{model}|{language}|{variante}".encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, clave: str):
+        """Resultado guardado (dict) o None. Un acierto en disco se sube a memoria."""
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                if self._vigente(entrada[0], ahora):
+                    self._memoria.move_to_end(clave)
+                    self._metricas["hits_memoria"] += 1
+                    return entrada[1]
+                del self._memoria[clave]
+                self._borrar_disco(clave)
+                self._metricas["expirados"] += 1
+
+            fila = None
+            if self._db is not None:
+                fila = self._db.execute(
+                    "SELECT resultado, creado FROM transcripciones WHERE clave = ?", (clave,)
+                ).fetchone()
+            if fila is None:
+                self._metricas["misses"] += 1
+                return None
+            if not self._vigente(fila[1], ahora):
+                self._borrar_disco(clave)
+                self._metricas["expirados"] += 1
+                self._metricas["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE transcripciones SET usado = ? WHERE clave = ?", (ahora, clave))
+            resultado = json.loads(fila[0])
+            self._guardar_memoria(clave, fila[1], resultado)
+            self._metricas["hits_disco"] += 1
+            return resultado
+
+    def put(self, clave: str, resultado: dict):
+        ahora = time.time()
+        with self._lock:
+            self._guardar_memoria(clave, ahora, resultado)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcripciones (clave, resultado, creado, usado) VALUES (?, ?, ?, ?)",
+                    (clave, json.dumps(resultado, ensure_ascii=False), ahora, ahora),
+                )
+                self._recortar_disco(ahora)
+            self._metricas["escrituras"] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._memoria.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM transcripciones")
+
+    def estado(self) -> dict:
+        with self._lock:
+            en_disco = self._db.execute("SELECT COUNT(*) FROM transcripciones").fetchone()[0] if self._db else 0
+            hits = self._metricas["hits_memoria"] + self._metricas["hits_disco"]
+            consultas = hits + self._metricas["misses"]
+            return {
+                **self._metricas,
+                "hit_rate": round(hits / consultas, 4) if consultas else 0.0,
+                "en_memoria": len(self._memoria),
+                "en_disco": en_disco,
+                "max_memoria": self.max_memoria,
+                "max_disco": self.max_disco,
+                "ttl_s": self.ttl,
+            }
+
+    # ─────────────────────────────────────────────
+    # Internos (con self._lock tomado)
+    # ─────────────────────────────────────────────
+    def _vigente(self, creado: float, ahora: float) -> bool:
+        return not self.ttl or ahora - creado < self.ttl
+
+    def _guardar_memoria(self, clave, creado, resultado):
+        if not self.max_memoria:
+            return
+        self._memoria[clave] = (creado, resultado)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _borrar_disco(self, clave):
+        if self._db is not None:
+            self._db.execute("DELETE FROM transcripciones WHERE clave = ?", (clave,))
+
+    def _recortar_disco(self, ahora):
+        # Primero lo caducado, luego lo menos usado hasta quedar en `max_disco`
+        if self.ttl:
+            self._metricas["expirados"] += self._db.execute(
+                "DELETE FROM transcripciones WHERE creado <= ?", (ahora - self.ttl,)
+            ).rowcount
+        sobrantes = self._db.execute("SELECT COUNT(*) FROM transcripciones").fetchone()[0] - self.max_disco
+        if sobrantes > 0:
+            self._metricas["desalojados"] += self._db.execute(
+                "DELETE FROM transcripciones WHERE clave IN "
+                "(SELECT clave FROM transcripciones ORDER BY usado LIMIT ?)", (sobrantes,)
+            ).rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_transcription_cache():
+    """Caché compartida de transcripciones (None si TRANSCRIPTION_CACHE=False)."""
+    global _cache
+    if _cache is None and settings.TRANSCRIPTION_CACHE:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TranscriptionCache(
+                    settings.TRANSCRIPTION_CACHE_PATH,
+                    max_memoria=settings.TRANSCRIPTION_CACHE_MEMORY,
+                    max_disco=settings.TRANSCRIPTION_CACHE_MAX_ENTRIES,
+                    ttl=settings.TRANSCRIPTION_CACHE_TTL,
+                )
+    return _cache
@@ -1,26 +1,77 @@
 
-import os
+import threading
+from app.core.config import settings
+from app.automation.domain.automation_interface import VoiceToTextInterface
+from app.automation.infrastructure.model_residency import ModelResidency
+from app.automation.infrastructure.audio_stream import cargar_audio, iter_pcm, ventanas
 
-# 🔹 Asegurar que ffmpeg esté en el PATH (Windows)
-os.environ["PATH"] += os.pathsep + r"C:\Users\USER\ffmpeg-8.0-essentials_build\bin"
 
+def _cargar_whisper(model_size: str):
+    import whisper  # 👈 import solo cuando de verdad se carga un modelo
+    return whisper.load_model(model_size)
+
+
+_residency = None
+_residency_lock = threading.Lock()
+
+
+def get_whisper_residency() -> ModelResidency:
+    """Administrador compartido de los modelos Whisper cargados (uno por proceso)."""
+    global _residency
+    if _residency is None:
+        with _residency_lock:
+            if _residency is None:
+                _residency = ModelResidency(
+                    _cargar_whisper,
+                    permitidos=settings.WHISPER_MODELS,
+                    max_resident=settings.WHISPER_MAX_RESIDENT,
+                    idle_timeout=settings.WHISPER_IDLE_TIMEOUT,
+                    nombre="Whisper",
+                )
+    return _residency
 
-import whisper
-from app.automation.domain.automation_interface import VoiceToTextInterface
 
 class WhisperEngine(VoiceToTextInterface):
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = None, residency: ModelResidency = None):
         """
-        model_size puede ser: tiny, base, small, medium, large
+        model_size puede ser: tiny, base, small, medium, large (solo los de WHISPER_MODELS)
         - tiny/base → más rápido, menos preciso
         - medium/large → más preciso, más pesado
+        El modelo NO se carga aquí: se carga la primera vez que se transcribe.
         """
-        self.model = whisper.load_model(model_size)
+        self.residency = residency or get_whisper_residency()
+        self.model_size = self.residency.validar(model_size or settings.WHISPER_DEFAULT_MODEL)
 
-    def transcribe(self, audio_path: str) -> str:
-        result = self.model.transcribe(audio_path, language="es")
+    def transcribe(self, audio, model_size: str = None) -> str:
+        """`audio`: bytes subidos, ruta de archivo o array float32 a 16 kHz (se decodifica una sola vez)."""
+        muestras = cargar_audio(audio)
+        with self.residency.usar(model_size or self.model_size) as model:
+            result = model.transcribe(muestras, language=settings.WHISPER_LANGUAGE)
         return result["text"]
 
+    def transcribe_stream(self, audio, model_size: str = None, window_s: float = None,
+                          vad: bool = True, prompt_chars: int = 224):
+        """
+        Transcribe por ventanas y va entregando los segmentos (con tiempos absolutos) a medida que salen.
+        - El audio se decodifica por bloques: la memoria no depende de la duración.
+        - Cada ventana recibe como `initial_prompt` el final del texto anterior (continuidad entre ventanas).
+        """
+        window_s = window_s or settings.WHISPER_STREAM_WINDOW_S
+        contexto = ""
+        with self.residency.usar(model_size or self.model_size) as model:
+            for i, (inicio, muestras) in enumerate(ventanas(iter_pcm(audio), window_s=window_s, vad=vad)):
+                result = model.transcribe(muestras, language=settings.WHISPER_LANGUAGE, initial_prompt=contexto or None)
+                for seg in result["segments"]:
+                    texto = seg["text"].strip()
+                    if texto:
+                        yield {
+                            "window": i,
+                            "start": round(inicio + seg["start"], 2),
+                            "end": round(inicio + seg["end"], 2),
+                            "text": texto,
+                        }
+                contexto = (contexto + " " + result["text"].strip()).strip()[-prompt_chars:]
+
 
 """
 Implementación concreta de la interfaz `VoiceToTextInterface` usando el modelo Whisper.
@@ -31,16 +82,27 @@ Implementación concreta de la interfaz `VoiceToTextInterface` usando el modelo
   `transcribe`.
 
 Detalles:
-- En el constructor (`__init__`) se carga el modelo Whisper con un tamaño elegido:
+- En el constructor (`__init__`) solo se elige el tamaño por defecto; el modelo se carga
+  la primera vez que se usa (el arranque de la API no depende de Whisper):
     * "tiny" o "base" → más rápidos, pero menos precisos.
     * "small", "medium", "large" → más precisos, pero más pesados y lentos.
-- El modelo queda guardado en `self.model` para reutilizarlo sin volver a cargarlo.
+- Los modelos cargados los administra `ModelResidency`: se reutilizan entre peticiones,
+  se descartan por LRU (WHISPER_MAX_RESIDENT) o tras WHISPER_IDLE_TIMEOUT segundos sin uso.
 
-- En `transcribe(audio_path: str)`:
-    * Se pasa el archivo de audio a `self.model.transcribe`.
-    * Se indica `language="es"` para procesar directamente en español.
+- En `transcribe(audio, model_size=None)`:
+    * `audio` son los bytes subidos (o una ruta): `cargar_audio` los decodifica en memoria a
+      16 kHz mono float32 una sola vez (WAV sin procesos externos; el resto vía pipe a ffmpeg).
+    * Se puede pedir otro tamaño para esa transcripción (dentro de la lista blanca).
+    * Se pasa el array de audio a `model.transcribe` (Whisper ya no lanza su propio ffmpeg).
+    * Se indica `language=WHISPER_LANGUAGE` ("es" por defecto) para procesar directamente en español.
     * El método devuelve solo el texto final (`result["text"]`).
 
+- En `transcribe_stream(audio)` (audios largos):
+    * El audio se decodifica por bloques y se corta en ventanas de ~WHISPER_STREAM_WINDOW_S
+      segundos, buscando una pausa para no partir palabras.
+    * Cada ventana se transcribe en orden con el final del texto anterior como prompt.
+    * Es un generador: cada segmento (inicio, fin, texto) sale apenas está listo.
+
 Ventaja:
 - Como esta clase implementa la interfaz `VoiceToTextInterface`, puede reemplazarse por
   otro motor (Google Speech, Azure, etc.) sin modificar la lógica de negocio. Solo se cambia
@@ -1,9 +1,14 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Cargar variables del .env
 load_dotenv()
 
+# 📂 Carpeta app/: las rutas por defecto de datos y cachés se arman desde aquí (no desde el directorio
+# en el que se lance uvicorn, que crearía otra caché vacía)
+APP_DIR = Path(__file__).resolve().parent.parent
+
 class Settings:
     APP_NAME: str = os.getenv("APP_NAME", "MultiIA")
     APP_ENV: str = os.getenv("APP_ENV", "development")
@@ -13,5 +18,69 @@ class Settings:
     DEBUG: bool = os.getenv("DEBUG", "True") == "True"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "changeme")
 
+    # 👁️ Visión: micro-batching de YOLO (1 = sin batching)
+    VISION_BATCH_MAX_SIZE: int = int(os.getenv("VISION_BATCH_MAX_SIZE", 8))
+    VISION_BATCH_MAX_WAIT_MS: float = float(os.getenv("VISION_BATCH_MAX_WAIT_MS", 10))
+    # 👁️ Visión: guardar en disco (en segundo plano) las imágenes originales y procesadas
+    VISION_PERSIST_RAW: bool = os.getenv("VISION_PERSIST_RAW", "True") == "True"
+    VISION_PERSIST_PROCESSED: bool = os.getenv("VISION_PERSIST_PROCESSED", "True") == "True"
+    # 👁️ Visión: caché de resultados por hash de la imagen + versión del modelo (memoria + un JSON por clave en disco)
+    VISION_RESULT_CACHE: bool = os.getenv("VISION_RESULT_CACHE", "True") == "True"
+    VISION_RESULT_CACHE_DIR: str = os.getenv("VISION_RESULT_CACHE_DIR", str(APP_DIR / "vision" / "data" / "cache" / "results"))
+    VISION_RESULT_CACHE_MEMORY: int = int(os.getenv("VISION_RESULT_CACHE_MEMORY", 512))
+    VISION_RESULT_CACHE_MAX_FILES: int = int(os.getenv("VISION_RESULT_CACHE_MAX_FILES", 5000))
+    # 🩻 Validación de radiografías antes de YOLO: miniatura, tolerancia de color y umbrales del histograma
+    XRAY_GATE_THUMB_SIZE: int = int(os.getenv("XRAY_GATE_THUMB_SIZE", 128))
+    XRAY_GATE_CHROMA_TOL: int = int(os.getenv("XRAY_GATE_CHROMA_TOL", 6))
+    XRAY_GATE_HISTOGRAM: bool = os.getenv("XRAY_GATE_HISTOGRAM", "True") == "True"  # False = YOLO para toda imagen gris
+    XRAY_GATE_STD_MIN: float = float(os.getenv("XRAY_GATE_STD_MIN", 40))
+    XRAY_GATE_SYMMETRY_MIN: float = float(os.getenv("XRAY_GATE_SYMMETRY_MIN", 0.6))
+    XRAY_GATE_CENTER_RATIO: float = float(os.getenv("XRAY_GATE_CENTER_RATIO", 1.05))
+    # 🩻 Backend de inferencia del CNN de neumonía: eager | torchscript | onnx | int8
+    PNEUMONIA_BACKEND: str = os.getenv("PNEUMONIA_BACKEND", "eager")
+    # 📊 Gráficas: se dibujan en un proceso aparte y se cachean por hash de los datos
+    PLOT_CACHE_DIR: str = os.getenv("PLOT_CACHE_DIR", str(APP_DIR / "core" / "plots_cache"))
+    PLOT_WORKERS: int = int(os.getenv("PLOT_WORKERS", 1))
+    PLOT_CACHE_MAX_FILES: int = int(os.getenv("PLOT_CACHE_MAX_FILES", 2000))  # 0 = sin límite
+    # 🛒 ETL de recomendaciones en modo streaming
+    ETL_CHUNK_SIZE: int = int(os.getenv("ETL_CHUNK_SIZE", 100_000))
+    ETL_QUEUE_DEPTH: int = int(os.getenv("ETL_QUEUE_DEPTH", 4))
+    ETL_SNAPSHOTS: bool = os.getenv("ETL_SNAPSHOTS", "False") == "True"
+    # 🛒 ETL: las etapas se guardan en Parquet; el CSV es solo una exportación opcional
+    ETL_EXPORT_CSV: bool = os.getenv("ETL_EXPORT_CSV", "False") == "True"
+    # 🎙️ Whisper: modelos permitidos, cuántos pueden estar cargados a la vez y descarga por inactividad
+    WHISPER_MODELS: list = [m.strip() for m in os.getenv("WHISPER_MODELS", "tiny,base,small").split(",") if m.strip()]
+    WHISPER_DEFAULT_MODEL: str = os.getenv("WHISPER_DEFAULT_MODEL", "base")
+    WHISPER_MAX_RESIDENT: int = int(os.getenv("WHISPER_MAX_RESIDENT", 1))
+    WHISPER_IDLE_TIMEOUT: float = float(os.getenv("WHISPER_IDLE_TIMEOUT", 600))  # segundos; 0 = nunca
+    WHISPER_LANGUAGE: str = os.getenv("WHISPER_LANGUAGE", "es")
+    WHISPER_PRELOAD: list = [m.strip() for m in os.getenv("WHISPER_PRELOAD", "").split(",") if m.strip()]
+    # 🎙️ Cola de transcripciones: procesos trabajadores (cada uno con su Whisper) y pendientes máximos antes del 429
+    WHISPER_WORKERS: int = int(os.getenv("WHISPER_WORKERS", 2))
+    WHISPER_QUEUE_MAX: int = int(os.getenv("WHISPER_QUEUE_MAX", 16))
+    # 🎙️ Transcripción en streaming: duración aproximada de cada ventana de audio (segundos)
+    WHISPER_STREAM_WINDOW_S: float = float(os.getenv("WHISPER_STREAM_WINDOW_S", 30))
+    # 🎧 ffmpeg solo se usa para formatos que no son WAV (mp3, m4a, ogg...); debe estar en el PATH o dar la ruta
+    FFMPEG_BIN: str = os.getenv("FFMPEG_BIN", "ffmpeg")
+    # 🗂️ Caché de transcripciones por hash del audio: LRU en memoria + SQLite en disco, con caducidad
+    TRANSCRIPTION_CACHE: bool = os.getenv("TRANSCRIPTION_CACHE", "True") == "True"
+    TRANSCRIPTION_CACHE_PATH: str = os.getenv("TRANSCRIPTION_CACHE_PATH", str(APP_DIR / "automation" / "data" / "transcripciones.sqlite"))
+    TRANSCRIPTION_CACHE_MEMORY: int = int(os.getenv("TRANSCRIPTION_CACHE_MEMORY", 256))
+    TRANSCRIPTION_CACHE_MAX_ENTRIES: int = int(os.getenv("TRANSCRIPTION_CACHE_MAX_ENTRIES", 20_000))
+    TRANSCRIPTION_CACHE_TTL: float = float(os.getenv("TRANSCRIPTION_CACHE_TTL", 30 * 24 * 3600))  # segundos; 0 = nunca
+    # 🔌 Pool de conexiones a PostgreSQL (recomendaciones / ETL)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))  # segundos; -1 = nunca
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+    # 🧭 Recomendaciones: vecinos precalculados por producto en el índice item-item
+    RECO_TOP_K: int = int(os.getenv("RECO_TOP_K", 20))
+    # 🧭 Actualización incremental: compactar (reconstruir) cada N deltas o si lo nuevo supera esta fracción
+    RECO_COMPACT_EVERY: int = int(os.getenv("RECO_COMPACT_EVERY", 24))
+    RECO_COMPACT_RATIO: float = float(os.getenv("RECO_COMPACT_RATIO", 0.5))
+    # 📈 Popularidad: días en que el peso de una compra cae a la mitad
+    RECO_VIDA_MEDIA_DIAS: float = float(os.getenv("RECO_VIDA_MEDIA_DIAS", 14))
+
 # Instancia global de settings
 settings = Settings()
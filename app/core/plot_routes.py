@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+
+from app.core.plot_service import get_plot_service, PENDING, FAILED
+
+router = APIRouter(prefix="/plots", tags=["Gráficas"])
+
+
+@router.get(
+    "/{token}",
+    summary="Obtener una gráfica",
+    response_description="PNG de la gráfica, o 202 si todavía se está dibujando"
+)
+def get_plot(token: str):
+    """
+    Devuelve el PNG asociado a `token` (las URLs que entregan los endpoints de entrenamiento).
+
+    - **200**: la gráfica está lista.
+    - **202**: todavía se está dibujando; reintentar en un momento.
+    - **404**: el token no existe.
+    - **500**: falló el dibujo.
+    """
+    service = get_plot_service()
+    status = service.status(token)
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="Gráfica no encontrada")
+    if status == PENDING:
+        return JSONResponse(status_code=202, content={"status": PENDING}, headers={"Retry-After": "1"})
+    if status == FAILED:
+        raise HTTPException(status_code=500, detail=f"No se pudo dibujar la gráfica: {service.error(token)}")
+    return FileResponse(str(service.path(token)), media_type="image/png")
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+
+# Estados de una gráfica
+PENDING, READY, FAILED = "pending", "ready", "failed"
+
+
+# ─────────────────────────────────────────────
+# 🎨 Renderizadores (corren en el proceso de gráficas)
+# ─────────────────────────────────────────────
+# Cada uno recibe `spec` (solo datos: listas, arrays, textos) y la ruta del PNG.
+# matplotlib/sklearn se importan aquí adentro: el proceso de la API nunca toca pyplot.
+
+def _lines(plt, spec):
+    plt.figure(figsize=spec.get("figsize", (6.4, 4.8)))
+    for serie in spec["series"]:
+        plt.plot(serie["values"], label=serie.get("label"), marker=serie.get("marker"))
+    if any(s.get("label") for s in spec["series"]):
+        plt.legend()
+    if spec.get("grid"):
+        plt.grid()
+
+
+def _bar(plt, spec):
+    plt.figure(figsize=spec.get("figsize", (6, 6)))
+    plt.bar(spec["labels"], spec["values"], color=spec.get("colors"))
+
+
+def _confusion(plt, spec):
+    from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
+
+    cm = confusion_matrix(spec["y_true"], spec["y_pred"])
+    ConfusionMatrixDisplay(confusion_matrix=cm).plot(cmap=plt.cm.Blues)
+
+
+def _roc(plt, spec):
+    from sklearn.metrics import roc_curve, auc
+
+    fpr, tpr, _ = roc_curve(spec["y_true"], spec["y_score"])
+    plt.figure()
+    plt.plot(fpr, tpr, color="blue", lw=2, label=f"ROC (AUC={auc(fpr, tpr):.2f})")
+    plt.plot([0, 1], [0, 1], "--", color="gray")
+    plt.legend(loc="lower right")
+
+
+RENDERERS = {
+    "lines": _lines,
+    "bar": _bar,
+    "confusion": _confusion,
+    "roc": _roc,
+}
+
+
+def render_plot(kind: str, spec: dict, path) -> str:
+    """
+    Dibuja la gráfica `kind` con los datos de `spec` y la guarda en `path`.
+    Se puede llamar directo desde un proceso que ya corre fuera de la API (ej. el entrenamiento de neumonía).
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # sin interfaz gráfica
+    import matplotlib.pyplot as plt
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    try:
+        RENDERERS[kind](plt, spec)
+        if "title" in spec:
+            plt.title(spec["title"])
+        if "xlabel" in spec:
+            plt.xlabel(spec["xlabel"])
+        if "ylabel" in spec:
+            plt.ylabel(spec["ylabel"])
+        plt.tight_layout()
+        # Escribimos a un temporal y renombramos: nunca se sirve un PNG a medio escribir
+        tmp = f"{path}.tmp.png"
+        plt.savefig(tmp)
+        os.replace(tmp, path)
+    finally:
+        plt.close("all")
+    return str(path)
+
+
+def _render_job(kind, spec, path, copies):
+    render_plot(kind, spec, path)
+    for dest in copies:
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, f"{dest}.tmp")
+        os.replace(f"{dest}.tmp", dest)
+    return str(path)
+
+
+def plot_token(kind: str, spec: dict) -> str:
+    """Hash del tipo de gráfica + sus datos: mismas métricas → mismo PNG (y misma URL)."""
+    h = hashlib.sha256(kind.encode("utf-8"))
+    for key in sorted(spec):
+        value = spec[key]
+        h.update(key.encode("utf-8"))
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            h.update(f"{value.dtype}{value.shape}".encode("utf-8"))
+            h.update(value.tobytes())
+        else:
+            h.update(json.dumps(value, sort_keys=True, default=_to_json).encode("utf-8"))
+    return h.hexdigest()[:24]
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+# ─────────────────────────────────────────────
+# 🖼️ Servicio de gráficas
+# ─────────────────────────────────────────────
+class PlotService:
+    """
+    Renderiza gráficas fuera del camino de la petición.
+
+    - Los endpoints mandan solo los datos (`submit`) y reciben un token al instante.
+    - El PNG se dibuja en un proceso aparte (pool "spawn"), así pyplot nunca se usa
+      desde los hilos de la API.
+    - Caché por hash de los datos: si el PNG ya existe no se vuelve a dibujar.
+      Como máximo `max_files` PNGs (0 = sin límite): al pasarse se borran los usados hace más tiempo.
+    - `GET /plots/{token}` sirve el PNG cuando está listo (202 mientras tanto).
+    """
+
+    def __init__(self, cache_dir, max_workers: int = 1, max_files: int = 0):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_files = max(0, max_files)
+        self._en_disco = len(self._pngs())
+        self._max_workers = max_workers
+        self._executor = None  # se crea en el primer submit
+        self._futures = {}     # token → Future de los renders en curso
+        self._errors = {}      # token → mensaje de error
+        self._lock = threading.Lock()
+
+    def path(self, token: str) -> Path:
+        return self.cache_dir / f"{token}.png"
+
+    def submit(self, kind: str, spec: dict, copy_to=None) -> str:
+        """
+        Encola el render y devuelve su token (no espera a que se dibuje).
+        - copy_to: rutas donde además se deja una copia del PNG (las rutas "clásicas" de cada módulo).
+        """
+        if kind not in RENDERERS:
+            raise ValueError(f"Tipo de gráfica desconocido '{kind}'. Opciones: {', '.join(RENDERERS)}")
+
+        token = plot_token(kind, spec)
+        copies = [str(p) for p in ([copy_to] if isinstance(copy_to, (str, Path)) else copy_to or [])]
+        path = self.path(token)
+
+        with self._lock:
+            if token in self._futures:
+                return token  # ya se está dibujando
+
+            if path.exists():
+                # 🎯 Caché: solo hace falta refrescar las copias
+                os.utime(path)  # la fecha de modificación marca el último uso (para el recorte)
+                for dest in copies:
+                    Path(dest).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(path, dest)
+                return token
+
+            self._errors.pop(token, None)
+            future = self._submit_job(kind, spec, str(path), copies)
+            self._futures[token] = future
+
+        future.add_done_callback(lambda f, token=token: self._on_done(token, f))
+        return token
+
+    def status(self, token: str):
+        """PENDING, READY, FAILED o None si el token no existe."""
+        with self._lock:
+            if token in self._futures:
+                return PENDING
+            if token in self._errors:
+                return FAILED
+        return READY if self.path(token).exists() else None
+
+    def error(self, token: str):
+        return self._errors.get(token)
+
+    def wait(self, token: str, timeout: float = None):
+        """Bloquea hasta que la gráfica termine (útil en tests y scripts). Devuelve el estado final."""
+        with self._lock:
+            future = self._futures.get(token)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+        return self.status(token)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _submit_job(self, kind, spec, path, copies):
+        if self._executor is None:
+            # "spawn": proceso limpio, sin heredar hilos ni el estado de la API
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers, mp_context=mp.get_context("spawn"))
+        try:
+            return self._executor.submit(_render_job, kind, spec, path, copies)
+        except BrokenProcessPool:
+            # Si el proceso de gráficas murió, se levanta uno nuevo
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers, mp_context=mp.get_context("spawn"))
+            return self._executor.submit(_render_job, kind, spec, path, copies)
+
+    def _on_done(self, token, future):
+        error = future.exception()
+        with self._lock:
+            self._futures.pop(token, None)
+            if error is not None:
+                self._errors[token] = str(error)
+            else:
+                self._en_disco += 1
+                if self.max_files and self._en_disco > self.max_files:
+                    self._recortar_disco()
+        if error is not None:
+            print(f"⚠️ Error al dibujar la gráfica {token}:", error)
+
+    def _pngs(self):
+        # Sin los temporales de un render en curso (<token>.png.tmp.png)
+        return [p for p in self.cache_dir.glob("*.png") if not p.name.endswith(".tmp.png")]
+
+    def _recortar_disco(self):
+        # Con self._lock tomado. Se baja al 90% de una vez, así no se lista el directorio en cada render
+        archivos = sorted(self._pngs(), key=lambda p: p.stat().st_mtime)
+        sobrantes = archivos[:max(0, len(archivos) - int(self.max_files * 0.9))]
+        for path in sobrantes:
+            path.unlink(missing_ok=True)
+        self._en_disco = len(archivos) - len(sobrantes)
+
+
+_plot_service = None
+_plot_service_lock = threading.Lock()
+
+
+def get_plot_service() -> PlotService:
+    global _plot_service
+    if _plot_service is None:
+        with _plot_service_lock:
+            if _plot_service is None:
+                _plot_service = PlotService(
+                    settings.PLOT_CACHE_DIR, max_workers=settings.PLOT_WORKERS, max_files=settings.PLOT_CACHE_MAX_FILES
+                )
+    return _plot_service
+
+
+def plot_url(token: str) -> str:
+    return f"/plots/{token}"
@@ -11,7 +11,7 @@ def generar_graficas(save_plot=True):
     Si save_plot=False, no guarda imágenes (para los tests).
     """
     from app.nlp.domain.models import Comentario  # 👈 import solo cuando se llama
-    import matplotlib.pyplot as plt              # 👈 import solo cuando se llama
+    from app.core.plot_service import get_plot_service, plot_url
     from collections import Counter              # 👈 igual aquí
 
     db = SessionLocal()
@@ -26,18 +26,23 @@ def generar_graficas(save_plot=True):
     # Conteo de cada sentimiento
     conteo = Counter(sentimientos)
 
-    # 📊 Gráfica de barras
-    plt.figure(figsize=(6, 6))
-    plt.bar(conteo.keys(), conteo.values(), color=["green", "red", "blue"])
-    plt.title("Distribución de Sentimientos en Comentarios")
-    plt.xlabel("Sentimiento")
-    plt.ylabel("Cantidad")
-
     if save_plot:
+        # 📊 Gráfica de barras: se dibuja en el proceso de gráficas, aquí solo mandamos el conteo
         path = os.path.join(PLOTS_DIR, "sentimientos.png")
-        plt.savefig(path)
-        plt.close()
-        return {"msg": f"📊 Gráfico guardado en {path}", "conteo": dict(conteo)}
-
-    plt.close()
-    return {"conteo": dict(conteo)}
\ No newline at end of file
+        token = get_plot_service().submit("bar", {
+            "labels": list(conteo.keys()),
+            "values": list(conteo.values()),
+            "colors": ["green", "red", "blue"][:len(conteo)],
+            "figsize": [6, 6],
+            "title": "Distribución de Sentimientos en Comentarios",
+            "xlabel": "Sentimiento",
+            "ylabel": "Cantidad",
+        }, copy_to=path)
+        return {
+            "msg": f"📊 Gráfico en proceso, se guardará en {path}",
+            "conteo": dict(conteo),
+            "plot_token": token,
+            "plot_url": plot_url(token),
+        }
+
+    return {"conteo": dict(conteo)}
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from io import BytesIO
+from typing import Literal
+import pandas as pd
 from app.prediction.application.prediction_service import (
-    train_linear_model, predict_linear,
-    train_logistic_model, predict_logistic
+    train_linear_model, predict_linear, predict_linear_batch,
+    train_logistic_model, predict_logistic, predict_logistic_batch
 )
+from app.prediction.domain.schemas import LinearBatchRequest, LogisticBatchRequest
 
 # Definición del router de FastAPI
 
@@ -31,15 +36,19 @@ def root():
     summary="Entrenar modelo lineal",
     response_description="Métricas del entrenamiento (MSE, pérdida)"
 )
-def train_linear():
+def train_linear(
+    solver: Literal["lstsq", "sgd"] = Query("lstsq", description="lstsq = forma cerrada, sgd = descenso de gradiente"),
+    n_samples: int = Query(200, ge=10, le=5_000_000, description="Cantidad de gatos simulados")
+):
     """
     Entrena un modelo de **regresión lineal**.
     
     - **Objetivo**: Predecir el **peso de un gato (kg)** a partir de su tamaño.
     - **Datos simulados**: tamaños de gatos entre 20–60 cm.
-    - **Salida**: métricas del entrenamiento, como error cuadrático medio (MSE) y pérdida final.
+    - **Solver**: `lstsq` (mínimos cuadrados en forma cerrada, milisegundos) o `sgd` (el descenso de gradiente original).
+    - **Salida**: métricas del entrenamiento, como error cuadrático medio (MSE), pérdida final y tiempo de entrenamiento.
     """
-    return train_linear_model(save_plot=True)
+    return train_linear_model(save_plot=True, solver=solver, n_samples=n_samples)
 
 
 @router.get(
@@ -66,6 +75,38 @@ def predict_linear_endpoint(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post(
+    "/linear/predict-batch",
+    summary="Predecir peso en lote (JSON)",
+    response_description="NDJSON: una línea por gato con tamaño y peso estimado"
+)
+def predict_linear_batch_endpoint(payload: LinearBatchRequest):
+    """
+    Predice el **peso de muchos gatos** en una sola llamada.
+
+    - **Entrada**: `{"x": [42.0, 55.5, ...]}` (tamaños en cm, 15–125).
+    - **Salida**: stream NDJSON (`{"tamaño_cm": ..., "peso_pred_kg": ...}` por línea).
+      La versión del modelo va en el header `X-Model-Version`.
+    """
+    return _run_batch(predict_linear_batch, payload.x)
+
+
+@router.post(
+    "/linear/predict-batch/file",
+    summary="Predecir peso en lote (CSV/Parquet)",
+    response_description="NDJSON: una línea por gato con tamaño y peso estimado"
+)
+async def predict_linear_batch_file(
+    file: UploadFile = File(..., description="Archivo .csv o .parquet"),
+    column: str = Query("x", description="Columna con los tamaños en cm")
+):
+    """
+    Igual que `/linear/predict-batch`, pero leyendo los tamaños de una columna
+    de un archivo CSV o Parquet subido.
+    """
+    df = await _read_columns(file, [column])
+    return _run_batch(predict_linear_batch, df[column].to_numpy())
+
 # Regresión Logística
 
 @router.get(
@@ -73,7 +114,10 @@ def predict_linear_endpoint(
     summary="Entrenar modelo logístico",
     response_description="Métricas del entrenamiento (accuracy, F1, etc.)"
 )
-def train_logistic():
+def train_logistic(
+    solver: Literal["newton", "lbfgs", "sgd"] = Query("newton", description="newton = IRLS, lbfgs = L-BFGS, sgd = descenso de gradiente"),
+    n_samples: int = Query(500, ge=10, le=5_000_000, description="Cantidad de gatos simulados")
+):
     """
     Entrena un modelo de **regresión logística**.
     
@@ -81,9 +125,10 @@ def train_logistic():
     - **Características usadas (features)**:
         - velocidad del gato (0–20 m/s)
         - nivel de energía (0–1)
-    - **Salida**: métricas del modelo como accuracy, precision, recall y F1-score.
+    - **Solver**: `newton` (Newton-IRLS), `lbfgs` o `sgd` (el descenso de gradiente original).
+    - **Salida**: métricas del modelo como accuracy, precision, recall, F1-score y tiempo de entrenamiento.
     """
-    return train_logistic_model(save_plot=True)
+    return train_logistic_model(save_plot=True, solver=solver, n_samples=n_samples)
 
 @router.get(
     "/logistic/predict",
@@ -112,3 +157,75 @@ def predict_logistic_endpoint(
         raise HTTPException(status_code=404, detail="Modelo no entrenado")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/logistic/predict-batch",
+    summary="Predecir captura de ratón en lote (JSON)",
+    response_description="NDJSON: una línea por gato con probabilidad y clase"
+)
+def predict_logistic_batch_endpoint(payload: LogisticBatchRequest):
+    """
+    Predice para **muchos gatos** si atraparán al ratón en una sola llamada.
+
+    - **Entrada**: `{"x1": [velocidades...], "x2": [energías...]}` (mismo largo).
+    - **Salida**: stream NDJSON con `velocidad`, `energia`, `probabilidad` y `clase` por línea.
+      La versión del modelo va en el header `X-Model-Version`.
+    """
+    return _run_batch(predict_logistic_batch, payload.x1, payload.x2)
+
+
+@router.post(
+    "/logistic/predict-batch/file",
+    summary="Predecir captura de ratón en lote (CSV/Parquet)",
+    response_description="NDJSON: una línea por gato con probabilidad y clase"
+)
+async def predict_logistic_batch_file(
+    file: UploadFile = File(..., description="Archivo .csv o .parquet"),
+    col_x1: str = Query("x1", description="Columna con las velocidades (m/s)"),
+    col_x2: str = Query("x2", description="Columna con los niveles de energía")
+):
+    """
+    Igual que `/logistic/predict-batch`, pero leyendo las columnas
+    de un archivo CSV o Parquet subido.
+    """
+    df = await _read_columns(file, [col_x1, col_x2])
+    return _run_batch(predict_logistic_batch, df[col_x1].to_numpy(), df[col_x2].to_numpy())
+
+
+# Utilidades de lote
+
+def _run_batch(predict_fn, *columns):
+    """Ejecuta una predicción en lote y la devuelve como stream NDJSON."""
+    try:
+        result = predict_fn(*columns)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Modelo no entrenado")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = result.pop("model_version")
+    df = pd.DataFrame(result)
+    return StreamingResponse(
+        _ndjson_chunks(df),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": str(version), "X-Total-Rows": str(len(df))}
+    )
+
+
+def _ndjson_chunks(df: pd.DataFrame, chunk_size: int = 10_000):
+    # Serializamos por bloques (en C, vía pandas) para ir enviando mientras se genera
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size].to_json(orient="records", lines=True, force_ascii=False)
+        yield chunk.rstrip("\n") + "\n"
+
+
+async def _read_columns(file: UploadFile, columns):
+    """Lee solo las columnas pedidas de un CSV o Parquet subido."""
+    content = await file.read()
+    try:
+        if (file.filename or "").lower().endswith(".parquet"):
+            return pd.read_parquet(BytesIO(content), columns=columns)
+        return pd.read_csv(BytesIO(content), usecols=columns)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"No se pudo leer el archivo: {e}")
@@ -1,24 +1,28 @@
 import torch
-from torch import nn
 # 👉 Librería PyTorch para trabajar con tensores y redes neuronales.
 
 import math
 import os
+import time
+import numpy as np
 # 👉 Math = validaciones matemáticas (NaN, infinito).
 # 👉 OS = crear carpetas donde se guardan modelos y gráficas.
+# 👉 NumPy = validaciones vectorizadas para predicciones en lote.
 
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay, roc_curve, auc
 # 👉 Métricas de evaluación para el modelo logístico.
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-# 👉 Librería para graficar pérdida, matrices de confusión, curva ROC.
-# 👉 "Agg" = modo sin interfaz gráfica (evita errores en servidor).
+from app.core.plot_service import get_plot_service, plot_url
+# 👉 Las gráficas (pérdida, matriz de confusión, curva ROC) se dibujan en otro proceso:
+#    aquí solo se mandan los datos y se devuelve la URL donde quedará el PNG.
 
 from app.prediction.domain.models import LinearRegressor, LogisticRegressor
-from app.prediction.infrastructure.model_storage import save_model, load_model
+from app.prediction.application.solvers import (
+    generate_linear_data, generate_logistic_data, fit_linear, fit_logistic, load_into
+)
+# 👉 Solvers rápidos (forma cerrada, Newton, L-BFGS) y el SGD original como opción.
+from app.prediction.infrastructure.model_registry import registry
+# 👉 Registro en memoria: cada modelo se carga una vez y se recarga solo si cambia el .pth.
 
 
 # ===================== FUNCIÓN DE VALIDACIÓN =====================
@@ -33,6 +37,21 @@ def safe_float(value: float) -> float:
         raise ValueError(f"Valor no válido detectado: {value}")
     return float(value)
 
+def validar_rango(valores: np.ndarray, minimo: float, maximo: float, mensaje: str) -> np.ndarray:
+    """
+    Versión vectorizada de las validaciones: revisa TODO el arreglo de una vez.
+    - Rechaza NaN/infinito y valores fuera de [minimo, maximo].
+    - El error indica cuántos valores fallaron y los primeros índices.
+    """
+    valores = np.asarray(valores, dtype=np.float64).reshape(-1)
+    invalidos = ~np.isfinite(valores) | (valores < minimo) | (valores > maximo)
+    if invalidos.any():
+        indices = np.flatnonzero(invalidos)
+        raise ValueError(
+            f"{mensaje} {len(indices)} valor(es) inválido(s); primeros índices: {indices[:5].tolist()}"
+        )
+    return valores
+
 # ===================== RUTAS DE MODELOS Y PLOTS =====================
 
 LINEAR_MODEL_PATH = "app/prediction/infrastructure/models/linear_regression.pth"
@@ -45,57 +64,48 @@ os.makedirs(PLOT_DIR, exist_ok=True)
 
 # ===================== MODELO LINEAL =====================
 
-def train_linear_model(save_plot: bool = True):
+def train_linear_model(save_plot: bool = True, solver: str = "lstsq", n_samples: int = 200):
     """
     Entrena un modelo de regresión lineal para predecir el **peso del gato**
     a partir de su **tamaño**.
+    - solver: "lstsq" (forma cerrada, por defecto) o "sgd" (1000 pasos de descenso de gradiente).
+    - n_samples: cantidad de gatos simulados.
     """
     # --- 1. Datos simulados (20–60 cm, con ruido aleatorio) ---
-    x_raw = torch.linspace(20, 60, 200).unsqueeze(1)
-    x = (x_raw - x_raw.mean()) / x_raw.std()
-    y = (
-        0.18 * x_raw - 2
-        + 0.5 * torch.randn(200, 1)  # ruido normal
-        + 0.02 * (x_raw**1.5) / 100  # curva ligera
-    )
+    x, y = generate_linear_data(n_samples)
 
     # --- 2. Modelo y entrenamiento ---
-    model = LinearRegressor()
-    optim = torch.optim.SGD(model.parameters(), lr=0.001)
-    loss_fn = nn.MSELoss()
-
-    losses = []
-    for _ in range(1000):
-        pred = model(x)             # predicciones
-        loss = loss_fn(pred, y)     # error MSE
-
-        """
-        Qué valida: Que la función de pérdida no explote y devuelva NaN.
-        Por qué: a veces el gradiente se descontrola y el modelo “revienta”.
-        Protege: el proceso de entrenamiento.
-        """
-        if torch.isnan(loss):
-            raise ValueError("El entrenamiento produjo NaN en la pérdida")
-
-        optim.zero_grad()
-        loss.backward()
-        optim.step()
-        losses.append(loss.item())
-
-    # --- 3. Guardar modelo entrenado ---
+    inicio = time.perf_counter()
+    weight, bias, losses = fit_linear(x, y, solver=solver)
+    train_ms = 1000 * (time.perf_counter() - inicio)
+
+    """
+    Qué valida: Que la función de pérdida no explote y devuelva NaN.
+    Por qué: a veces el gradiente se descontrola y el modelo “revienta”.
+    Protege: el proceso de entrenamiento.
+    """
+    if math.isnan(losses[-1]):
+        raise ValueError("El entrenamiento produjo NaN en la pérdida")
+
+    model = load_into(LinearRegressor(), weight, bias)
+
+    # --- 3. Guardar modelo entrenado (y activarlo en el registro) ---
+    model_version = None
     if save_plot: 
-        save_model(model, LINEAR_MODEL_PATH)
-
-    # --- 4. Guardar gráfica de pérdidas ---
-    linear_plot_path = os.path.join(PLOT_DIR, "linear_loss.png") if save_plot else None
-    if save_plot:  # 👈 solo guarda si lo pedimos
-        plt.plot(losses)
-        plt.xlabel("Epoch")
-        plt.ylabel("MSE Loss")
-        plt.title("Evolución de la pérdida (Lineal)")
+        model_version = registry.publish(model, LINEAR_MODEL_PATH)
+
+    # --- 4. Encolar gráfica de pérdidas (se dibuja en segundo plano) ---
+    linear_plot_path = None
+    linear_plot_url = None
+    if save_plot:  # 👈 solo se dibuja si lo pedimos
         linear_plot_path = os.path.join(PLOT_DIR, "linear_loss.png")
-        plt.savefig(linear_plot_path)
-        plt.close()
+        token = get_plot_service().submit("lines", {
+            "series": [{"values": losses, "marker": "."}],  # con lstsq es un solo punto
+            "xlabel": "Iteración",
+            "ylabel": "MSE Loss",
+            "title": "Evolución de la pérdida (Lineal)",
+        }, copy_to=linear_plot_path)
+        linear_plot_url = plot_url(token)
 
     # --- 5. Retorno con métricas ---
     return {
@@ -103,7 +113,12 @@ def train_linear_model(save_plot: bool = True):
         "loss": safe_float(losses[-1]),
         "mse": safe_float(losses[-1]),
         "rmse": safe_float(math.sqrt(losses[-1])),
-        "plot_path": linear_plot_path
+        "solver": solver,
+        "n_samples": n_samples,
+        "train_ms": round(train_ms, 2),
+        "plot_path": linear_plot_path,
+        "plot_url": linear_plot_url,
+        "model_version": model_version
     }
 
 
@@ -116,8 +131,8 @@ def predict_linear(size: float):
     if size < 15 or size > 125:
         raise ValueError("El tamaño debe estar entre 15 y 125 cm.")
 
-    # --- Cargar modelo ---
-    model = load_model(LinearRegressor, LINEAR_MODEL_PATH)
+    # --- Obtener modelo (en memoria; solo se relee si cambió el archivo) ---
+    model, version = registry.get(LinearRegressor, LINEAR_MODEL_PATH)
     if model is None:
         raise FileNotFoundError("Modelo lineal no entrenado aún.")
 
@@ -128,40 +143,50 @@ def predict_linear(size: float):
         peso_pred = model(x_norm).item()
         return {
             "tamaño_cm": safe_float(size),
-            "peso_pred_kg": safe_float(max(peso_pred, 0.5))  # mínimo 0.5 kg
+            "peso_pred_kg": safe_float(max(peso_pred, 0.5)),  # mínimo 0.5 kg
+            "model_version": version
         }
 
+
+def predict_linear_batch(sizes):
+    """
+    Predice el peso de MUCHOS gatos con una sola pasada del modelo.
+    Devuelve columnas (arrays de NumPy) en lugar de un dict por gato.
+    """
+    sizes = validar_rango(sizes, 15, 125, "El tamaño debe estar entre 15 y 125 cm.")
+
+    model, version = registry.get(LinearRegressor, LINEAR_MODEL_PATH)
+    if model is None:
+        raise FileNotFoundError("Modelo lineal no entrenado aún.")
+
+    # Misma normalización que predict_linear, aplicada a todo el tensor [N,1]
+    x_norm = (torch.from_numpy(sizes.astype(np.float32)).unsqueeze(1) - 40) / 10
+    with torch.no_grad():
+        pesos = model(x_norm).squeeze(1).numpy()
+
+    return {
+        "tamaño_cm": sizes,
+        "peso_pred_kg": np.maximum(pesos, 0.5),  # mínimo 0.5 kg
+        "model_version": version
+    }
+
 # ===================== MODELO LOGÍSTICO =====================
-def train_logistic_model(save_plot: bool = True):
+def train_logistic_model(save_plot: bool = True, solver: str = "newton", n_samples: int = 500):
     """
     Entrena un modelo de regresión logística para predecir si un gato atrapa un ratón.
+    - solver: "newton" (IRLS, por defecto), "lbfgs" o "sgd" (500 pasos de descenso de gradiente).
+    - n_samples: cantidad de gatos simulados.
     """
     
-    # --- 1. Datos simulados ---
-    velocidad = torch.rand(500, 1) * 20
-    energia = torch.rand(500, 1)
-    # Condición base: velocidad * energia
-    base = velocidad * energia
-
-    # Le agregamos ruido y una condición "difusa"
-    y = ((base + 0.5 * torch.randn(500, 1)) > 3).float()
-
-    x = torch.cat([velocidad, energia], dim=1)
+    # --- 1. Datos simulados (velocidad * energía + ruido, condición "difusa") ---
+    x, y = generate_logistic_data(n_samples)
 
     # --- 2. Modelo y entrenamiento ---
-    model = LogisticRegressor()
-    optim = torch.optim.SGD(model.parameters(), lr=0.1)
-    loss_fn = nn.BCELoss()
+    inicio = time.perf_counter()
+    weight, bias, losses = fit_logistic(x, y, solver=solver)
+    train_ms = 1000 * (time.perf_counter() - inicio)
 
-
-    losses = []
-    for _ in range(500):
-        pred = model(x)
-        loss = loss_fn(pred, y)
-        optim.zero_grad()
-        loss.backward()
-        optim.step()
-        losses.append(loss.item())
+    model = load_into(LogisticRegressor(), weight, bias)
 
     # --- 3. Evaluación ---
     with torch.no_grad():
@@ -174,35 +199,38 @@ def train_logistic_model(save_plot: bool = True):
     rec = recall_score(y.numpy(), y_pred_class)
     f1 = f1_score(y.numpy(), y_pred_class)
 
-       # --- Gráficas y guardado opcionales ---
+    # --- Gráficas y guardado opcionales ---
     cm_plot_path = None
     roc_plot_path = None
+    plot_urls = {"confusion_matrix": None, "roc_curve": None}
+    model_version = None
 
     if save_plot:
-        # --- 5. Matriz de confusión ---
-        cm = confusion_matrix(y.numpy(), y_pred_class)
-        disp = ConfusionMatrixDisplay(confusion_matrix=cm)
-        disp.plot(cmap=plt.cm.Blues)
-        plt.title("Matriz de Confusión (Logístico)")
+        plots = get_plot_service()
+        y_true = y.numpy().reshape(-1).astype(np.uint8)
+
+        # --- 5. Matriz de confusión (en segundo plano) ---
         cm_plot_path = os.path.join(PLOT_DIR, "logistic_confusion.png")
-        plt.savefig(cm_plot_path)
-        plt.close()
-
-        # --- 6. Curva ROC ---
-        fpr, tpr, _ = roc_curve(y.numpy(), y_pred_prob)
-        roc_auc = auc(fpr, tpr)
-        plt.plot(fpr, tpr, color='blue', lw=2, label=f"ROC (AUC={roc_auc:.2f})")
-        plt.plot([0,1],[0,1],'--', color='gray')
-        plt.xlabel("False Positive Rate")
-        plt.ylabel("True Positive Rate")
-        plt.title("Curva ROC (Logístico)")
-        plt.legend(loc="lower right")
+        token = plots.submit("confusion", {
+            "y_true": y_true,
+            "y_pred": y_pred_class.reshape(-1).astype(np.uint8),
+            "title": "Matriz de Confusión (Logístico)",
+        }, copy_to=cm_plot_path)
+        plot_urls["confusion_matrix"] = plot_url(token)
+
+        # --- 6. Curva ROC (en segundo plano) ---
         roc_plot_path = os.path.join(PLOT_DIR, "logistic_roc.png")
-        plt.savefig(roc_plot_path)
-        plt.close()
-
-        # --- 7. Guardar modelo ---
-        save_model(model, LOGISTIC_MODEL_PATH)
+        token = plots.submit("roc", {
+            "y_true": y_true,
+            "y_score": y_pred_prob.reshape(-1),
+            "xlabel": "False Positive Rate",
+            "ylabel": "True Positive Rate",
+            "title": "Curva ROC (Logístico)",
+        }, copy_to=roc_plot_path)
+        plot_urls["roc_curve"] = plot_url(token)
+
+        # --- 7. Guardar modelo (y activarlo en el registro) ---
+        model_version = registry.publish(model, LOGISTIC_MODEL_PATH)
 
     # --- 8. Retorno ---
     return {
@@ -212,10 +240,15 @@ def train_logistic_model(save_plot: bool = True):
         "precision": safe_float(prec),
         "recall": safe_float(rec),
         "f1_score": safe_float(f1),
+        "solver": solver,
+        "n_samples": n_samples,
+        "train_ms": round(train_ms, 2),
         "plots": {
             "confusion_matrix": cm_plot_path,
             "roc_curve": roc_plot_path
-        }
+        },
+        "plot_urls": plot_urls,
+        "model_version": model_version
     }
 
 def predict_logistic(x1: float, x2: float):
@@ -234,7 +267,7 @@ def predict_logistic(x1: float, x2: float):
     Qué valida: Que el modelo ya esté entrenado y guardado.
     Por qué: si intentas predecir sin entrenar primero → lanza error claro.
     """
-    model = load_model(LogisticRegressor, LOGISTIC_MODEL_PATH)
+    model, version = registry.get(LogisticRegressor, LOGISTIC_MODEL_PATH)
     if model is None:
         raise FileNotFoundError("Modelo logístico no entrenado aún.")
 
@@ -246,5 +279,32 @@ def predict_logistic(x1: float, x2: float):
             "velocidad": safe_float(x1),
             "energia": safe_float(x2),
             "probabilidad": safe_float(prob),
-            "clase": clase # 0=no atrapa, 1=atrapa
-        } 
+            "clase": clase, # 0=no atrapa, 1=atrapa
+            "model_version": version
+        }
+
+
+def predict_logistic_batch(x1, x2):
+    """
+    Predice para MUCHOS gatos si atrapan al ratón, con una sola pasada del modelo.
+    Devuelve columnas (arrays de NumPy) en lugar de un dict por gato.
+    """
+    x1 = validar_rango(x1, 0, 20, "La velocidad debe estar entre 0 y 20 m/s.")
+    x2 = validar_rango(x2, 0, 1, "La energía debe estar entre 0 y 1.")
+    if len(x1) != len(x2):
+        raise ValueError("x1 y x2 deben tener la misma cantidad de valores.")
+
+    model, version = registry.get(LogisticRegressor, LOGISTIC_MODEL_PATH)
+    if model is None:
+        raise FileNotFoundError("Modelo logístico no entrenado aún.")
+
+    with torch.no_grad():
+        probs = model(torch.from_numpy(np.stack([x1, x2], axis=1).astype(np.float32))).squeeze(1).numpy()
+
+    return {
+        "velocidad": x1,
+        "energia": x2,
+        "probabilidad": probs,
+        "clase": (probs >= 0.5).astype(np.int8),  # 0=no atrapa, 1=atrapa
+        "model_version": version
+    }
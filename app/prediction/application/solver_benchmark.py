@@ -0,0 +1,62 @@
+import argparse
+import time
+
+import torch
+
+from app.prediction.application.solvers import (
+    LINEAR_SOLVERS, LOGISTIC_SOLVERS,
+    generate_linear_data, generate_logistic_data, fit_linear, fit_logistic
+)
+
+DEFAULT_SIZES = (200, 10_000, 1_000_000)
+
+
+def benchmark_solvers(sizes=DEFAULT_SIZES, repeats: int = 3, seed: int = 0, include_sgd: bool = True):
+    """
+    Mide cada solver sobre datos simulados de distintos tamaños.
+    Devuelve una lista de filas {modelo, solver, n_samples, wall_ms, loss};
+    `wall_ms` es la mejor de `repeats` corridas (sin contar la generación de datos).
+    """
+    casos = [
+        ("linear", generate_linear_data, fit_linear, LINEAR_SOLVERS),
+        ("logistic", generate_logistic_data, fit_logistic, LOGISTIC_SOLVERS),
+    ]
+    rows = []
+    for n in sizes:
+        for modelo, generate, fit, solvers in casos:
+            x, y = generate(n, generator=torch.Generator().manual_seed(seed))
+            for solver in solvers:
+                if solver == "sgd" and not include_sgd:
+                    continue
+                tiempos = []
+                for _ in range(repeats):
+                    torch.manual_seed(seed)  # misma inicialización de pesos para SGD/L-BFGS
+                    inicio = time.perf_counter()
+                    _, _, losses = fit(x, y, solver=solver)
+                    tiempos.append(1000 * (time.perf_counter() - inicio))
+                rows.append({
+                    "modelo": modelo,
+                    "solver": solver,
+                    "n_samples": n,
+                    "wall_ms": min(tiempos),
+                    "loss": losses[-1],
+                })
+    return rows
+
+
+def print_report(rows):
+    print(f"{'modelo':10s} {'solver':8s} {'n_samples':>10s} {'wall_ms':>10s} {'loss':>10s}")
+    for r in rows:
+        print(f"{r['modelo']:10s} {r['solver']:8s} {r['n_samples']:>10d} {r['wall_ms']:>10.2f} {r['loss']:>10.5f}")
+
+
+if __name__ == "__main__":
+    # python -m app.prediction.application.solver_benchmark --sizes 200 10000 1000000
+    parser = argparse.ArgumentParser(description="Tiempo y pérdida final de cada solver de los modelos de predicción")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-sgd", action="store_true", help="Omitir SGD (lento con millones de filas)")
+    args = parser.parse_args()
+
+    print_report(benchmark_solvers(args.sizes, args.repeats, args.seed, include_sgd=not args.no_sgd))
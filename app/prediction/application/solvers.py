@@ -0,0 +1,147 @@
+import torch
+from torch import nn
+import torch.nn.functional as F
+
+# 👉 Solvers de entrenamiento para los modelos de predicción.
+# 👉 Todos reciben tensores completos (sin mini-lotes) y devuelven (pesos, sesgo, pérdidas),
+#    listos para copiarse en la capa `linear` de LinearRegressor / LogisticRegressor.
+
+LINEAR_SOLVERS = ("lstsq", "sgd")
+LOGISTIC_SOLVERS = ("newton", "lbfgs", "sgd")
+
+
+# ===================== DATOS SIMULADOS =====================
+
+def generate_linear_data(n_samples: int = 200, generator: torch.Generator = None):
+    """
+    Tamaños de gato (20–60 cm) y su peso con ruido, igual que el entrenamiento original.
+    Devuelve (x normalizado [N,1], y [N,1]).
+    """
+    x_raw = torch.linspace(20, 60, n_samples).unsqueeze(1)
+    x = (x_raw - x_raw.mean()) / x_raw.std()
+    y = (
+        0.18 * x_raw - 2
+        + 0.5 * torch.randn(n_samples, 1, generator=generator)  # ruido normal
+        + 0.02 * (x_raw**1.5) / 100                             # curva ligera
+    )
+    return x, y
+
+
+def generate_logistic_data(n_samples: int = 500, generator: torch.Generator = None):
+    """
+    (velocidad, energía) aleatorias y si el gato atrapa al ratón.
+    Devuelve (x [N,2], y [N,1] con 0/1).
+    """
+    velocidad = torch.rand(n_samples, 1, generator=generator) * 20
+    energia = torch.rand(n_samples, 1, generator=generator)
+    base = velocidad * energia
+    y = ((base + 0.5 * torch.randn(n_samples, 1, generator=generator)) > 3).float()
+    return torch.cat([velocidad, energia], dim=1), y
+
+
+# ===================== REGRESIÓN LINEAL =====================
+
+def fit_linear(x: torch.Tensor, y: torch.Tensor, solver: str = "lstsq", epochs: int = 1000, lr: float = 0.001):
+    """
+    - lstsq: mínimos cuadrados en forma cerrada (una sola factorización, sin autograd).
+    - sgd:   el descenso de gradiente original (`epochs` pasos con `lr`).
+    """
+    if solver == "lstsq":
+        # Columna de unos para el sesgo; float64 para que la solución sea estable con millones de filas
+        design = torch.cat([x, torch.ones_like(x)], dim=1).double()
+        coef = torch.linalg.lstsq(design, y.double()).solution.reshape(-1)
+        weight, bias = coef[:-1].float().unsqueeze(0), coef[-1:].float()
+        with torch.no_grad():
+            loss = F.mse_loss(x @ weight.T + bias, y).item()
+        return weight, bias, [loss]
+
+    if solver == "sgd":
+        layer = nn.Linear(x.shape[1], 1)
+        optim = torch.optim.SGD(layer.parameters(), lr=lr)
+        losses = []
+        for _ in range(epochs):
+            loss = F.mse_loss(layer(x), y)
+            if torch.isnan(loss):
+                raise ValueError("El entrenamiento produjo NaN en la pérdida")
+            optim.zero_grad()
+            loss.backward()
+            optim.step()
+            losses.append(loss.item())
+        return layer.weight.detach(), layer.bias.detach(), losses
+
+    raise ValueError(f"Solver lineal desconocido '{solver}'. Opciones: {', '.join(LINEAR_SOLVERS)}")
+
+
+# ===================== REGRESIÓN LOGÍSTICA =====================
+
+def _bce(x, y, weight, bias) -> float:
+    # BCE a partir de los logits: estable aunque la probabilidad quede en 0 o 1
+    with torch.no_grad():
+        return F.binary_cross_entropy_with_logits(x @ weight.T + bias, y).item()
+
+
+def fit_logistic(x: torch.Tensor, y: torch.Tensor, solver: str = "newton",
+                 epochs: int = 500, lr: float = 0.1, tol: float = 1e-8):
+    """
+    - newton: Newton-IRLS; con 3 parámetros cada paso resuelve un sistema 3x3 (converge en ~10 pasos).
+    - lbfgs:  torch.optim.LBFGS con búsqueda de línea sobre el lote completo.
+    - sgd:    el descenso de gradiente original (`epochs` pasos con `lr`).
+    """
+    if solver == "newton":
+        design = torch.cat([x, torch.ones(len(x), 1, dtype=x.dtype)], dim=1).double()
+        target = y.double().reshape(-1)
+        coef = torch.zeros(design.shape[1], dtype=torch.float64)
+        ridge = 1e-6 * torch.eye(design.shape[1], dtype=torch.float64)  # evita un Hessiano singular
+        losses = []
+        for _ in range(100):
+            p = torch.sigmoid(design @ coef)
+            grad = design.T @ (p - target)
+            hess = (design * (p * (1 - p)).unsqueeze(1)).T @ design + ridge
+            step = torch.linalg.solve(hess, grad)
+            coef -= step
+            losses.append(F.binary_cross_entropy_with_logits(design @ coef, target).item())
+            if step.abs().max() < tol:
+                break
+        return coef[:-1].float().unsqueeze(0), coef[-1:].float(), losses
+
+    if solver == "lbfgs":
+        layer = nn.Linear(x.shape[1], 1)
+        optim = torch.optim.LBFGS(layer.parameters(), lr=1, max_iter=100,
+                                  tolerance_grad=1e-7, line_search_fn="strong_wolfe")
+        losses = []
+
+        def closure():
+            optim.zero_grad()
+            loss = F.binary_cross_entropy_with_logits(layer(x), y)
+            loss.backward()
+            losses.append(loss.item())
+            return loss
+
+        optim.step(closure)
+        weight, bias = layer.weight.detach(), layer.bias.detach()
+        losses.append(_bce(x, y, weight, bias))
+        return weight, bias, losses
+
+    if solver == "sgd":
+        # Igual que antes: sigmoid + BCELoss sobre el modelo completo
+        layer = nn.Linear(x.shape[1], 1)
+        optim = torch.optim.SGD(layer.parameters(), lr=lr)
+        loss_fn = nn.BCELoss()
+        losses = []
+        for _ in range(epochs):
+            loss = loss_fn(torch.sigmoid(layer(x)), y)
+            optim.zero_grad()
+            loss.backward()
+            optim.step()
+            losses.append(loss.item())
+        return layer.weight.detach(), layer.bias.detach(), losses
+
+    raise ValueError(f"Solver logístico desconocido '{solver}'. Opciones: {', '.join(LOGISTIC_SOLVERS)}")
+
+
+def load_into(model: nn.Module, weight: torch.Tensor, bias: torch.Tensor) -> nn.Module:
+    """Copia los parámetros encontrados por el solver en la capa `linear` del modelo."""
+    with torch.no_grad():
+        model.linear.weight.copy_(weight.reshape(model.linear.weight.shape))
+        model.linear.bias.copy_(bias.reshape(model.linear.bias.shape))
+    return model
@@ -0,0 +1,11 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+# 📝 Lote de tamaños de gato (cm) para el modelo lineal (request)
+class LinearBatchRequest(BaseModel):
+    x: List[float] = Field(..., min_length=1, description="Tamaños del gato en cm (15–125)")
+
+# 📝 Lote de (velocidad, energía) para el modelo logístico (request)
+class LogisticBatchRequest(BaseModel):
+    x1: List[float] = Field(..., min_length=1, description="Velocidades del gato en m/s (0–20)")
+    x2: List[float] = Field(..., min_length=1, description="Niveles de energía del gato (0–1)")
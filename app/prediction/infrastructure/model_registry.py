@@ -0,0 +1,97 @@
+import hashlib
+import io
+import threading
+from pathlib import Path
+
+import torch
+
+from app.prediction.infrastructure.model_storage import save_model
+
+
+class _Entry:
+    """Modelo cargado en memoria + de qué versión del archivo salió."""
+
+    def __init__(self, model, version: str, signature):
+        self.model = model
+        self.version = version        # hash (sha256 abreviado) del .pth
+        self.signature = signature    # (mtime_ns, tamaño) del .pth cuando se cargó
+
+
+class ModelRegistry:
+    """
+    Registro de modelos a nivel de proceso.
+
+    - Cada modelo se carga UNA vez y queda en memoria (no hay torch.load por petición).
+    - En cada `get` solo se hace un `stat` del .pth: si cambió su fecha/tamaño se
+      recalcula el hash y, si el contenido es otro, se carga la nueva versión.
+    - El reemplazo es atómico: se arma el modelo nuevo completo y luego se cambia
+      la referencia; las peticiones en curso terminan con el modelo anterior.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_cls, path: str):
+        """
+        Devuelve (modelo, versión) del archivo `path`,
+        o (None, None) si el modelo no está entrenado/guardado.
+        """
+        key = str(Path(path).resolve())
+        try:
+            st = Path(path).stat()
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            return None, None
+
+        signature = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(key)
+        if entry is not None and entry.signature == signature:
+            return entry.model, entry.version  # camino rápido: sin I/O ni locks
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.signature != signature:
+                entry = self._load(model_cls, path, signature, entry)
+                self._entries[key] = entry
+            return entry.model, entry.version
+
+    def publish(self, model, path: str) -> str:
+        """
+        Guarda un modelo recién entrenado y lo deja activo de inmediato
+        (sin volver a leerlo del disco). Devuelve la nueva versión.
+        """
+        data = save_model(model, path)  # escritura atómica (temporal + os.replace)
+        st = Path(path).stat()
+        model.eval()
+
+        entry = _Entry(model, _version_of(data), (st.st_mtime_ns, st.st_size))
+        with self._lock:
+            self._entries[str(Path(path).resolve())] = entry
+        return entry.version
+
+    def version(self, path: str):
+        entry = self._entries.get(str(Path(path).resolve()))
+        return entry.version if entry is not None else None
+
+    def _load(self, model_cls, path, signature, previous):
+        data = Path(path).read_bytes()
+        version = _version_of(data)
+
+        # Cambió la fecha pero no el contenido (ej. `touch`): mismo modelo
+        if previous is not None and previous.version == version:
+            return _Entry(previous.model, version, signature)
+
+        model = model_cls()
+        model.load_state_dict(torch.load(io.BytesIO(data)))
+        model.eval()
+        print(f"🔄 Modelo {model_cls.__name__} cargado (versión {version})")
+        return _Entry(model, version, signature)
+
+
+def _version_of(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+# Instancia única compartida por todo el proceso
+registry = ModelRegistry()
@@ -1,3 +1,7 @@
+import io
+import os
+import tempfile
+
 import torch
 from pathlib import Path  # Path = mapa para encontrar la casita del gato (nuestro modelo)
 
@@ -7,14 +11,30 @@ def save_model(model, path: str):
     Guarda los pesos del modelo en el disco.
     - model: modelo de PyTorch que queremos guardar
     - path: ruta donde se guardará el modelo
+    Retorna: los bytes escritos (para calcular la versión sin volver a leer el archivo)
     """
     
     # Nos aseguramos de que la carpeta donde guardaremos el modelo exista
     # Si no existe, la creamos (parents=True crea todas las carpetas necesarias)
-    Path(path).parent.mkdir(parents=True, exist_ok=True)  # 🐱 preparamos la casita del gato
+    carpeta = Path(path).parent
+    carpeta.mkdir(parents=True, exist_ok=True)  # 🐱 preparamos la casita del gato
     
     # Guardamos solo los parámetros del modelo (pesos y sesgos)
-    torch.save(model.state_dict(), path)  # guardamos al gato dentro de su casita
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    data = buffer.getvalue()
+
+    # Temporal en la misma carpeta + os.replace (atómico): quien lea el .pth
+    # (ej. el ModelRegistry de otro proceso) ve el archivo viejo o el nuevo, nunca uno a medio escribir
+    fd, tmp = tempfile.mkstemp(dir=carpeta, prefix=f".{Path(path).name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # guardamos al gato dentro de su casita
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return data
 
 
 def load_model(model_cls, path: str):
@@ -1,17 +1,31 @@
-from fastapi import APIRouter
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.recomendation.application.etl.extract_service import generar_dataset
 from app.recomendation.application.etl.transform_service import transform_data
 from app.recomendation.application.etl.load_service import load_data
 from app.recomendation.application.etl.etl_pipeline import run_etl_pipeline
+from app.recomendation.application.etl.streaming_pipeline import run_etl_streaming
+from app.recomendation.application.recommendation_service import actualizar_indice, construir_indice, get_item_index, refrescar_tras_carga
+from app.recomendation.infrastructure.compras_storage import get_compras_storage
+from app.recomendation.application.popularity_service import populares, trending
+from app.recomendation.infrastructure.db_connection import estado_pool, get_conexion
+from app.recomendation.domain.models import IndiceInfo, RecomendacionesResponse, SimilaresResponse, TrendingResponse
 
 
 router = APIRouter(prefix="/recomendation", tags=["Recomendation"])
 
 @router.post("/generate-data")
-def generar_datos(cantidad: int = 3000):
-    """Genera datos sintéticos de compras"""
-    ruta = generar_dataset(cantidad)
-    return {"message": f"Dataset generado con {cantidad} registros", "archivo": ruta}
+def generar_datos(
+    cantidad: int = Query(3000, ge=1, le=100_000_000, description="Cantidad de compras a generar"),
+    seed: Optional[int] = Query(None, description="Semilla: con la misma semilla se genera el mismo archivo"),
+    chunk_size: int = Query(100_000, ge=1_000, le=2_000_000, description="Filas por bloque escrito a Parquet")
+):
+    """
+    Genera datos sintéticos de compras.
+    Se escriben por bloques, así que acepta volúmenes de prueba de carga (decenas de millones de filas).
+    """
+    ruta = generar_dataset(cantidad, seed=seed, chunk_size=chunk_size)
+    return {"message": f"Dataset generado con {cantidad} registros", "archivo": ruta, "seed": seed}
 
 @router.post("/transform-data")
 def transformar_datos():
@@ -19,18 +33,147 @@ def transformar_datos():
     return {"message": "Transformación completada", "archivo": ruta}
 
 @router.post("/load-data")
-def cargar_datos():
+def cargar_datos(
+    modo: Literal["reemplazar", "upsert"] = Query("reemplazar", description="reemplazar = staging + swap atómico, upsert = incremental por id_compra")
+):
     """
-    Carga los datos limpios (compras_clean.csv) en PostgreSQL.
+    Carga los datos limpios (Parquet, etapa "clean") en PostgreSQL con COPY.
     """
-    resultado = load_data()
+    resultado = load_data(modo=modo)
+    refrescar_tras_carga(modo)  # upsert: el índice de recomendaciones solo suma las compras nuevas
     return {"message": resultado}
 
 
+@router.post("/export-csv")
+def exportar_csv(
+    etapa: Literal["raw", "clean", "processed"] = Query("processed", description="Etapa del ETL a exportar")
+):
+    """
+    Exporta una etapa del ETL (guardada en Parquet) a CSV, para abrirla en Excel o compartirla.
+    """
+    storage = get_compras_storage()
+    if not storage.exists(etapa):
+        raise HTTPException(status_code=404, detail=f"No hay datos de la etapa '{etapa}'. Ejecuta el ETL primero.")
+    ruta = storage.exportar_csv(etapa, storage.base_dir.parent / etapa / f"compras_{etapa}.csv")
+    return {"message": f"Etapa '{etapa}' exportada a CSV", "archivo": ruta}
+
+
 @router.post("/run-etl")
-def ejecutar_pipeline():
+def ejecutar_pipeline(
+    streaming: bool = Query(False, description="Procesar por bloques en memoria constante (sin CSV intermedios obligatorios)"),
+    cantidad: int = Query(30000, ge=1, le=100_000_000, description="Compras a generar (solo modo streaming)"),
+    seed: Optional[int] = Query(None, description="Semilla del generador (solo modo streaming)"),
+    chunk_size: Optional[int] = Query(None, ge=1_000, le=2_000_000, description="Filas por bloque (por defecto ETL_CHUNK_SIZE)"),
+    queue_depth: Optional[int] = Query(None, ge=1, le=64, description="Bloques en cola entre etapas (por defecto ETL_QUEUE_DEPTH)"),
+    snapshots: Optional[bool] = Query(None, description="Guardar también raw/clean/processed en Parquet (por defecto ETL_SNAPSHOTS)"),
+    modo: Literal["reemplazar", "upsert"] = Query("reemplazar", description="Carga: reemplazar (staging + swap) o upsert (incremental por id_compra)")
+):
     """
     Ejecuta todo el pipeline ETL (Extract → Transform → Load).
+
+    - **Modo archivos** (por defecto): cada fase lee y escribe su etapa en Parquet particionado por mes.
+    - **Modo streaming** (`streaming=true`): los bloques fluyen por las tres fases a la vez
+      con colas acotadas; la memoria no depende del tamaño del dataset.
+    """
+    if streaming:
+        resumen = run_etl_streaming(cantidad, seed=seed, chunk_size=chunk_size,
+                                    queue_depth=queue_depth, snapshots=snapshots, modo=modo)
+        refrescar_tras_carga(modo)
+        return {"message": "Pipeline ETL por bloques completado con éxito.", **resumen}
+
+    resultado = run_etl_pipeline(modo=modo)
+    refrescar_tras_carga(modo)
+    return {"message": resultado}
+
+
+# ==================== RECOMENDACIONES (índice item-item) ====================
+
+@router.post("/index/build", response_model=IndiceInfo)
+def construir_indice_recomendaciones():
+    """
+    Reconstruye el índice item-item desde la tabla de compras.
+    También se construye solo en la primera consulta después de cargar datos.
+    """
+    return construir_indice().info()
+
+
+@router.post("/index/update", response_model=IndiceInfo)
+def actualizar_indice_recomendaciones():
+    """
+    Aplica al índice solo las compras con id_compra posterior a su marca de agua.
+    Cada cierto número de actualizaciones se compacta (reconstrucción completa).
+    """
+    return actualizar_indice().info()
+
+
+@router.get("/items/{producto}/similar", response_model=SimilaresResponse)
+def productos_similares(
+    producto: str,
+    n: int = Query(10, ge=1, le=100, description="Cantidad de productos similares")
+):
+    """
+    Productos que suelen comprar los mismos clientes (similitud coseno precalculada).
+    """
+    try:
+        similares = get_item_index().similares(producto, n=n)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"producto": producto, "similares": similares}
+
+
+@router.get("/clientes/{cliente}/recommend", response_model=RecomendacionesResponse)
+def recomendar_cliente(
+    cliente: str,
+    n: int = Query(10, ge=1, le=100, description="Cantidad de recomendaciones")
+):
+    """
+    Recomienda productos que el cliente aún no ha comprado, a partir de los vecinos
+    de los productos que ya compró.
+    Cold-start: si el cliente es nuevo (o no hay vecinos) se usan los productos más populares,
+    leídos de la tabla precalculada `popularidad_productos` (nunca de `compras`).
+    """
+    indice = get_item_index()
+    try:
+        comprados = indice.productos[indice.comprados(cliente)]
+        recomendaciones = indice.recomendar(cliente, n=n)
+    except KeyError:
+        comprados, recomendaciones = [], []
+    if recomendaciones:
+        return {"cliente": cliente, "comprados": len(comprados), "recomendaciones": recomendaciones}
+
+    try:
+        recomendaciones = populares(n=n, excluir=comprados)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Sin recomendaciones para '{cliente}': {e}")
+    return {"cliente": cliente, "comprados": len(comprados), "fuente": "popularidad",
+            "recomendaciones": recomendaciones}
+
+
+@router.get("/trending", response_model=TrendingResponse)
+def productos_en_tendencia(
+    categoria: Optional[str] = Query(None, description="Filtrar por categoría (ej. Bebidas)"),
+    window: int = Query(30, ge=1, le=3650, description="Días hacia atrás desde el último día con compras"),
+    n: int = Query(10, ge=1, le=100, description="Cantidad de productos"),
+    conexion=Depends(get_conexion)
+):
+    """
+    Productos y categorías en tendencia: compras e ingresos de la ventana y un score
+    con decaimiento exponencial (vida media RECO_VIDA_MEDIA_DIAS).
+    Se calcula sobre la tabla resumen `compras_diarias`, que se actualiza en cada carga.
+    """
+    try:
+        resultado = trending(conexion, categoria=categoria, window=window, n=n)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"No hay agregados todavía. Ejecuta el ETL primero: {e}")
+    return {"categoria": categoria, "window": window, **resultado}
+
+
+# ==================== BASE DE DATOS ====================
+
+@router.get("/db/pool")
+def metricas_pool():
+    """
+    Estado del pool de conexiones compartido: conexiones en uso/libres, overflow,
+    checkouts, tiempo de espera (promedio y máximo), timeouts y conexiones físicas abiertas.
     """
-    resultado = run_etl_pipeline()
-    return {"message": resultado}
\ No newline at end of file
+    return estado_pool()
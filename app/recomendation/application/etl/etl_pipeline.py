@@ -3,10 +3,11 @@ from app.recomendation.application.etl.extract_service import generar_dataset
 from app.recomendation.application.etl.transform_service import transform_data
 from app.recomendation.application.etl.load_service import load_data
 
-def run_etl_pipeline():
+def run_etl_pipeline(modo: str = "reemplazar"):
     """
     Ejecuta el pipeline completo ETL (Extract → Transform → Load).
     Cada fase se ejecuta de forma secuencial y segura.
+    - modo: carga "reemplazar" (staging + swap) o "upsert" (incremental por id_compra).
     """
 
     print("\n INICIANDO PIPELINE ETL COMPLETO...\n")
@@ -29,7 +30,7 @@ def run_etl_pipeline():
 
     try:
         print("\n📦 3️⃣ Cargando datos...")
-        load_result = load_data()
+        load_result = load_data(modo=modo)
         print(f"✅ Carga completada: {load_result}")
     except Exception as e:
         print(f"❌ Error en la fase Load: {e}")
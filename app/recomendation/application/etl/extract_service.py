@@ -1,7 +1,7 @@
 import pandas as pd                     # para manejar datos en forma de tabla (DataFrame)
-import random                           # para elegir valores aleatorios (producto, categoría, precio)
+import numpy as np                      # para generar columnas aleatorias completas de una vez (vectorizado)
 from faker import Faker                 # para generar datos falsos realistas (nombres, fechas, etc.)
-from datetime import datetime, timedelta
+from datetime import date
 import os                               # para manejar rutas y carpetas del sistema
 
 fake = Faker('es_CO')  # datos realistas en español colombiano
@@ -27,50 +27,93 @@ PRODUCTOS = {
 }
 
 
-def generar_dataset(cantidad=30000):
+# 📂 Carpeta de datos crudos (la misma que lee transform_service)
+RAW_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),  # app/recomendation
+    "infrastructure", "data", "raw"
+)
+
+# ⚙️ Parámetros del generador
+CHUNK_SIZE = 100_000      # filas por bloque escrito al CSV (la memoria no crece con `cantidad`)
+NOMBRES_POOL = 5_000      # nombres únicos generados con Faker y luego muestreados por índice
+PRECIO_MIN, PRECIO_MAX = 2000, 30000
+DIAS_HISTORIA = 365       # fechas entre hace un año y hoy
+
+
+def _catalogo():
+    """Aplana PRODUCTOS en arrays: categorías, productos y en qué posición empieza cada categoría."""
+    categorias = list(PRODUCTOS.keys())
+    productos = [p for c in categorias for p in PRODUCTOS[c]]
+    tamanos = np.array([len(PRODUCTOS[c]) for c in categorias])
+    inicios = np.concatenate([[0], np.cumsum(tamanos)[:-1]])
+    categoria_de_producto = np.repeat(np.arange(len(categorias)), tamanos)
+    return categorias, productos, tamanos, inicios, categoria_de_producto
+
+
+def generar_compras(cantidad: int, seed=None, chunk_size: int = CHUNK_SIZE, nombres_pool: int = NOMBRES_POOL):
     """
-    Genera un dataset de compras sintéticas y lo guarda como CSV.
-    Incluye:
-    - Cliente (nombre aleatorio)
-    - Producto y categoría
-    - Precio y fecha de compra
+    Genera las compras por bloques de `chunk_size` filas (DataFrames), columna por columna con NumPy.
+    - Con la misma `seed` se obtienen exactamente los mismos datos, sin importar `chunk_size`:
+      cada columna tiene su propio generador y lo consume en orden.
+    - Los nombres salen de un pool generado una sola vez con Faker (no se llama a Faker por fila).
     """
+    semillas = np.random.SeedSequence(seed).spawn(5)
+    rng_cliente, rng_categoria, rng_producto, rng_precio, rng_fecha = [np.random.default_rng(s) for s in semillas]
+
+    # 👤 Pool de nombres (Faker con semilla para que también sea reproducible)
+    faker = Faker("es_CO")
+    faker.seed_instance(int(semillas[0].generate_state(1)[0]))
+    nombres = list(dict.fromkeys(faker.name() for _ in range(min(nombres_pool, max(cantidad, 1)))))
 
-    data = []
+    categorias, productos, tamanos, inicios, categoria_de_producto = _catalogo()
+    hoy = np.datetime64(date.today(), "D")
 
-    for i in range(1, cantidad + 1):
-        categoria = random.choice(list(PRODUCTOS.keys()))  # elige una categoría al azar
-        producto = random.choice(PRODUCTOS[categoria])     # elige un producto dentro de esa categoría
-        cliente = fake.name()                              # genera un nombre de cliente falso
-        precio = round(random.uniform(2000, 30000), 2)     # genera un precio aleatorio entre 2.000 y 30.000
-        fecha_compra = fake.date_between(start_date="-1y", end_date="today")  # fecha entre hace un año y hoy
+    for inicio in range(0, cantidad, chunk_size):
+        n = min(chunk_size, cantidad - inicio)
 
-        data.append({
-            "id_compra": i,
-            "cliente": cliente,
-            "producto": producto,
-            "categoria": categoria,
+        cat = rng_categoria.integers(0, len(categorias), size=n)                        # categoría al azar
+        prod = inicios[cat] + (rng_producto.random(n) * tamanos[cat]).astype(np.int64)  # producto dentro de esa categoría
+        precio = np.round(rng_precio.uniform(PRECIO_MIN, PRECIO_MAX, size=n), 2)
+        fecha = hoy - rng_fecha.integers(0, DIAS_HISTORIA + 1, size=n).astype("timedelta64[D]")
+
+        yield pd.DataFrame({
+            "id_compra": np.arange(inicio + 1, inicio + n + 1),
+            # Categorical: los textos se guardan una sola vez y cada fila es solo un código
+            "cliente": pd.Categorical.from_codes(rng_cliente.integers(0, len(nombres), size=n), nombres),
+            "producto": pd.Categorical.from_codes(prod, productos),
+            "categoria": pd.Categorical.from_codes(categoria_de_producto[prod], categorias),
             "precio": precio,
-            "fecha_compra": fecha_compra
+            "fecha_compra": np.datetime_as_string(fecha, unit="D"),
         })
 
-    # 📂 Crear carpeta si no existe
-    base_dir = os.path.dirname(os.path.dirname(__file__))  # sube dos niveles (para seguir la estructura del proyecto)
-    ruta_carpeta = os.path.join(base_dir, "infrastructure", "data", "raw")
-    os.makedirs(ruta_carpeta, exist_ok=True)
 
-    ruta = os.path.join(ruta_carpeta, "compras_raw.csv")
+def generar_dataset(cantidad=30000, seed=None, chunk_size=CHUNK_SIZE, ruta=None, storage=None):
+    """
+    Genera un dataset de compras sintéticas y lo guarda en Parquet (etapa "raw").
+    Incluye:
+    - Cliente (nombre aleatorio)
+    - Producto y categoría
+    - Precio y fecha de compra
+
+    Se escribe por bloques de `chunk_size` filas, así que sirve para decenas de millones
+    de registros sin cargar todo en memoria. Con `seed` el resultado es reproducible.
+    - ruta (opcional): además exporta el CSV crudo (separador ',') a esa ruta.
+    """
+    from app.recomendation.infrastructure.compras_storage import get_compras_storage  # 👈 import solo cuando se llama
+
+    storage = storage or get_compras_storage()
 
-    # 💾 Guardar archivo generado
-    df = pd.DataFrame(data)
-    df.to_csv(ruta, index=False, encoding="utf-8-sig")
+    # 💾 Guardar por bloques en Parquet particionado por mes
+    total = storage.write("raw", generar_compras(cantidad, seed=seed, chunk_size=chunk_size))
+    destino = str(storage.path("raw"))
 
-    # 📊 Confirmación y ejemplo de columnas
-    print(f"✅ Dataset generado en {ruta}")
-    print(f"Total de registros generados: {len(df)}")
-    print(f"Columnas: {list(df.columns)}")
+    # 📤 Exportación CSV opcional
+    if ruta is not None:
+        storage.exportar_csv("raw", ruta, sep=",")
+        destino = str(ruta)
 
-    #eliminar duplicados solo por cliente o producto, se puede hacer más específico:
-    #df = df.drop_duplicates(subset=["cliente", "producto"])
+    # 📊 Confirmación
+    print(f"✅ Dataset generado en {storage.path('raw')}")
+    print(f"Total de registros generados: {total}")
 
-    return ruta
+    return destino
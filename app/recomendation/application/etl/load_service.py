@@ -1,74 +1,82 @@
-import pandas as pd
 import os
-from sqlalchemy import text
 from app.recomendation.infrastructure.db_connection import get_engine
+from app.recomendation.infrastructure.compras_storage import get_compras_storage
+from app.recomendation.infrastructure.bulk_loader import BulkLoader, REEMPLAZAR
+from app.recomendation.application.popularity_service import actualizar_agregados
 
-def load_data():
+TABLE_NAME = "compras"
+
+
+def load_data(modo: str = REEMPLAZAR, storage=None, engine=None, exportar_csv: bool = None):
     """
     Fase L (Load) del proceso ETL.
-    Carga los datos limpios (compras_clean.csv) a PostgreSQL y guarda una copia procesada.
+    Carga los datos limpios (Parquet "clean") a PostgreSQL y guarda una copia procesada.
     
-    - Verifica o crea la tabla 'compras'.
-    - Inserta los datos validados.
-    - Genera un respaldo local en /data/processed/compras_processed.csv.
+    - modo="reemplazar": COPY a una tabla staging + swap atómico con 'compras'.
+    - modo="upsert": inserta o actualiza por id_compra (carga incremental).
+    - Genera la copia procesada en Parquet (etapa "processed") y, si se pide,
+      la exporta a /data/processed/compras_processed.csv.
     """
+    from app.core.config import settings
 
-    # 📂 1️⃣ Definir rutas base
+    storage = storage or get_compras_storage()
+    exportar_csv = settings.ETL_EXPORT_CSV if exportar_csv is None else exportar_csv
+
+    # 📂 1️⃣ Definir ruta de exportación CSV (opcional)
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    ruta_clean = os.path.join(base_dir, "infrastructure", "data", "clean", "compras_clean.csv")
-    ruta_processed = os.path.join(base_dir, "infrastructure", "data", "processed")
-    os.makedirs(ruta_processed, exist_ok=True)
-    ruta_salida = os.path.join(ruta_processed, "compras_processed.csv")
+    ruta_salida = os.path.join(base_dir, "infrastructure", "data", "processed", "compras_processed.csv")
 
-    # 📥 2️⃣ Leer el CSV limpio
-    try:
-        df = pd.read_csv(ruta_clean, encoding="utf-8-sig", sep=";")
-        print(f"✅ Archivo limpio leído correctamente ({len(df)} registros).")
-    except Exception as e:
-        raise RuntimeError(f"❌ Error al leer el archivo limpio: {e}")
+    # 📥 2️⃣ Verificar los datos limpios (se leen por bloques durante la carga)
+    if not storage.exists("clean"):
+        raise RuntimeError(f"❌ Error al leer los datos limpios: no existe {storage.path('clean')}")
 
     # 🔌 3️⃣ Conectar a PostgreSQL
     try:
-        engine = get_engine()
+        engine = engine if engine is not None else get_engine()
         print("🔗 Conexión a PostgreSQL establecida correctamente.")
     except Exception as e:
         raise ConnectionError(f"❌ No se pudo conectar a la base de datos: {e}")
 
-    table_name = "compras"
+    # 🚀 4️⃣ Cargar los datos al motor (COPY + staging) guardando de paso la copia procesada
+    with storage.writer("processed") as processed:
+        total = cargar_bloques(storage.iter_batches("clean"), engine, snapshot=processed, modo=modo)
 
-    # 🧱 4️⃣ Crear tabla si no existe
-    create_table_sql = text(f"""
-        CREATE TABLE IF NOT EXISTS {table_name} (
-            id_compra INT PRIMARY KEY,
-            cliente VARCHAR(100),
-            producto VARCHAR(100),
-            categoria VARCHAR(100),
-            precio FLOAT,
-            fecha_compra DATE
-        );
-    """)
+    # 💾 5️⃣ Exportación CSV opcional
+    if exportar_csv:
+        storage.exportar_csv("processed", ruta_salida, sep=";")
+        print(f"💽 Copia procesada exportada en: {ruta_salida}")
 
-    try:
-        with engine.connect() as conn:
-            conn.execute(create_table_sql)
-            conn.commit()
-        print(f"🧩 Tabla '{table_name}' verificada o creada exitosamente.")
-    except Exception as e:
-        raise RuntimeError(f"❌ Error al crear/verificar la tabla: {e}")
+    print("✅ Fase L (Load) completada con éxito.")
+    return f"Se cargaron {total} registros en PostgreSQL y se guardó copia local."
+
+
+def cargar_bloques(bloques, engine, table_name: str = TABLE_NAME, snapshot=None, modo: str = REEMPLAZAR) -> int:
+    """
+    Carga a PostgreSQL un iterador de DataFrames (modo streaming).
+    Todos los bloques van por COPY a la misma staging y el swap se hace al final,
+    así la tabla nunca queda a medio cargar.
+    - snapshot (opcional): función que recibe cada bloque para guardar la copia procesada.
+    Al terminar se recalculan las tablas resumen (compras_diarias, popularidad_productos);
+    tras un upsert, solo los días que tocó la carga.
+    Devuelve la cantidad de registros cargados.
+    """
+    def con_snapshot():
+        for df in bloques:
+            if snapshot is not None:
+                snapshot(df)
+            yield df
 
-    # 🚀 5️⃣ Cargar los datos al motor
     try:
-        df.to_sql(table_name, con=engine, if_exists="replace", index=False)
-        print(f"📦 {len(df)} registros cargados correctamente en la tabla '{table_name}'.")
+        loader = BulkLoader(engine, table_name)
+        total = loader.cargar(con_snapshot(), modo=modo)
+    except ValueError:
+        raise
     except Exception as e:
         raise RuntimeError(f"❌ Error al insertar los datos: {e}")
 
-    # 💾 6️⃣ Guardar copia procesada local
-    try:
-        df.to_csv(ruta_salida, index=False, encoding="utf-8-sig", sep=";")
-        print(f"💽 Copia procesada guardada en: {ruta_salida}")
-    except Exception as e:
-        raise RuntimeError(f"❌ Error al guardar el archivo procesado: {e}")
+    print(f"📦 {total} registros cargados correctamente en la tabla '{table_name}' (modo {modo}).")
 
-    print("✅ Fase L (Load) completada con éxito.")
-    return f"Se cargaron {len(df)} registros en PostgreSQL y se guardó copia local."
+    # 📈 Agregados diarios y popularidad (tablas resumen para tendencias y cold-start)
+    if table_name == TABLE_NAME:
+        actualizar_agregados(engine, fechas=loader.fechas_afectadas)
+    return total
@@ -0,0 +1,115 @@
+import queue
+import threading
+
+from app.core.config import settings
+from app.recomendation.application.etl.extract_service import generar_compras
+from app.recomendation.application.etl.transform_service import IdsVistos, limpiar_bloque, mostrar_reporte
+from app.recomendation.application.etl.load_service import cargar_bloques
+from app.recomendation.infrastructure.db_connection import get_engine
+from app.recomendation.infrastructure.compras_storage import ETAPAS, get_compras_storage
+
+_FIN = object()  # marca de fin de la cola
+
+
+def en_hilo(bloques, profundidad: int, nombre: str):
+    """
+    Ejecuta el iterador `bloques` en un hilo aparte y entrega sus elementos a través de
+    una cola acotada a `profundidad` bloques: si la etapa siguiente va más lenta,
+    esta se frena (la memoria no crece). Los errores se propagan a quien consume.
+    """
+    cola = queue.Queue(maxsize=profundidad)
+    detener = threading.Event()
+
+    def poner(item) -> bool:
+        while not detener.is_set():
+            try:
+                cola.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producir():
+        try:
+            for bloque in bloques:
+                if not poner(bloque):
+                    return
+            poner(_FIN)
+        except BaseException as e:  # se reenvía al consumidor
+            poner(e)
+        finally:
+            if hasattr(bloques, "close"):
+                bloques.close()  # detiene también las etapas anteriores
+
+    hilo = threading.Thread(target=producir, name=f"etl-{nombre}", daemon=True)
+    hilo.start()
+    try:
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        detener.set()  # si el consumidor se detiene (error), el productor también
+
+
+def run_etl_streaming(cantidad: int = 30000, seed=None, chunk_size: int = None,
+                      queue_depth: int = None, snapshots: bool = None, engine=None, modo: str = "reemplazar",
+                      storage=None):
+    """
+    Pipeline ETL por bloques: Extract → Transform → Load como iteradores encadenados.
+
+    - Cada etapa corre en su propio hilo y se comunica por una cola acotada (`queue_depth`),
+      así en memoria hay como máximo ~(2 * queue_depth + 3) bloques de `chunk_size` filas,
+      sin importar el tamaño total del dataset.
+    - Las copias intermedias (raw, clean, processed en Parquet) son opcionales (`snapshots`):
+      sin ellas no se escribe nada a disco salvo la base de datos.
+    - modo: "reemplazar" (staging + swap) o "upsert" (incremental por id_compra).
+    Devuelve un resumen con registros generados, válidos, inválidos y cargados.
+    """
+    chunk_size = chunk_size or settings.ETL_CHUNK_SIZE
+    queue_depth = queue_depth or settings.ETL_QUEUE_DEPTH
+    snapshots = settings.ETL_SNAPSHOTS if snapshots is None else snapshots
+    engine = engine if engine is not None else get_engine()
+
+    storage = storage or get_compras_storage()
+    escritores = {etapa: storage.writer(etapa) for etapa in ETAPAS} if snapshots else {}
+    resumen = {"generados": 0, "validos": 0, "invalidos": 0, "por_campo": {}, "cargados": 0}
+    ids_vistos = IdsVistos()
+
+    def extraer():
+        for df in generar_compras(cantidad, seed=seed, chunk_size=chunk_size):
+            if "raw" in escritores:
+                escritores["raw"](df)
+            resumen["generados"] += len(df)
+            yield df
+
+    def transformar(bloques):
+        for df in bloques:
+            df_limpio, reporte = limpiar_bloque(df, ids_vistos=ids_vistos)
+            if reporte["total_invalidos"]:
+                mostrar_reporte(reporte)
+            resumen["validos"] += len(df_limpio)
+            resumen["invalidos"] += reporte["total_invalidos"]
+            for campo, n in reporte["por_campo"].items():
+                resumen["por_campo"][campo] = resumen["por_campo"].get(campo, 0) + n
+            if "clean" in escritores:
+                escritores["clean"](df_limpio)
+            yield df_limpio
+
+    print(f"\n🚰 INICIANDO PIPELINE ETL POR BLOQUES ({cantidad} registros, bloques de {chunk_size})...\n")
+    try:
+        bloques = en_hilo(transformar(en_hilo(extraer(), queue_depth, "extract")), queue_depth, "transform")
+        resumen["cargados"] = cargar_bloques(bloques, engine, snapshot=escritores.get("processed"), modo=modo)
+    except BaseException:
+        for escritor in escritores.values():
+            escritor.abort()
+        raise
+    for escritor in escritores.values():
+        escritor.close()  # las copias reemplazan a las anteriores solo si todo salió bien
+
+    resumen["snapshots"] = [str(e.destino) for e in escritores.values()]
+    print(f"🎉 PIPELINE ETL POR BLOQUES COMPLETADO: {resumen['cargados']} registros cargados.")
+    return resumen
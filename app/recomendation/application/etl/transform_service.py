@@ -1,7 +1,9 @@
 import pandas as pd                     # para manejar datos tipo tabla (DataFrame)
+import numpy as np                      # máscaras vectorizadas (ids ya vistos)
 import os                               # para manejar rutas y carpetas del sistema
 import marshmallow as ma                # para validar datos de forma estructurada
 from datetime import datetime           # para manejar fechas con precisión
+from app.recomendation.application.etl.validation import validar_columnas  # validación por columnas
 
 
 # 🧱 Esquema de validación de datos (con alias 'ma')
@@ -25,27 +27,52 @@ class CompraSchema(ma.Schema):
         return data
 
 
-def transform_data():
+class IdsVistos:
     """
-    Limpia, transforma y valida los datos del archivo compras_raw.csv.
-    Incluye:
-    - Limpieza general con Pandas (duplicados, nulos, formato)
-    - Validación de tipos y estructura con Marshmallow
-    - Exportación final en /data/clean/compras_clean.csv (separador ';')
+    Recuerda los id_compra ya procesados para descartar duplicados entre bloques.
+    Usa un mapa de bits (1 byte por id) que crece según el id máximo visto;
+    los ids negativos o enormes se guardan en un set aparte.
     """
 
-    # 📂 1️⃣ Definir rutas de entrada y salida
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    ruta_raw = os.path.join(base_dir, "infrastructure", "data", "raw", "compras_raw.csv")
-    ruta_clean = os.path.join(base_dir, "infrastructure", "data", "clean")
-    os.makedirs(ruta_clean, exist_ok=True)
-    ruta_salida = os.path.join(ruta_clean, "compras_clean.csv")
-
-    # 📥 2️⃣ Lectura segura del CSV crudo
-    # Forzamos el separador coma (',') porque es el formato generado en el extract.
-    df = pd.read_csv(ruta_raw, encoding="utf-8-sig", sep=",")
-    print("✅ Archivo leído correctamente")
-    print("Columnas detectadas:", df.columns.tolist())
+    LIMITE_MAPA = 1_000_000_000
+
+    def __init__(self):
+        self._mapa = np.zeros(0, dtype=bool)
+        self._otros = set()
+
+    def filtrar_nuevos(self, ids: pd.Series) -> np.ndarray:
+        """Máscara con True para los ids que no se habían visto (y los marca como vistos)."""
+        valores = pd.to_numeric(ids, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        nuevos = np.ones(len(valores), dtype=bool)
+
+        en_mapa = np.isfinite(valores) & (valores >= 0) & (valores < self.LIMITE_MAPA) & (valores == np.floor(valores))
+        idx = valores[en_mapa].astype(np.int64)
+        if len(idx):
+            if idx.max() >= len(self._mapa):
+                crecido = np.zeros(max(int(idx.max()) + 1, 2 * len(self._mapa)), dtype=bool)
+                crecido[:len(self._mapa)] = self._mapa
+                self._mapa = crecido
+            nuevos[en_mapa] = ~self._mapa[idx]
+            self._mapa[idx] = True
+
+        for pos in np.flatnonzero(~en_mapa):
+            valor = ids.iloc[pos]
+            if pd.isna(valor):
+                continue  # sin id: lo decide la validación
+            nuevos[pos] = valor not in self._otros
+            self._otros.add(valor)
+        return nuevos
+
+
+def limpiar_bloque(df: pd.DataFrame, ids_vistos=None):
+    """
+    Limpia y valida un DataFrame de compras (el archivo completo o un bloque del modo streaming).
+    - ids_vistos (opcional): IdsVistos compartido entre bloques para descartar
+      id_compra repetidos que llegan en bloques distintos.
+    Devuelve (df_limpio, reporte) con el reporte compacto de validar_columnas
+    más "leidos" (filas recibidas).
+    """
+    leidos = len(df)
 
     # 🧹 3️⃣ Limpieza básica
     df.columns = [col.strip().lower().replace(" ", "_") for col in df.columns]
@@ -53,6 +80,8 @@ def transform_data():
     # ❗ Corregido: eliminar duplicados solo si el id_compra se repite exactamente
     # (no eliminar compras válidas del mismo cliente o producto)
     df = df.drop_duplicates(subset=["id_compra"])   # → elimina solo duplicados exactos por ID
+    if ids_vistos is not None:
+        df = df[ids_vistos.filtrar_nuevos(df["id_compra"])]  # → y los que ya llegaron en bloques anteriores
     df = df.dropna(how="all")                       # → elimina filas donde todas las columnas están vacías (nulos o NaN)
 
     # eliminar duplicados solo por cliente o producto, se puede hacer más específico:
@@ -65,33 +94,71 @@ def transform_data():
     # Eliminamos filas sin cliente o sin fecha (datos esenciales)
     df = df.dropna(subset=["cliente", "fecha_compra"], how="any")
 
-    # 🧠 5️⃣ Validación de estructura con Marshmallow
-    schema = CompraSchema()
-    registros_validos = []
-    registros_invalidos = []
+    # 🧠 5️⃣ Validación de estructura: reglas vectorizadas a partir de CompraSchema
+    # (Marshmallow solo revisa las filas que fallan, para confirmar y dar el mensaje de error)
+    df_limpio, reporte = validar_columnas(df, CompraSchema())
+    reporte["leidos"] = leidos
+    return df_limpio, reporte
 
-    for i, row in df.iterrows():
-        record = row.to_dict()
-        record = schema.convertir_fecha(record)
-        errors = schema.validate(record)
-        if errors:
-            registros_invalidos.append({"fila": i, "errores": errors})
-        else:
-            registros_validos.append(record)
 
+def mostrar_reporte(reporte: dict):
     # 📋 Mostrar los errores encontrados (solo los primeros 5)
-    if registros_invalidos:
-        print(f"⚠️ Se encontraron {len(registros_invalidos)} registros inválidos:")
-        for err in registros_invalidos[:5]:
+    if reporte["total_invalidos"]:
+        print(f"⚠️ Se encontraron {reporte['total_invalidos']} registros inválidos: {reporte['por_campo']}")
+        for err in reporte["ejemplos"]:
             print(f" - Fila {err['fila']}: {err['errores']}")
 
-    # 🧮 6️⃣ Crear nuevo DataFrame con solo los registros válidos
-    df_limpio = pd.DataFrame(registros_validos)
 
-    # 💾 7️⃣ Guardar el archivo limpio en formato compatible con Excel (';')
-    df_limpio.to_csv(ruta_salida, index=False, encoding="utf-8-sig", sep=";")
+def _bloques_raw(storage, ruta_csv: str, batch_size: int):
+    """Bloques crudos desde Parquet; si solo existe el CSV antiguo, desde el CSV (por bloques también)."""
+    if storage.exists("raw"):
+        yield from storage.iter_batches("raw", batch_size=batch_size)
+    else:
+        # Forzamos el separador coma (',') porque es el formato del CSV crudo antiguo.
+        yield from pd.read_csv(ruta_csv, encoding="utf-8-sig", sep=",", chunksize=batch_size)
 
-    print(f"🧼 Archivo limpio y validado guardado en: {ruta_salida}")
-    print(f"Registros válidos: {len(df_limpio)} / {len(df)}")
 
-    return ruta_salida
+def transform_data(storage=None, exportar_csv: bool = None, batch_size: int = 100_000):
+    """
+    Limpia, transforma y valida los datos crudos (Parquet "raw").
+    Incluye:
+    - Limpieza general con Pandas (duplicados, nulos, formato)
+    - Validación de tipos y estructura por columnas (CompraSchema, con Marshmallow de respaldo)
+    - Guardado en Parquet (etapa "clean") y, si se pide, exportación a
+      /data/clean/compras_clean.csv (separador ';', compatible con Excel)
+    Se procesa por bloques de `batch_size` filas: la memoria no depende del tamaño del dataset.
+    """
+    from app.core.config import settings
+    from app.recomendation.infrastructure.compras_storage import get_compras_storage
+
+    storage = storage or get_compras_storage()
+    exportar_csv = settings.ETL_EXPORT_CSV if exportar_csv is None else exportar_csv
+
+    # 📂 1️⃣ Definir rutas (CSV crudo antiguo y exportación opcional)
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    ruta_raw = os.path.join(base_dir, "infrastructure", "data", "raw", "compras_raw.csv")
+    ruta_salida = os.path.join(base_dir, "infrastructure", "data", "clean", "compras_clean.csv")
+
+    # 📥 2️⃣–5️⃣ Lectura por bloques + limpieza, conversión de tipos y validación
+    ids_vistos = IdsVistos()
+    total = {"leidos": 0, "total_invalidos": 0, "por_campo": {}, "ejemplos": []}
+    with storage.writer("clean") as writer:
+        for df in _bloques_raw(storage, ruta_raw, batch_size):
+            df_limpio, reporte = limpiar_bloque(df, ids_vistos=ids_vistos)
+            writer.write(df_limpio)
+            total["leidos"] += reporte["leidos"]
+            total["total_invalidos"] += reporte["total_invalidos"]
+            for campo, n in reporte["por_campo"].items():
+                total["por_campo"][campo] = total["por_campo"].get(campo, 0) + n
+            total["ejemplos"] += reporte["ejemplos"][:5 - len(total["ejemplos"])]
+    mostrar_reporte(total)
+    print(f"🧼 Datos limpios y validados guardados en: {storage.path('clean')}")
+    print(f"Registros válidos: {writer.filas} / {total['leidos']}")
+
+    # 💾 6️⃣ Exportación CSV opcional (compatible con Excel, ';')
+    if exportar_csv:
+        storage.exportar_csv("clean", ruta_salida, sep=";")
+        print(f"📤 CSV exportado en: {ruta_salida}")
+        return ruta_salida
+
+    return str(storage.path("clean"))
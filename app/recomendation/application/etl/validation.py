@@ -0,0 +1,110 @@
+import numpy as np                      # máscaras booleanas por columna
+import pandas as pd                     # conversión de tipos vectorizada
+import marshmallow as ma                # mismo esquema que antes, ahora solo como respaldo
+
+
+# 🧪 Reglas por tipo de campo de Marshmallow, aplicadas a la columna completa.
+# Cada una devuelve una máscara: True = el valor pasaría `schema.validate`.
+
+def _mascara_entero(col: pd.Series) -> np.ndarray:
+    if pd.api.types.is_bool_dtype(col):
+        return np.zeros(len(col), dtype=bool)   # Int rechaza True/False
+    return np.isfinite(pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan))
+
+
+def _mascara_decimal(col: pd.Series) -> np.ndarray:
+    # Float no permite NaN ni infinito
+    return np.isfinite(pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan))
+
+
+def _mascara_texto(col: pd.Series) -> np.ndarray:
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Categorías (ej. leídas de Parquet): se revisa cada categoría una vez, no cada fila
+        categoria_ok = np.array([isinstance(c, str) for c in col.cat.categories], dtype=bool)
+        codigos = col.cat.codes.to_numpy()
+        return (codigos >= 0) & categoria_ok[np.maximum(codigos, 0)] if len(categoria_ok) else np.zeros(len(col), dtype=bool)
+    if pd.api.types.is_string_dtype(col) and not pd.api.types.is_object_dtype(col):
+        return col.notna().to_numpy()
+    if pd.api.types.is_object_dtype(col):
+        return col.map(type).eq(str).to_numpy()  # Str solo acepta str (no números ni NaN)
+    return np.zeros(len(col), dtype=bool)
+
+
+def _mascara_fecha(col: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col.notna().to_numpy()
+    # Texto: formato ISO (YYYY-MM-DD), igual que fields.Date
+    return pd.to_datetime(col, format="%Y-%m-%d", errors="coerce").notna().to_numpy()
+
+
+REGLAS = [
+    (ma.fields.Int, _mascara_entero),
+    (ma.fields.Float, _mascara_decimal),
+    (ma.fields.Str, _mascara_texto),
+    (ma.fields.Date, _mascara_fecha),
+]
+
+
+def _mascara_campo(col: pd.Series, campo: ma.fields.Field):
+    """Máscara del campo, o None si el tipo no tiene regla vectorizada (lo decide Marshmallow)."""
+    for tipo, regla in REGLAS:
+        if isinstance(campo, tipo):
+            return regla(col)
+    return None
+
+
+def validar_columnas(df: pd.DataFrame, schema: ma.Schema, max_ejemplos: int = 5):
+    """
+    Valida el DataFrame completo contra los campos de `schema` sin recorrerlo fila por fila.
+
+    1. Por cada campo del esquema se calcula una máscara vectorizada (tipo, nulos y formato).
+    2. Solo las filas que fallan alguna máscara pasan por `schema.validate` (Marshmallow),
+       que decide en última instancia y aporta el mensaje de error.
+
+    Devuelve (df_validos, reporte) donde el reporte es compacto:
+    {"total_invalidos", "por_campo": {campo: cantidad}, "ejemplos": [{"fila", "errores"}, ...]}
+    """
+    validas = np.ones(len(df), dtype=bool)
+    sin_regla = []
+
+    for nombre, campo in schema.fields.items():
+        if nombre not in df.columns:
+            if campo.required:
+                validas[:] = False
+            continue
+        mascara = _mascara_campo(df[nombre], campo)
+        if mascara is None:
+            sin_regla.append(nombre)
+        else:
+            validas &= mascara
+
+    if sin_regla:
+        # Campos sin regla vectorizada: todas las filas van al respaldo de Marshmallow
+        validas[:] = False
+
+    # 🛟 Respaldo: Marshmallow solo para las filas sospechosas
+    por_campo = {}
+    ejemplos = []
+    sospechosas = np.flatnonzero(~validas)
+    if len(sospechosas):
+        convertir = getattr(schema, "convertir_fecha", None)
+        columnas = list(df.columns)
+        for pos, valores in zip(sospechosas, df.iloc[sospechosas].itertuples(index=False, name=None)):
+            record = dict(zip(columnas, valores))
+            if convertir is not None:
+                record = convertir(record)
+            errors = schema.validate(record)
+            if not errors:
+                validas[pos] = True  # la regla vectorizada fue más estricta que Marshmallow
+                continue
+            for campo in errors:
+                por_campo[campo] = por_campo.get(campo, 0) + 1
+            if len(ejemplos) < max_ejemplos:
+                ejemplos.append({"fila": df.index[pos], "errores": errors})
+
+    reporte = {
+        "total_invalidos": int((~validas).sum()),
+        "por_campo": por_campo,
+        "ejemplos": ejemplos,
+    }
+    return df[validas], reporte
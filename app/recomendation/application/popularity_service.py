@@ -0,0 +1,159 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+from app.core.config import settings
+
+TABLE_NAME = "compras"
+TABLA_DIARIA = "compras_diarias"            # (fecha, producto): compras e ingresos del día
+TABLA_POPULARIDAD = "popularidad_productos"  # una fila por producto: la tabla "diminuta" del cold-start
+
+DDL_DIARIA = f"""
+    CREATE TABLE IF NOT EXISTS {TABLA_DIARIA} (
+        fecha DATE NOT NULL,
+        producto VARCHAR(100) NOT NULL,
+        categoria VARCHAR(100),
+        compras INT NOT NULL,
+        ingresos FLOAT NOT NULL,
+        PRIMARY KEY (fecha, producto)
+    )
+"""
+
+# La base agrega (una pasada sobre compras); Python solo recibe días × productos
+SQL_DIARIA = f"""
+    INSERT INTO {TABLA_DIARIA} (fecha, producto, categoria, compras, ingresos)
+    SELECT fecha_compra, producto, MAX(categoria), COUNT(*), SUM(precio)
+    FROM {TABLE_NAME}
+    WHERE fecha_compra IS NOT NULL AND producto IS NOT NULL {{filtro}}
+    GROUP BY fecha_compra, producto
+"""
+
+
+def _decaimiento(fechas: pd.Series, referencia: pd.Timestamp, vida_media: float) -> np.ndarray:
+    """Peso de cada día: 1 el día de referencia, 0.5 a `vida_media` días, 0.25 al doble..."""
+    edad = (referencia - fechas).dt.days.to_numpy(dtype=np.float64)
+    return np.power(0.5, np.maximum(edad, 0.0) / vida_media)
+
+
+def calcular_popularidad(diaria: pd.DataFrame, vida_media: float = None, referencia=None) -> pd.DataFrame:
+    """
+    Popularidad por producto con decaimiento exponencial: score = Σ compras_día · 0.5^(edad / vida_media).
+    La referencia es el último día con compras (no "hoy"), así datos históricos no quedan en cero.
+    """
+    vida_media = vida_media or settings.RECO_VIDA_MEDIA_DIAS
+    columnas = ["producto", "categoria", "score", "compras", "ingresos"]
+    if diaria.empty:
+        return pd.DataFrame(columns=columnas)
+    fechas = pd.to_datetime(diaria["fecha"])
+    referencia = pd.Timestamp(referencia) if referencia is not None else fechas.max()
+    pop = (
+        diaria.assign(score=diaria["compras"].to_numpy() * _decaimiento(fechas, referencia, vida_media))
+        .groupby(["producto", "categoria"], as_index=False, observed=True)[["score", "compras", "ingresos"]].sum()
+        .sort_values(["score", "producto"], ascending=[False, True], ignore_index=True)
+    )
+    return pop[columnas]
+
+
+def actualizar_agregados(engine, fechas=None) -> dict:
+    """
+    Recalcula la capa de agregados después de cada carga de compras:
+    1. `compras_diarias`: compras e ingresos por día y producto (GROUP BY en la base).
+       - fechas=None (carga "reemplazar"): se reconstruye entera.
+       - fechas=[...] (upsert, `BulkLoader.fechas_afectadas`): solo se recalculan esos días,
+         sin recorrer el resto del histórico de compras.
+    2. `popularidad_productos`: score con decaimiento por producto (pandas sobre la tabla diaria).
+    Todo en una transacción: quien consulta ve los agregados viejos o los nuevos, nunca a medias.
+    """
+    if fechas is not None and not inspect(engine).has_table(TABLA_DIARIA):
+        fechas = None  # todavía no hay agregados que actualizar por partes
+    with engine.begin() as conn:
+        conn.execute(text(DDL_DIARIA))
+        if fechas is None:
+            conn.execute(text(f"DELETE FROM {TABLA_DIARIA}"))
+            conn.execute(text(SQL_DIARIA.format(filtro="")))
+        elif fechas:
+            dias = {"fechas": list(fechas)}
+            conn.execute(text(f"DELETE FROM {TABLA_DIARIA} WHERE fecha IN :fechas")
+                         .bindparams(bindparam("fechas", expanding=True)), dias)
+            conn.execute(text(SQL_DIARIA.format(filtro="AND fecha_compra IN :fechas"))
+                         .bindparams(bindparam("fechas", expanding=True)), dias)
+        diaria = pd.read_sql(text(f"SELECT * FROM {TABLA_DIARIA}"), conn)
+        pop = calcular_popularidad(diaria)
+        pop.to_sql(TABLA_POPULARIDAD, conn, if_exists="replace", index=False)
+    invalidar_populares()
+    print(f"📈 Agregados actualizados: {len(diaria)} filas diarias, {len(pop)} productos con popularidad.")
+    return {"filas_diarias": len(diaria), "productos": len(pop)}
+
+
+# ─────────────────────────────────────────────
+# 🔥 Tendencias
+# ─────────────────────────────────────────────
+def trending(engine, categoria: str = None, window: int = 30, n: int = 10, vida_media: float = None) -> dict:
+    """
+    Productos y categorías en tendencia durante los últimos `window` días (hasta el último día con compras).
+    Solo lee `compras_diarias` (días × productos), nunca la tabla de compras.
+    """
+    filtro = "WHERE categoria = :categoria" if categoria else ""
+    diaria = pd.read_sql(text(f"SELECT * FROM {TABLA_DIARIA} {filtro}"), engine,
+                         params={"categoria": categoria} if categoria else None)
+    if diaria.empty:
+        return {"desde": None, "hasta": None, "productos": [], "categorias": []}
+
+    fechas = pd.to_datetime(diaria["fecha"])
+    hasta = fechas.max()
+    desde = hasta - pd.Timedelta(days=window - 1)
+    ventana = diaria[(fechas >= desde).to_numpy()]
+    pop = calcular_popularidad(ventana, vida_media=vida_media, referencia=hasta)
+
+    categorias = (
+        pop.groupby("categoria", as_index=False)[["score", "compras", "ingresos"]].sum()
+        .sort_values(["score", "categoria"], ascending=[False, True])
+    )
+    return {
+        "desde": desde.date().isoformat(),
+        "hasta": hasta.date().isoformat(),
+        "productos": _registros(pop.head(n)),
+        "categorias": _registros(categorias),
+    }
+
+
+def _registros(df: pd.DataFrame) -> list:
+    df = df.assign(score=df["score"].round(4), ingresos=df["ingresos"].round(2), compras=df["compras"].astype(int))
+    return df.to_dict(orient="records")
+
+
+# ─────────────────────────────────────────────
+# 🧊 Cold-start: productos populares en memoria
+# ─────────────────────────────────────────────
+_populares = None
+_populares_lock = threading.Lock()
+
+
+def get_populares(engine=None) -> pd.DataFrame:
+    """Tabla de popularidad (una fila por producto), leída una vez y guardada en memoria."""
+    global _populares
+    if _populares is None:
+        with _populares_lock:
+            if _populares is None:
+                from app.recomendation.infrastructure.db_connection import get_engine
+
+                engine = engine if engine is not None else get_engine()
+                _populares = pd.read_sql(
+                    text(f"SELECT producto, score FROM {TABLA_POPULARIDAD} ORDER BY score DESC, producto"), engine
+                )
+    return _populares
+
+
+def populares(n: int = 10, excluir=(), engine=None) -> list:
+    """Los `n` productos más populares que no estén en `excluir` (ej. lo que el cliente ya compró)."""
+    pop = get_populares(engine)
+    if len(excluir):
+        pop = pop[~pop["producto"].isin(list(excluir))]
+    return [{"producto": p, "score": round(float(s), 6)} for p, s in zip(pop["producto"].head(n), pop["score"].head(n))]
+
+
+def invalidar_populares():
+    global _populares
+    _populares = None
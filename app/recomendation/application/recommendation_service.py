@@ -0,0 +1,367 @@
+import copy
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sqlalchemy import inspect, text
+
+from app.core.config import settings
+
+TABLE_NAME = "compras"
+TABLA_CARGAS = f"{TABLE_NAME}_cargas"  # registro de cargas que escribe BulkLoader (lote, modo, ids reescritos)
+
+# Solo los pares distintos (cliente, producto) hasta la marca de agua: la base deduplica, Python recibe menos filas
+SQL_INTERACCIONES = (
+    f"SELECT DISTINCT cliente, producto FROM {TABLE_NAME} "
+    "WHERE id_compra > :desde AND id_compra <= :hasta"
+)
+SQL_MARCA = f"SELECT MAX(id_compra) AS id_compra, MAX(fecha_compra) AS fecha_compra FROM {TABLE_NAME}"
+
+
+def _leer_marca(engine):
+    """(max id_compra, max fecha_compra) de la tabla; (0, None) si está vacía."""
+    fila = pd.read_sql(SQL_MARCA, engine).iloc[0]
+    id_max = 0 if pd.isna(fila["id_compra"]) else int(fila["id_compra"])
+    fecha = None if pd.isna(fila["fecha_compra"]) else str(fila["fecha_compra"])[:10]
+    return id_max, fecha
+
+
+def _leer_cargas(engine, desde_lote: int) -> pd.DataFrame:
+    """Cargas registradas después de `desde_lote` (vacío si la tabla no se cargó con BulkLoader)."""
+    if not inspect(engine).has_table(TABLA_CARGAS):
+        return pd.DataFrame(columns=["lote", "modo", "min_id_existente"])
+    return pd.read_sql(
+        text(f"SELECT lote, modo, min_id_existente FROM {TABLA_CARGAS} WHERE lote > :desde ORDER BY lote"),
+        engine, params={"desde": desde_lote},
+    )
+
+
+def _leer_pares(engine, desde: int, hasta: int, chunksize: int = 500_000) -> pd.DataFrame:
+    bloques = list(pd.read_sql(text(SQL_INTERACCIONES), engine, params={"desde": desde, "hasta": hasta},
+                               chunksize=chunksize))
+    return pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame(columns=["cliente", "producto"])
+
+
+def _binaria(filas, columnas, shape) -> sp.csr_matrix:
+    X = sp.csr_matrix((np.ones(len(filas), dtype=np.float32), (filas, columnas)), shape=shape)
+    X.sum_duplicates()
+    X.data[:] = 1.0  # binaria: comprar 10 veces el mismo producto cuenta como una
+    return X
+
+
+def _codificar(indice: pd.Index, valores: pd.Series):
+    """Posición de cada valor en `indice`; los que no están se agregan al final (sin reordenar los existentes)."""
+    codigos = indice.get_indexer(valores)
+    faltan = codigos < 0
+    if not faltan.any():
+        return indice, codigos
+    cod_nuevos, nuevos = pd.factorize(valores[faltan])
+    codigos[faltan] = len(indice) + cod_nuevos
+    return indice.append(pd.Index(nuevos)), codigos
+
+
+class ItemIndex:
+    """
+    Índice item-item en memoria para recomendar productos.
+
+    Construcción (una sola vez, todo con matrices dispersas de SciPy):
+    1. Matriz cliente × producto binaria X (1 = el cliente compró el producto).
+    2. Co-ocurrencias C = Xᵀ·X: C[i, j] = clientes que compraron i y j.
+    3. Similitud coseno: C[i, j] / sqrt(C[i, i] · C[j, j]).
+    4. Para cada producto se guardan solo sus `top_k` vecinos (arrays fijos).
+
+    Consultas: los similares son una lectura de arrays y las recomendaciones de un cliente
+    suman los vecinos de lo que ya compró, sin tocar la base ni la matriz completa.
+
+    Actualización incremental (`con_delta`): las compras nuevas solo suman sus co-ocurrencias
+    a C y se recalculan los vecinos de los productos afectados. La marca de agua
+    (`id_compra` y `fecha_compra` máximos ya indexados) indica desde dónde leer la próxima vez,
+    y `marca_lote` (última carga registrada) permite detectar upserts que reescribieron compras
+    ya indexadas: esas no se pueden aplicar como delta y obligan a reconstruir.
+    """
+
+    def __init__(self, clientes, productos, X: sp.csr_matrix, top_k: int = 20):
+        self.clientes = pd.Index(clientes)
+        self.productos = pd.Index(productos)
+        self.X = X.tocsr()
+        self.top_k = top_k
+        self.build_ms = 0.0
+        self.marca_id, self.marca_fecha = 0, None
+        self.marca_lote = 0
+        self.actualizaciones = 0  # deltas aplicados desde la última compactación
+        self.interacciones_base = int(self.X.nnz)
+        self.C = (self.X.T @ self.X).tocsr()  # co-ocurrencias producto × producto (dispersa)
+        n = len(self.productos)
+        self.vecinos = np.full((n, top_k), -1, dtype=np.int32)
+        self.scores = np.zeros((n, top_k), dtype=np.float32)
+        self.co_compras = np.zeros((n, top_k), dtype=np.int64)
+        self._calcular_vecinos(np.arange(n))
+
+    @classmethod
+    def desde_compras(cls, cliente, producto, top_k: int = 20) -> "ItemIndex":
+        """Construye el índice a partir de dos columnas paralelas (una fila por compra o por par)."""
+        inicio = time.perf_counter()
+        cod_cliente, clientes = pd.factorize(pd.Series(cliente, dtype="string"), sort=True)
+        cod_producto, productos = pd.factorize(pd.Series(producto, dtype="string"), sort=True)
+        validos = (cod_cliente >= 0) & (cod_producto >= 0)
+        X = _binaria(cod_cliente[validos], cod_producto[validos], (len(clientes), len(productos)))
+        indice = cls(clientes, productos, X, top_k=top_k)
+        indice.build_ms = (time.perf_counter() - inicio) * 1000
+        return indice
+
+    @classmethod
+    def desde_db(cls, engine, top_k: int = 20, chunksize: int = 500_000) -> "ItemIndex":
+        """Lee los pares (cliente, producto) de la tabla de compras por bloques y construye el índice."""
+        inicio = time.perf_counter()
+        # El lote se lee antes que los datos: una carga que llegue en medio se vuelve a revisar después
+        cargas = _leer_cargas(engine, 0)
+        marca_id, marca_fecha = _leer_marca(engine)
+        df = _leer_pares(engine, 0, marca_id, chunksize)
+        indice = cls.desde_compras(df["cliente"], df["producto"], top_k=top_k)
+        indice.marca_id, indice.marca_fecha = marca_id, marca_fecha
+        indice.marca_lote = int(cargas["lote"].max()) if len(cargas) else 0
+        indice.build_ms = (time.perf_counter() - inicio) * 1000
+        return indice
+
+    # ─────────────────────────────────────────────
+    # 🧮 Construcción
+    # ─────────────────────────────────────────────
+    def _calcular_vecinos(self, productos: np.ndarray):
+        """(Re)calcula los `top_k` vecinos solo de las filas `productos` de C."""
+        k, C = self.top_k, self.C
+        norma = np.sqrt(np.maximum(C.diagonal(), 1.0))
+        self.compradores = C.diagonal().astype(np.int64)
+        for i in productos:
+            self.vecinos[i], self.scores[i], self.co_compras[i] = -1, 0.0, 0
+            ini, fin = C.indptr[i], C.indptr[i + 1]
+            columnas, conteos = C.indices[ini:fin], C.data[ini:fin]
+            otros = (columnas != i) & (conteos > 0)  # un producto no es vecino de sí mismo
+            columnas, conteos = columnas[otros], conteos[otros]
+            if k == 0 or len(columnas) == 0:
+                continue
+            fila = conteos / (norma[i] * norma[columnas])  # coseno: C_ij / (‖i‖·‖j‖)
+            m = min(k, len(fila))
+            mejores = np.argpartition(-fila, m - 1)[:m] if m < len(fila) else np.arange(len(fila))
+            mejores = mejores[np.lexsort((columnas[mejores], -fila[mejores]))]  # score ↓, empate por posición
+            self.vecinos[i, :m] = columnas[mejores]
+            self.scores[i, :m] = fila[mejores]
+            self.co_compras[i, :m] = conteos[mejores]
+
+    # ─────────────────────────────────────────────
+    # ➕ Actualización incremental
+    # ─────────────────────────────────────────────
+    def con_delta(self, cliente, producto) -> "ItemIndex":
+        """
+        Devuelve un índice nuevo con las compras (`cliente`, `producto`) agregadas.
+        El costo depende de las compras nuevas (y del historial de esos clientes), no del total:
+
+        - D = pares nuevos que aún no estaban en X (clientes y productos nuevos se agregan al final).
+        - ΔC = Xᵀ·D + Dᵀ·X + Dᵀ·D, calculado solo con las filas de los clientes tocados.
+        - Se recalculan los vecinos de los productos con co-ocurrencias nuevas y de los que
+          tienen como vecino a un producto cuyo total de compradores cambió (su coseno cambió).
+
+        `self` no se modifica: las consultas en curso siguen usando el índice anterior.
+        """
+        nuevo = copy.copy(self)
+        cliente = pd.Series(cliente, dtype="string").reset_index(drop=True)
+        producto = pd.Series(producto, dtype="string").reset_index(drop=True)
+        validos = (cliente.notna() & producto.notna()).to_numpy()
+        cliente, producto = cliente[validos], producto[validos]
+
+        # 🆕 Clientes y productos que no existían se agregan al final del índice
+        nuevo.clientes, cod_cliente = _codificar(self.clientes, cliente)
+        nuevo.productos, cod_producto = _codificar(self.productos, producto)
+        shape = (len(nuevo.clientes), len(nuevo.productos))
+        n_antes, n = len(self.productos), shape[1]
+
+        X = self.X.copy()
+        X.resize(shape)
+        D = _binaria(cod_cliente, cod_producto, shape)
+        D = (D - D.multiply(X)).tocsr()  # solo lo que el cliente no había comprado antes
+        D.eliminate_zeros()
+
+        tocados = np.flatnonzero(np.diff(D.indptr))
+        Xt, Dt = X[tocados], D[tocados]
+        delta_C = (Xt.T @ Dt + Dt.T @ Xt + Dt.T @ Dt).tocsr()
+
+        C = self.C.copy()
+        C.resize((n, n))
+        nuevo.C = (C + delta_C).tocsr()
+        nuevo.X = (X + D).tocsr()
+
+        nuevo.vecinos = np.vstack([self.vecinos, np.full((n - n_antes, self.top_k), -1, dtype=np.int32)])
+        nuevo.scores = np.vstack([self.scores, np.zeros((n - n_antes, self.top_k), dtype=np.float32)])
+        nuevo.co_compras = np.vstack([self.co_compras, np.zeros((n - n_antes, self.top_k), dtype=np.int64)])
+
+        cambiados = np.flatnonzero(delta_C.diagonal())
+        afectados = np.union1d(np.flatnonzero(np.diff(delta_C.indptr)), nuevo.C[cambiados].indices)
+        nuevo._calcular_vecinos(afectados)
+        nuevo.actualizaciones = self.actualizaciones + 1
+        return nuevo
+
+    def actualizar_desde_db(self, engine, chunksize: int = 500_000):
+        """
+        Lee de la base solo las compras con `id_compra` mayor que la marca de agua y las aplica.
+        Devuelve el índice nuevo, o None si la tabla ya no es compatible con la marca: se reemplazó
+        completa (los ids empezaron de nuevo) o un upsert reescribió compras ya indexadas
+        (mismos ids, otros datos). En ese caso toca reconstruir.
+        """
+        inicio = time.perf_counter()
+        cargas = _leer_cargas(engine, self.marca_lote)
+        reescritas = cargas["min_id_existente"].dropna()
+        if (cargas["modo"] != "upsert").any() or (reescritas <= self.marca_id).any():
+            return None
+        marca_lote = int(cargas["lote"].max()) if len(cargas) else self.marca_lote
+
+        marca_id, marca_fecha = _leer_marca(engine)
+        if marca_id < self.marca_id:
+            return None
+        if marca_id == self.marca_id:
+            self.marca_lote = marca_lote  # cargas sin compras nuevas ni reescritas: nada que aplicar
+            return self
+        df = _leer_pares(engine, self.marca_id, marca_id, chunksize)
+        nuevo = self.con_delta(df["cliente"], df["producto"])
+        nuevo.marca_id, nuevo.marca_fecha = marca_id, marca_fecha
+        nuevo.marca_lote = marca_lote
+        nuevo.build_ms = (time.perf_counter() - inicio) * 1000
+        print(f"➕ Índice de recomendaciones actualizado con {len(df)} pares nuevos en {nuevo.build_ms:.1f} ms")
+        return nuevo
+
+    # ─────────────────────────────────────────────
+    # 🔎 Consultas
+    # ─────────────────────────────────────────────
+    def _posicion(self, indice: pd.Index, valor: str, que: str) -> int:
+        try:
+            return indice.get_loc(valor)
+        except KeyError:
+            raise KeyError(f"{que} '{valor}' no aparece en las compras cargadas")
+
+    def similares(self, producto: str, n: int = 10) -> list:
+        """Los `n` productos más parecidos a `producto` (ya precalculados)."""
+        i = self._posicion(self.productos, producto, "Producto")
+        vecinos = self.vecinos[i, :n]
+        validos = vecinos >= 0
+        return [
+            {"producto": self.productos[j], "score": round(float(s), 6), "co_compras": int(c)}
+            for j, s, c in zip(vecinos[validos], self.scores[i, :n][validos], self.co_compras[i, :n][validos])
+        ]
+
+    def comprados(self, cliente: str) -> np.ndarray:
+        c = self._posicion(self.clientes, cliente, "Cliente")
+        return self.X.indices[self.X.indptr[c]:self.X.indptr[c + 1]]
+
+    def recomendar(self, cliente: str, n: int = 10) -> list:
+        """
+        Suma las similitudes de los vecinos de cada producto que el cliente ya compró
+        y devuelve los `n` mejores que todavía no tiene.
+        """
+        items = self.comprados(cliente)
+        vecinos = self.vecinos[items].ravel()
+        validos = vecinos >= 0
+        puntaje = np.bincount(vecinos[validos], weights=self.scores[items].ravel()[validos],
+                              minlength=len(self.productos))
+        puntaje[items] = 0.0  # nada de lo que ya compró
+        candidatos = np.flatnonzero(puntaje > 0)
+        if len(candidatos) > n:
+            candidatos = candidatos[np.argpartition(-puntaje[candidatos], n - 1)[:n]]
+        candidatos = candidatos[np.lexsort((candidatos, -puntaje[candidatos]))]
+        return [{"producto": self.productos[j], "score": round(float(puntaje[j]), 6)} for j in candidatos]
+
+    def info(self) -> dict:
+        return {
+            "clientes": len(self.clientes),
+            "productos": len(self.productos),
+            "interacciones": int(self.X.nnz),
+            "top_k": self.top_k,
+            "build_ms": round(self.build_ms, 1),
+            "marca_id_compra": self.marca_id,
+            "marca_fecha_compra": self.marca_fecha,
+            "marca_lote": self.marca_lote,
+            "actualizaciones": self.actualizaciones,
+        }
+
+
+# ─────────────────────────────────────────────
+# 🌍 Índice global (se construye en la primera consulta)
+# ─────────────────────────────────────────────
+_indice = None
+_construccion_lock = threading.Lock()  # una sola construcción a la vez
+
+
+def construir_indice(engine=None, top_k: int = None) -> ItemIndex:
+    """Reconstruye el índice desde la tabla de compras y lo publica (las consultas en curso usan el anterior)."""
+    global _indice
+    from app.recomendation.infrastructure.db_connection import get_engine
+
+    engine = engine if engine is not None else get_engine()
+    with _construccion_lock:
+        nuevo = ItemIndex.desde_db(engine, top_k=top_k or settings.RECO_TOP_K)
+        _indice = nuevo  # asignación atómica: nunca se ve un índice a medio construir
+    print(f"🧭 Índice de recomendaciones listo: {nuevo.info()}")
+    return nuevo
+
+
+def get_item_index() -> ItemIndex:
+    indice = _indice
+    if indice is None:
+        with _construccion_lock:
+            indice = _indice
+        if indice is None:
+            indice = construir_indice()
+    return indice
+
+
+def _toca_compactar(indice: ItemIndex) -> bool:
+    # Compactación periódica: cada RECO_COMPACT_EVERY deltas o cuando lo agregado supera
+    # RECO_COMPACT_RATIO del índice base (recoge también compras editadas o borradas)
+    nuevas = indice.X.nnz - indice.interacciones_base
+    return (indice.actualizaciones >= settings.RECO_COMPACT_EVERY
+            or nuevas > settings.RECO_COMPACT_RATIO * max(indice.interacciones_base, 1))
+
+
+def actualizar_indice(engine=None) -> ItemIndex:
+    """
+    Pone el índice al día con las compras cargadas después de su marca de agua.
+    - Sin índice todavía, si la tabla se reemplazó (los ids volvieron a empezar) o si un upsert
+      reescribió compras ya indexadas: construcción completa.
+    - Si toca compactar: construcción completa desde la tabla.
+    - Si no: solo se aplican las compras nuevas (costo proporcional al delta).
+    """
+    global _indice
+    from app.recomendation.infrastructure.db_connection import get_engine
+
+    engine = engine if engine is not None else get_engine()
+    indice = _indice
+    if indice is None or _toca_compactar(indice):
+        return construir_indice(engine, top_k=indice.top_k if indice else None)
+    with _construccion_lock:
+        nuevo = indice.actualizar_desde_db(engine)
+        if nuevo is not None:
+            _indice = nuevo
+    if nuevo is None:
+        print("♻️ La tabla de compras se reemplazó o se reescribieron compras ya indexadas: se reconstruye el índice.")
+        return construir_indice(engine, top_k=indice.top_k)
+    return nuevo
+
+
+def refrescar_tras_carga(modo: str):
+    """
+    Llamar después de cargar compras:
+    - "upsert": actualización incremental desde la marca de agua (o reconstrucción si el upsert
+      reescribió compras ya indexadas, según el registro de cargas).
+    - "reemplazar": la tabla es otra (los ids pueden repetirse) → se descarta y se reconstruye al consultar.
+    """
+    if _indice is None:
+        return  # nadie lo ha pedido todavía: se construirá completo en la primera consulta
+    if modo == "upsert":
+        actualizar_indice()
+    else:
+        invalidar_indice()
+
+
+def invalidar_indice():
+    """Descarta el índice (ej. después de recargar las compras): la próxima consulta lo reconstruye."""
+    global _indice
+    _indice = None
@@ -0,0 +1,58 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+# 🤝 Un producto parecido a otro (vecino en el índice item-item)
+class ProductoSimilar(BaseModel):
+    producto: str
+    score: float        # similitud coseno entre 0 y 1
+    co_compras: int     # clientes que compraron ambos productos
+
+# 📤 Respuesta de /items/{producto}/similar
+class SimilaresResponse(BaseModel):
+    producto: str
+    similares: List[ProductoSimilar]
+
+# 🎁 Un producto recomendado a un cliente
+class Recomendacion(BaseModel):
+    producto: str
+    score: float        # suma de similitudes con lo que el cliente ya compró
+
+# 📤 Respuesta de /clientes/{cliente}/recommend
+class RecomendacionesResponse(BaseModel):
+    cliente: str
+    comprados: int      # productos distintos que ya compró
+    fuente: str = "item-item"   # "popularidad" si el cliente es nuevo o no hay vecinos (cold-start)
+    recomendaciones: List[Recomendacion]
+
+# 📊 Estado del índice en memoria
+class IndiceInfo(BaseModel):
+    clientes: int
+    productos: int
+    interacciones: int  # pares (cliente, producto) distintos
+    top_k: int
+    build_ms: float             # última construcción o actualización
+    marca_id_compra: int        # marca de agua: mayor id_compra ya indexado
+    actualizaciones: int        # deltas aplicados desde la última compactación
+    marca_fecha_compra: Optional[str] = None
+
+# 🔥 Producto o categoría en tendencia dentro de la ventana
+class Tendencia(BaseModel):
+    score: float        # compras con decaimiento exponencial (las recientes pesan más)
+    compras: int
+    ingresos: float
+
+class ProductoTendencia(Tendencia):
+    producto: str
+    categoria: Optional[str] = None
+
+class CategoriaTendencia(Tendencia):
+    categoria: Optional[str] = None
+
+# 📤 Respuesta de /trending
+class TrendingResponse(BaseModel):
+    categoria: Optional[str] = None
+    window: int
+    desde: Optional[str] = None
+    hasta: Optional[str] = None
+    productos: List[ProductoTendencia]
+    categorias: List[CategoriaTendencia]
@@ -0,0 +1,227 @@
+import io
+
+import pandas as pd
+from sqlalchemy import text
+
+# 🧱 Columnas de la tabla de compras (mismo orden que el CSV limpio)
+COLUMNAS = ["id_compra", "cliente", "producto", "categoria", "precio", "fecha_compra"]
+COLUMNAS_DDL = """
+    id_compra INT {pk},
+    cliente VARCHAR(100),
+    producto VARCHAR(100),
+    categoria VARCHAR(100),
+    precio FLOAT,
+    fecha_compra DATE
+"""
+
+# 📒 Registro de cargas: cada carga deja una fila (el índice de recomendaciones lo usa para saber
+# si un upsert reescribió compras que ya tenía indexadas)
+COLUMNAS_CARGAS_DDL = """
+    lote INT PRIMARY KEY,
+    modo VARCHAR(20) NOT NULL,
+    filas INT NOT NULL,
+    min_id_existente INT
+"""
+
+COPY_FILAS = 100_000  # filas por buffer de COPY (la memoria no depende del tamaño del DataFrame)
+
+REEMPLAZAR, UPSERT = "reemplazar", "upsert"
+
+
+def _bloques(datos):
+    """Acepta un DataFrame o un iterador de DataFrames (modo streaming)."""
+    if isinstance(datos, pd.DataFrame):
+        yield datos
+    else:
+        yield from datos
+
+
+def _preparar(df: pd.DataFrame) -> pd.DataFrame:
+    df = df[COLUMNAS]
+    if pd.api.types.is_datetime64_any_dtype(df["fecha_compra"]):
+        df = df.assign(fecha_compra=df["fecha_compra"].dt.strftime("%Y-%m-%d"))
+    return df
+
+
+def _es_postgres(engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+class BulkLoader:
+    """
+    Carga masiva de la tabla de compras.
+
+    - Modo "reemplazar": los datos van a una tabla staging, se crean los índices DESPUÉS
+      de cargar y en una sola transacción se intercambia staging ↔ tabla real.
+      Los lectores ven la tabla vieja hasta el COMMIT y la nueva después: nunca una tabla vacía o inexistente.
+    - Modo "upsert": los datos van a una tabla temporal y se fusionan con
+      INSERT ... ON CONFLICT (id_compra) DO UPDATE (carga incremental).
+    - Cada carga queda en `<tabla>_cargas` (lote, modo, filas y el menor id_compra que ya
+      existía y fue reescrito), en la misma transacción que los datos.
+    - Después de un upsert, `fechas_afectadas` tiene los días que cambiaron (los de las filas nuevas
+      y los que tenían las filas reescritas) para recalcular solo esos agregados; None tras un reemplazo.
+
+    En PostgreSQL los datos se envían con `COPY ... FROM STDIN` (psycopg2). Con SQLite
+    (sustituto para los tests) se usa `to_sql`, con la misma lógica de staging y swap.
+    """
+
+    def __init__(self, engine, table_name: str = "compras"):
+        self.engine = engine
+        self.table = table_name
+        self.staging = f"{table_name}_staging"
+        self.cargas = f"{table_name}_cargas"
+        self.fechas_afectadas = None
+
+    def cargar(self, datos, modo: str = REEMPLAZAR) -> int:
+        """Carga un DataFrame o un iterador de DataFrames. Devuelve la cantidad de filas enviadas."""
+        if modo not in (REEMPLAZAR, UPSERT):
+            raise ValueError(f"Modo de carga desconocido '{modo}'. Opciones: {REEMPLAZAR}, {UPSERT}")
+        self.fechas_afectadas = None
+        if _es_postgres(self.engine):
+            return self._cargar_postgres(datos, modo)
+        return self._cargar_generico(datos, modo)
+
+    # ─────────────────────────────────────────────
+    # PostgreSQL: COPY FROM STDIN
+    # ─────────────────────────────────────────────
+    def _copy(self, cur, tabla: str, datos) -> int:
+        total = 0
+        sql = f"COPY {tabla} ({', '.join(COLUMNAS)}) FROM STDIN WITH (FORMAT csv)"
+        for df in _bloques(datos):
+            df = _preparar(df)
+            for inicio in range(0, len(df), COPY_FILAS):
+                buffer = io.StringIO()
+                df.iloc[inicio:inicio + COPY_FILAS].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                cur.copy_expert(sql, buffer)
+            total += len(df)
+        return total
+
+    def _cargar_postgres(self, datos, modo: str) -> int:
+        t, s = self.table, self.staging
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            if modo == REEMPLAZAR:
+                # 1️⃣ Staging sin índices (COPY más rápido)
+                cur.execute(f"DROP TABLE IF EXISTS {s}")
+                cur.execute(f"CREATE TABLE {s} ({COLUMNAS_DDL.format(pk='')})")
+                total = self._copy(cur, s, datos)
+
+                # 2️⃣ Índices después de la carga (una sola pasada de ordenamiento)
+                cur.execute(f"ALTER TABLE {s} ADD CONSTRAINT {s}_pkey PRIMARY KEY (id_compra)")
+                cur.execute(f"CREATE INDEX idx_{s}_fecha ON {s} (fecha_compra)")
+                cur.execute(f"ANALYZE {s}")
+
+                # 3️⃣ Swap atómico: la tabla vieja se borra y la nueva toma su nombre (y el de sus índices)
+                cur.execute(f"DROP TABLE IF EXISTS {t}")
+                cur.execute(f"ALTER TABLE {s} RENAME TO {t}")
+                cur.execute(f"ALTER INDEX {s}_pkey RENAME TO {t}_pkey")
+                cur.execute(f"ALTER INDEX idx_{s}_fecha RENAME TO idx_{t}_fecha")
+                min_id = None
+            else:
+                self._asegurar_tabla(cur)
+                tmp = f"{t}_upsert"
+                # `orden` (fuera de la lista de columnas del COPY) numera las filas en el orden en que llegan
+                cur.execute(f"CREATE TEMP TABLE {tmp} ({COLUMNAS_DDL.format(pk='')}, orden BIGSERIAL) ON COMMIT DROP")
+                total = self._copy(cur, tmp, datos)
+                cur.execute(self._sql_min_existente(tmp))
+                min_id = cur.fetchone()[0]
+                cur.execute(self._sql_fechas_afectadas(tmp))
+                fechas = [fila[0] for fila in cur.fetchall()]
+                # La última aparición de cada id gana, igual que en SQLite (sin ORDER BY ... orden DESC
+                # DISTINCT ON se quedaría con una fila cualquiera del grupo)
+                cur.execute(self._sql_upsert(
+                    f"SELECT DISTINCT ON (id_compra) {', '.join(COLUMNAS)} FROM {tmp} ORDER BY id_compra, orden DESC"
+                ))
+            for sql in self._sql_registrar(modo, total, min_id):
+                cur.execute(sql)
+            raw.commit()
+            if modo == UPSERT:
+                self.fechas_afectadas = fechas
+            return total
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _asegurar_tabla(self, cur):
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({COLUMNAS_DDL.format(pk='PRIMARY KEY')})")
+        # ON CONFLICT necesita un índice único en id_compra (las tablas creadas por to_sql no lo tienen)
+        cur.execute("""
+            SELECT 1 FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisunique AND i.indnatts = 1 AND a.attname = 'id_compra'
+        """, (self.table,))
+        if cur.fetchone() is None:
+            cur.execute(f"CREATE UNIQUE INDEX {self.table}_id_compra_key ON {self.table} (id_compra)")
+
+    def _sql_min_existente(self, tmp: str) -> str:
+        # El menor id que ya estaba en la tabla y el upsert va a reescribir (NULL si solo hay ids nuevos)
+        return f"SELECT MIN(u.id_compra) FROM {tmp} u JOIN {self.table} c ON c.id_compra = u.id_compra"
+
+    def _sql_fechas_afectadas(self, tmp: str) -> str:
+        # Antes de fusionar: días de las filas que llegan y días que tenían las filas que se reescriben
+        return (
+            f"SELECT fecha_compra FROM {tmp} WHERE fecha_compra IS NOT NULL "
+            f"UNION SELECT c.fecha_compra FROM {tmp} u JOIN {self.table} c ON c.id_compra = u.id_compra "
+            f"WHERE c.fecha_compra IS NOT NULL"
+        )
+
+    def _sql_registrar(self, modo: str, filas: int, min_id) -> list:
+        min_id = "NULL" if min_id is None else int(min_id)
+        return [
+            f"CREATE TABLE IF NOT EXISTS {self.cargas} ({COLUMNAS_CARGAS_DDL})",
+            f"INSERT INTO {self.cargas} (lote, modo, filas, min_id_existente) "
+            f"SELECT COALESCE(MAX(lote), 0) + 1, '{modo}', {int(filas)}, {min_id} FROM {self.cargas}",
+        ]
+
+    def _sql_upsert(self, select: str) -> str:
+        actualizar = ", ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNAS if c != "id_compra")
+        return (
+            f"INSERT INTO {self.table} ({', '.join(COLUMNAS)}) {select} "
+            f"ON CONFLICT (id_compra) DO UPDATE SET {actualizar}"
+        )
+
+    # ─────────────────────────────────────────────
+    # SQLite (sustituto para pruebas): to_sql + mismo staging/swap
+    # ─────────────────────────────────────────────
+    def _cargar_generico(self, datos, modo: str) -> int:
+        t, s = self.table, self.staging
+        total = 0
+        with self.engine.begin() as conn:
+            if modo == REEMPLAZAR:
+                conn.execute(text(f"DROP TABLE IF EXISTS {s}"))
+                conn.execute(text(f"CREATE TABLE {s} ({COLUMNAS_DDL.format(pk='')})"))
+                for df in _bloques(datos):
+                    _preparar(df).to_sql(s, conn, if_exists="append", index=False)
+                    total += len(df)
+                conn.execute(text(f"DROP TABLE IF EXISTS {t}"))
+                conn.execute(text(f"ALTER TABLE {s} RENAME TO {t}"))
+                # Aquí no hay ALTER INDEX ... RENAME: los índices se crean ya con el nombre final
+                conn.execute(text(f"CREATE UNIQUE INDEX {t}_pkey ON {t} (id_compra)"))
+                conn.execute(text(f"CREATE INDEX idx_{t}_fecha ON {t} (fecha_compra)"))
+                min_id = None
+            else:
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {t} ({COLUMNAS_DDL.format(pk='PRIMARY KEY')})"))
+                conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {t}_pkey ON {t} (id_compra)"))
+                tmp = f"{t}_upsert"
+                conn.execute(text(f"DROP TABLE IF EXISTS {tmp}"))
+                conn.execute(text(f"CREATE TEMP TABLE {tmp} ({COLUMNAS_DDL.format(pk='')})"))
+                for df in _bloques(datos):
+                    _preparar(df).to_sql(tmp, conn, if_exists="append", index=False)
+                    total += len(df)
+                min_id = conn.execute(text(self._sql_min_existente(tmp))).scalar()
+                fechas = conn.execute(text(self._sql_fechas_afectadas(tmp))).scalars().all()
+                # La última aparición de cada id gana (el WHERE también evita la ambigüedad de ON CONFLICT en SQLite)
+                conn.execute(text(self._sql_upsert(
+                    f"SELECT {', '.join(COLUMNAS)} FROM {tmp} "
+                    f"WHERE rowid IN (SELECT MAX(rowid) FROM {tmp} GROUP BY id_compra)"
+                )))
+                conn.execute(text(f"DROP TABLE {tmp}"))
+            for sql in self._sql_registrar(modo, total, min_id):
+                conn.execute(text(sql))
+        if modo == UPSERT:
+            self.fechas_afectadas = fechas
+        return total
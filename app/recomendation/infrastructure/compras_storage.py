@@ -0,0 +1,199 @@
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# 📂 Carpeta base de los datos intermedios del ETL (una subcarpeta por etapa)
+BASE_DIR = Path(__file__).resolve().parent / "data" / "parquet"
+ETAPAS = ("raw", "clean", "processed")
+
+# 🧱 Esquema tipado de las compras: nada se vuelve a parsear desde texto entre etapas
+SCHEMA = pa.schema([
+    ("id_compra", pa.int64()),
+    ("cliente", pa.string()),
+    ("producto", pa.dictionary(pa.int32(), pa.string())),    # pocos valores distintos → diccionario
+    ("categoria", pa.dictionary(pa.int32(), pa.string())),
+    ("precio", pa.float64()),
+    ("fecha_compra", pa.date32()),
+])
+COLUMNAS = SCHEMA.names
+
+# Partición por mes de compra: <etapa>/mes=2025-03/part-00000.parquet
+PARTICIONES = ds.partitioning(pa.schema([("mes", pa.string())]), flavor="hive")
+SIN_FECHA = "sin_fecha"
+
+
+def _columna(df: pd.DataFrame, campo: pa.Field) -> pa.Array:
+    col = df[campo.name]
+    if pa.types.is_dictionary(campo.type):
+        if not isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype("category")
+        return pa.array(col.cat.rename_categories(col.cat.categories.astype(str))).cast(campo.type)
+    if pa.types.is_date32(campo.type):
+        fechas = pd.to_datetime(col, errors="coerce")
+        return pa.array(fechas.to_numpy(dtype="datetime64[D]"), type=pa.date32(), mask=fechas.isna().to_numpy())
+    if pa.types.is_floating(campo.type) or pa.types.is_integer(campo.type):
+        col = pd.to_numeric(col, errors="coerce")
+    if pa.types.is_string(campo.type):
+        col = col.astype("string")
+    return pa.array(col, type=campo.type, from_pandas=True)
+
+
+def a_tabla(df: pd.DataFrame) -> pa.Table:
+    """Convierte un DataFrame de compras al esquema tipado (con columnas diccionario)."""
+    return pa.Table.from_arrays([_columna(df, campo) for campo in SCHEMA], schema=SCHEMA)
+
+
+def _meses(tabla: pa.Table) -> np.ndarray:
+    # Mes de cada fila como "YYYY-MM" (o SIN_FECHA si la fecha es nula)
+    fechas = tabla.column("fecha_compra").to_numpy(zero_copy_only=False).astype("datetime64[D]")
+    meses = fechas.astype("datetime64[M]").astype(str)
+    meses[np.isnat(fechas)] = SIN_FECHA
+    return meses
+
+
+class ParquetWriter:
+    """
+    Escribe una etapa por bloques. Cada bloque se reparte por mes en archivos nuevos
+    (`part-NNNNN.parquet`), así la memoria no depende del tamaño total.
+    Se escribe en una carpeta temporal y al cerrar reemplaza a la anterior:
+    los lectores nunca ven una etapa a medio escribir.
+    """
+
+    def __init__(self, destino: Path):
+        self.destino = destino
+        self._tmp = destino.with_name(f".{destino.name}.tmp-{uuid.uuid4().hex[:8]}")
+        self._tmp.mkdir(parents=True)
+        self._partes = 0
+        self.filas = 0
+
+    def __call__(self, df: pd.DataFrame):
+        self.write(df)
+
+    def write(self, df: pd.DataFrame):
+        if len(df) == 0:
+            return
+        tabla = a_tabla(df)
+        meses = _meses(tabla)
+        for mes in np.unique(meses):
+            carpeta = self._tmp / f"mes={mes}"
+            carpeta.mkdir(exist_ok=True)
+            pq.write_table(tabla.filter(pa.array(meses == mes)), carpeta / f"part-{self._partes:05d}.parquet",
+                           compression="zstd")
+        self._partes += 1
+        self.filas += len(df)
+
+    def close(self):
+        viejo = self.destino.with_name(f".{self.destino.name}.old-{uuid.uuid4().hex[:8]}")
+        if self.destino.exists():
+            os.replace(self.destino, viejo)
+        os.replace(self._tmp, self.destino)
+        shutil.rmtree(viejo, ignore_errors=True)
+
+    def abort(self):
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, *_):
+        self.abort() if tipo else self.close()
+
+
+class ComprasStorage:
+    """
+    Almacenamiento columnar de las etapas del ETL de compras (raw, clean, processed).
+
+    - Parquet (zstd) particionado por mes de `fecha_compra`, con tipos reales
+      (int, float, date) y `producto`/`categoria` codificados como diccionario.
+    - Lecturas con proyección de columnas y poda de particiones por rango de fechas.
+    - CSV solo como formato de exportación (`exportar_csv`).
+    """
+
+    def __init__(self, base_dir=BASE_DIR):
+        self.base_dir = Path(base_dir)
+
+    def path(self, etapa: str) -> Path:
+        if etapa not in ETAPAS:
+            raise ValueError(f"Etapa desconocida '{etapa}'. Opciones: {', '.join(ETAPAS)}")
+        return self.base_dir / etapa
+
+    def exists(self, etapa: str) -> bool:
+        return self.path(etapa).exists()
+
+    # ✍️ Escritura
+    def writer(self, etapa: str) -> ParquetWriter:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        return ParquetWriter(self.path(etapa))
+
+    def write(self, etapa: str, datos) -> int:
+        """Escribe un DataFrame o un iterador de DataFrames como la nueva versión de la etapa."""
+        with self.writer(etapa) as writer:
+            for df in ([datos] if isinstance(datos, pd.DataFrame) else datos):
+                writer.write(df)
+        return writer.filas
+
+    # 📖 Lectura
+    def _dataset(self, etapa: str):
+        if not self.exists(etapa):
+            raise FileNotFoundError(f"No hay datos de la etapa '{etapa}' en {self.path(etapa)}")
+        return ds.dataset(self.path(etapa), format="parquet", partitioning=PARTICIONES,
+                          schema=SCHEMA.append(pa.field("mes", pa.string())))
+
+    @staticmethod
+    def _filtro(desde=None, hasta=None):
+        filtro = None
+        if desde is not None:
+            desde = pd.Timestamp(desde)
+            # `mes` poda carpetas completas; `fecha_compra` afina dentro del mes
+            filtro = (ds.field("mes") >= desde.strftime("%Y-%m")) & (ds.field("fecha_compra") >= pa.scalar(desde.date()))
+        if hasta is not None:
+            hasta = pd.Timestamp(hasta)
+            f = (ds.field("mes") <= hasta.strftime("%Y-%m")) & (ds.field("fecha_compra") <= pa.scalar(hasta.date()))
+            filtro = f if filtro is None else filtro & f
+        return filtro
+
+    def read(self, etapa: str, columns=None, desde=None, hasta=None) -> pd.DataFrame:
+        """
+        Lee la etapa completa (o solo `columns`, o solo las compras entre `desde` y `hasta`).
+        Las fechas llegan como datetime64 y producto/categoria como Categorical.
+        """
+        tabla = self._dataset(etapa).to_table(columns=columns or COLUMNAS, filter=self._filtro(desde, hasta))
+        return tabla.to_pandas(date_as_object=False)
+
+    def iter_batches(self, etapa: str, columns=None, batch_size: int = 100_000, desde=None, hasta=None):
+        """Igual que `read` pero por bloques de `batch_size` filas (memoria constante)."""
+        scanner = self._dataset(etapa).scanner(columns=columns or COLUMNAS, filter=self._filtro(desde, hasta),
+                                               batch_size=batch_size)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas(date_as_object=False)
+
+    # 📤 Exportación
+    def exportar_csv(self, etapa: str, ruta, sep: str = ";") -> str:
+        """Exporta la etapa a CSV (utf-8 con BOM, compatible con Excel)."""
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "w", encoding="utf-8-sig", newline="") as f:
+            for i, df in enumerate(self.iter_batches(etapa)):
+                df.to_csv(f, index=False, sep=sep, header=(i == 0), date_format="%Y-%m-%d")
+        return str(ruta)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_compras_storage() -> ComprasStorage:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = ComprasStorage()
+    return _storage
@@ -1,7 +1,13 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
+from app.core.config import settings
+
 # 📂 Cargar variables del archivo .env
 load_dotenv()
 
@@ -12,14 +18,148 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
+
+class MetricasPool:
+    """Contadores del pool: cuántas conexiones se piden, cuánto se espera y cuántas se abren de verdad."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0        # conexiones entregadas por el pool
+        self.esperas = 0          # pedidos que llegaron con el pool lleno (tuvieron que esperar)
+        self.timeouts = 0         # pedidos que se cansaron de esperar (pool_timeout)
+        self.espera_ms_total = 0.0
+        self.espera_ms_max = 0.0
+        self.conexiones_nuevas = 0  # conexiones físicas abiertas (connect real a la base)
+        self.invalidadas = 0        # descartadas (pre-ping fallido, errores de red, recycle)
+
+    def registrar_checkout(self, ms: float, lleno: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.esperas += lleno
+            self.espera_ms_total += ms
+            self.espera_ms_max = max(self.espera_ms_max, ms)
+
+    def sumar(self, campo: str):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "esperas": self.esperas,
+                "timeouts": self.timeouts,
+                "espera_ms_promedio": round(self.espera_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "espera_ms_max": round(self.espera_ms_max, 3),
+                "conexiones_nuevas": self.conexiones_nuevas,
+                "invalidadas": self.invalidadas,
+            }
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide el tiempo de cada checkout (incluye esperar turno o abrir la conexión)."""
+
+    def __init__(self, *args, metricas: MetricasPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = metricas or MetricasPool()
+
+    def _do_get(self):
+        lleno = self._max_overflow > -1 and self._overflow >= self._max_overflow and self._pool.empty()
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            self.metricas.sumar("timeouts")
+            raise
+        self.metricas.registrar_checkout((time.perf_counter() - inicio) * 1000, lleno)
+        return conexion
+
+    def recreate(self):
+        # engine.dispose() crea un pool nuevo: las métricas se conservan
+        nuevo = super().recreate()
+        nuevo.metricas = self.metricas
+        return nuevo
+
+
+def crear_engine(url: str, **opciones):
+    """
+    Crea un motor SQLAlchemy con pool medido y las opciones de pool de `settings`
+    (se pueden sobrescribir con `opciones`).
+    """
+    config = {
+        "poolclass": PoolMedido,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        **opciones,
+    }
+    engine = create_engine(url, **config)
+
+    metricas = engine.pool.metricas
+    event.listen(engine, "connect", lambda *_: metricas.sumar("conexiones_nuevas"))
+    event.listen(engine, "invalidate", lambda *_: metricas.sumar("invalidadas"))
+    return engine
+
+
+# ─────────────────────────────────────────────
+# 🔌 Motor compartido (uno por proceso)
+# ─────────────────────────────────────────────
+_engine = None
+_engine_lock = threading.Lock()
+
+
 def get_engine():
     """
-    Crea y retorna un motor de conexión SQLAlchemy a PostgreSQL
-    usando las variables definidas en el archivo .env.
+    Retorna el motor SQLAlchemy compartido de PostgreSQL (se crea en la primera llamada
+    con las variables del archivo .env). Todas las cargas del ETL y las consultas de
+    recomendaciones reutilizan su pool de conexiones.
+    Sirve también como dependencia de FastAPI: `engine = Depends(get_engine)`.
     """
-    if not all([DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME]):
-        raise ValueError("❌ Faltan variables de entorno para la conexión a la base de datos.")
-    
-    url = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    print(f"🔌 Conectando a PostgreSQL → {DB_HOST}:{DB_PORT}/{DB_NAME}")
-    return create_engine(url)
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not all([DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME]):
+                    raise ValueError("❌ Faltan variables de entorno para la conexión a la base de datos.")
+
+                url = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+                _engine = crear_engine(url)
+                print(f"🔌 Pool de conexiones PostgreSQL creado (pool_size={settings.DB_POOL_SIZE}, "
+                      f"max_overflow={settings.DB_MAX_OVERFLOW})")
+    return _engine
+
+
+def get_conexion():
+    """Dependencia de FastAPI: presta una conexión del pool durante la petición y la devuelve al terminar."""
+    with get_engine().connect() as conexion:
+        yield conexion
+
+
+def estado_pool(engine=None) -> dict:
+    """Estado actual del pool y sus métricas acumuladas."""
+    engine = engine if engine is not None else _engine
+    if engine is None:
+        return {"creado": False}
+    pool = engine.pool
+    estado = {
+        "creado": True,
+        "pool_size": pool.size(),
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+    }
+    if isinstance(pool, PoolMedido):
+        estado.update(pool.metricas.resumen())
+    return estado
+
+
+def cerrar_engine():
+    """Cierra todas las conexiones del pool (apagado de la app o cambio de credenciales)."""
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine is not None:
+        engine.dispose()
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from fastapi.responses import FileResponse
-import shutil
-import os
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List
 from pathlib import Path
+import asyncio
+import json
 
 # Importamos servicios y entrenamiento
 from app.vision.application.vision_service import VisionService
 from app.vision.application.pneumonia_service import PneumoniaService
-from app.vision.training.train_pneumonia import train_pneumonia_model
+from app.vision.application.training_jobs import TrainingJobManager, FINISHED, COMPLETED
+from app.vision.application.result_cache import get_result_cache
 
 # ======================
 # 🚏 Configuración del Router
@@ -20,7 +23,7 @@ router = APIRouter(
 
 # 📂 Directorios base
 VISION_DIR = Path(__file__).resolve().parents[1]    # Raíz de la carpeta vision/
-UPLOAD_DIR = VISION_DIR / "uploads"                 # Carpeta donde se suben imágenes temporales
+UPLOAD_DIR = VISION_DIR / "uploads"                 # Carpeta de imágenes subidas
 PROCESSED_DIR = UPLOAD_DIR / "processed"            # Carpeta de imágenes procesadas
 PLOTS_DIR = VISION_DIR / "infrastructure" / "plots" # Carpeta para guardar gráficas de métricas
 
@@ -38,6 +41,7 @@ PLOTS_DIR.mkdir(parents=True, exist_ok=True)
 
 _vision_service = None
 _pneumonia_service = None
+_training_jobs = None
 
 def get_vision_service():
     global _vision_service
@@ -53,6 +57,24 @@ def get_pneumonia_service():
         _pneumonia_service = PneumoniaService()
     return _pneumonia_service
 
+def get_training_jobs():
+    global _training_jobs
+    if _training_jobs is None:
+        _training_jobs = TrainingJobManager(on_finish=_on_training_finished)
+    return _training_jobs
+
+def _on_training_finished(job):
+    # Pesos nuevos: PneumoniaService se vuelve a crear (y a cargar el modelo) en la próxima
+    # petición y la caché de resultados se vacía (sus claves ya no coincidirían con el modelo nuevo)
+    global _pneumonia_service
+    if job["status"] != COMPLETED:
+        return
+    _pneumonia_service = None
+    cache = get_result_cache()
+    if cache is not None:
+        cache.limpiar()
+    print("♻️ Entrenamiento terminado: modelo de neumonía se recarga y la caché de resultados se vació.")
+
 
 # 🔍 DETECCIÓN GENERAL (YOLO)
 @router.post(
@@ -69,23 +91,51 @@ async def detect_objects(file: UploadFile = File(..., description="Imagen a anal
     if not file.filename:
         raise HTTPException(status_code=400, detail="Archivo inválido")
 
-    temp_path = UPLOAD_DIR / f"temp_{file.filename}"
+    # Leemos los bytes en memoria: la imagen se decodifica una sola vez
+    # dentro del servicio (sin archivo temporal ni relecturas de disco).
+    content = await file.read()
+
+    # Procesamos con YOLO usando lazy loading.
+    # Se ejecuta en el threadpool para no bloquear el event loop: así varias
+    # peticiones concurrentes llegan juntas al micro-batcher de YOLO.
     try:
-        # Guardamos la imagen subida temporalmente en disco
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        result = await run_in_threadpool(get_vision_service().detect_objects, content, file.filename)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return result
+
+
+# 📦 DETECCIÓN EN LOTE (YOLO)
+@router.post(
+    "/detect/batch",
+    summary="📦 Detección de objetos en varias imágenes",
+    description="Sube varias imágenes a la vez; YOLO las procesa en una sola inferencia por lote."
+)
+async def detect_objects_batch(files: List[UploadFile] = File(..., description="Imágenes a analizar")):
+    """
+    Sube varias imágenes y recibe las detecciones de cada una,
+    en el mismo orden en que se enviaron.
+    """
+    if not files or any(not f.filename for f in files):
+        raise HTTPException(status_code=400, detail="Archivo inválido")
+
+    contents = [await f.read() for f in files]
+    filenames = [f.filename for f in files]
 
-        # Procesamos con YOLO usando lazy loading
-        try:
-            result = get_vision_service().detect_objects(str(temp_path))
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        results = await run_in_threadpool(
+            get_vision_service().detect_objects_batch, contents, filenames
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return result
-    finally:
-        # Siempre borramos la imagen temporal, haya éxito o error
-        if temp_path.exists():
-            os.remove(temp_path)
+    return {
+        "total_images": len(results),
+        "results": [
+            {"filename": filename, **result} for filename, result in zip(filenames, results)
+        ]
+    }
 
 
 # 🩻 ANÁLISIS DE RAYOS X (NEUMONÍA)
@@ -106,6 +156,29 @@ async def analyze_xray(file: UploadFile = File(..., description="Radiografía a
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 🎯 CACHÉ DE RESULTADOS
+@router.get(
+    "/cache",
+    summary="🎯 Estado de la caché de resultados",
+    description="Aciertos, fallos y tamaño de la caché de /detect y /analyze-xray (por hash de imagen + modelo)."
+)
+async def result_cache_stats():
+    cache = get_result_cache()
+    return cache.estado() if cache is not None else {"enabled": False}
+
+
+# ⏱️ CASCADA DE VALIDACIÓN DE RADIOGRAFÍAS
+@router.get(
+    "/xray-gate",
+    summary="⏱️ Estado de la validación de radiografías",
+    description="Llamadas, decisiones y tiempo de cada etapa (color, histograma, YOLO) de /analyze-xray."
+)
+async def xray_gate_stats():
+    if _pneumonia_service is None:
+        return {"loaded": False}  # no se carga el servicio (ni los modelos) solo para ver contadores
+    return _pneumonia_service.gate.estado()
+
+
 # 📈 MÉTRICAS NEUMONÍA
 @router.get(
     "/training-metrics",
@@ -127,22 +200,96 @@ async def get_pneumonia_metrics():
 @router.post(
     "/train",
     summary="🔧 Reentrenar modelo de neumonía",
-    description="Permite reentrenar el modelo CNN de neumonía especificando "
-                "número de épocas y tasa de aprendizaje."
+    description="Encola un reentrenamiento del modelo CNN de neumonía especificando "
+                "número de épocas y tasa de aprendizaje. Devuelve un job_id para seguir el progreso."
 )
 async def train_pneumonia(
     epochs: int = Query(5, description="Número de épocas de entrenamiento"),
     lr: float = Query(0.001, description="Tasa de aprendizaje")
 ):
     """
-    Reentrena el modelo CNN de neumonía con los parámetros indicados.
-    Genera nueva gráfica de métricas y actualiza el modelo guardado.
+    Encola el reentrenamiento del modelo CNN de neumonía con los parámetros indicados.
+    El entrenamiento corre en un proceso aparte (la API sigue respondiendo) y,
+    al terminar, genera nueva gráfica de métricas y actualiza el modelo guardado.
+    Si ya hay un entrenamiento en curso, este queda en cola.
     """
-    train_pneumonia_model(epochs=epochs, lr=lr)
-
-    # ⚠️ Importante:
-    # train_pneumonia_model es síncrono y pesado (entrenamiento).
-    # Ejecutarlo desde un endpoint bloquea el event loop del servidor mientras se entrena
-    # → la API dejará de responder hasta que termine.
-    
-    return {"message": f"Modelo de neumonía reentrenado por {epochs} épocas"}
+    job = get_training_jobs().submit(epochs=epochs, lr=lr)
+    return {
+        "message": f"Entrenamiento del modelo de neumonía encolado ({epochs} épocas)",
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"{router.prefix}/train/jobs/{job['id']}",
+        "events_url": f"{router.prefix}/train/jobs/{job['id']}/events",
+    }
+
+
+# 📋 LISTAR JOBS DE ENTRENAMIENTO
+@router.get(
+    "/train/jobs",
+    summary="📋 Listar entrenamientos",
+    description="Devuelve los entrenamientos en cola, en curso y los más recientes ya terminados."
+)
+async def list_training_jobs():
+    return get_training_jobs().list()
+
+
+# 🔎 ESTADO DE UN JOB
+@router.get(
+    "/train/jobs/{job_id}",
+    summary="🔎 Estado de un entrenamiento",
+    description="Estado del job y métricas por época (loss, val loss, val accuracy)."
+)
+async def get_training_job(job_id: str):
+    job = get_training_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job de entrenamiento no encontrado")
+    return job
+
+
+# 📡 PROGRESO EN VIVO (SSE)
+@router.get(
+    "/train/jobs/{job_id}/events",
+    summary="📡 Progreso del entrenamiento (SSE)",
+    description="Stream Server-Sent Events con el estado y las métricas de cada época."
+)
+async def stream_training_job(job_id: str):
+    jobs = get_training_jobs()
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job de entrenamiento no encontrado")
+
+    async def event_stream():
+        sent_epochs, last_status = 0, None
+        while True:
+            job = jobs.get(job_id)
+            if job is None:
+                return
+            # Métricas nuevas desde el último envío
+            for metrics in job["metrics"][sent_epochs:]:
+                yield f"event: epoch\ndata: {json.dumps(metrics)}\n\n"
+            sent_epochs = len(job["metrics"])
+
+            if job["status"] != last_status:
+                last_status = job["status"]
+                payload = {"status": job["status"], "error": job["error"]}
+                yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+            if job["status"] in FINISHED:
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# 🛑 CANCELAR UN JOB
+@router.delete(
+    "/train/jobs/{job_id}",
+    summary="🛑 Cancelar entrenamiento",
+    description="Cancela un entrenamiento en cola o en curso."
+)
+async def cancel_training_job(job_id: str):
+    jobs = get_training_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job de entrenamiento no encontrado")
+    if job["status"] in FINISHED:
+        raise HTTPException(status_code=409, detail=f"El job ya terminó ({job['status']})")
+    return jobs.cancel(job_id)
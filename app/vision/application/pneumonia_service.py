@@ -1,13 +1,18 @@
+import time
 from pathlib import Path
 import torch
 import cv2
 import numpy as np
 from ultralytics import YOLO
 
-from app.vision.domain.pneumonia_model import SimpleCNN
+from app.core.config import settings
+from app.vision.infrastructure.pneumonia_backends import ARTIFACTS, load_pneumonia_backend
 from app.vision.utils.preprocess import preprocess_image
 from app.vision.utils.draw import draw_xray_annotation
+from app.vision.utils.image_io import decode_image, to_bgr
 from app.vision.infrastructure.pneumonia_repository import PneumoniaRepository
+from app.vision.application.result_cache import get_result_cache, huella_archivo
+from app.vision.application.xray_gate import XrayGate, RECHAZADA, ACEPTADA, INCIERTA
 
 
 class PneumoniaService:
@@ -28,21 +33,19 @@ class PneumoniaService:
         print("DEBUG Uploads dir:", self.UPLOADS_DIR)
         print("DEBUG Models dir:", self.MODELS_DIR)
 
-        # ── rutas de modelos
-        pneumonia_path = self.MODELS_DIR / "pneumonia_cnn.pth"
-
-        # ── cargar modelo de neumonía
-        self.pneumonia_model = SimpleCNN().to(self.device)
-        try:
-            self.pneumonia_model.load_state_dict(
-                torch.load(pneumonia_path, map_location=self.device)
-            )
-            self.pneumonia_model.eval()
-            self.pneumonia_model_loaded = True
-            print("✅ Modelo de neumonía cargado.")
-        except Exception as e:
-            self.pneumonia_model_loaded = False
-            print("⚠️ Modelo de neumonía NO encontrado o error cargándolo:", e)
+        # ── cargar modelo de neumonía con el backend configurado
+        # (si falta el artefacto exportado, se usa el modelo eager de pneumonia_cnn.pth)
+        self.pneumonia_model_loaded = False
+        self.backend_name = None
+        for backend_name in dict.fromkeys([settings.PNEUMONIA_BACKEND, "eager"]):
+            try:
+                self.pneumonia_backend = load_pneumonia_backend(backend_name, self.MODELS_DIR, self.device)
+                self.pneumonia_model_loaded = True
+                self.backend_name = backend_name
+                print(f"✅ Modelo de neumonía cargado (backend: {backend_name}).")
+                break
+            except Exception as e:
+                print(f"⚠️ Modelo de neumonía NO encontrado o error cargándolo ({backend_name}):", e)
 
         # ── cargar YOLO (opcional)
         try:
@@ -60,136 +63,118 @@ class PneumoniaService:
             self.yolo_loaded = False
             self.yolo_model = None
 
-        # repo (maneja uploads/raw y uploads/xray_proc)
-        self.repo = PneumoniaRepository(self.UPLOADS_DIR)
+        # repo (maneja uploads/raw y uploads/xray_proc, guardado en segundo plano)
+        self.repo = PneumoniaRepository(
+            self.UPLOADS_DIR,
+            persist_raw=settings.VISION_PERSIST_RAW,
+            persist_processed=settings.VISION_PERSIST_PROCESSED,
+        )
+
+        # cascada previa a YOLO: chequeo de color + estadísticas de histograma sobre una miniatura
+        self.gate = XrayGate(
+            thumb_size=settings.XRAY_GATE_THUMB_SIZE,
+            chroma_tol=settings.XRAY_GATE_CHROMA_TOL,   # tolerancia en diferencia de canales (0 = estrictamente iguales)
+            histograma=settings.XRAY_GATE_HISTOGRAM,
+            std_min=settings.XRAY_GATE_STD_MIN,
+            symmetry_min=settings.XRAY_GATE_SYMMETRY_MIN,
+            center_ratio=settings.XRAY_GATE_CENTER_RATIO,
+        )
 
         # parámetros ajustables (modifícalos si quieres)
-        self.grayscale_tolerance = 6      # tolerancia en diferencia de canales (0 = estrictamente iguales)
         self.yolo_conf_threshold = 0.45   # confianza mínima para considerar una detección "fuerte"
         self.yolo_allowed = {"person"}    # si todas las detecciones fuertes son de estas clases, permitir imagen
 
+        # 🎯 Caché de resultados: la versión incluye el hash de los pesos cargados (CNN y YOLO)
+        # y los parámetros del filtro, así cualquier cambio genera claves nuevas
+        self.cache = get_result_cache()
+        self.model_version = self._model_version(yolo_path)
+
+    def _model_version(self, yolo_path) -> str:
+        cnn = huella_archivo(self.MODELS_DIR / ARTIFACTS[self.backend_name]) if self.pneumonia_model_loaded else None
+        yolo = huella_archivo(yolo_path) if self.yolo_loaded else None
+        return (f"xray:{self.backend_name}:{cnn}|yolo:{yolo}|{self.gate.version()}"
+                f"|conf:{self.yolo_conf_threshold}|permitidas:{','.join(sorted(self.yolo_allowed))}")
+
     async def analyze_xray(self, file, filename: str):
         """
-        1) Guarda la imagen subida (async)
-        2) Verifica que sea grayscale (o RGB que sea efectivamente gris)
-        3) (Opcional) Pasa por YOLO para descartar imágenes con objetos típicos (gato, auto, etc.)
+        1) Lee la imagen subida en memoria y la decodifica UNA sola vez
+           (el original se guarda en uploads/raw en segundo plano, si está activado)
+        2) Cascada barata sobre una miniatura: verifica que sea grayscale (o RGB efectivamente gris)
+           y si el histograma es el de una radiografía típica
+        3) (Opcional) Solo si la cascada no está segura, pasa por YOLO para descartar imágenes
+           con objetos típicos (gato, auto, etc.)
         4) Preprocesa y pasa el tensor al modelo de neumonía
         5) Devuelve paths y predicción
-        """
-        # 1) Guardar original en uploads/raw
-        file_path = await self.repo.save_raw(file, filename)
 
-        # 2) Leer imagen con OpenCV
-        img = cv2.imread(str(file_path), cv2.IMREAD_UNCHANGED)
-        if img is None:
+        El mismo ndarray se comparte entre el chequeo de grises, YOLO,
+        el preprocesado y la anotación: no hay relecturas de disco.
+        Una radiografía ya analizada con el mismo modelo sale de la caché (solo cuesta el hash).
+        """
+        # 1) Leer bytes subidos y encolar el guardado del original en uploads/raw
+        content = await file.read()
+        file_path = self.repo.save_raw(content, filename)
+
+        # 🎯 Misma imagen + mismo modelo → mismo resultado (sin YOLO, CNN ni dibujo)
+        clave = None
+        if self.cache is not None and self.pneumonia_model_loaded:
+            clave = self.cache.clave(content, self.model_version)
+            guardado = self.cache.get(clave)
+            if guardado is not None:
+                return {"file_path": file_path, **guardado, "cached": True}
+
+        result = self._analyze(content, filename, file_path)
+        if clave is not None:
+            self.cache.put(clave, {k: v for k, v in result.items() if k != "file_path"})
+        return result
+
+    def _analyze(self, content: bytes, filename: str, file_path):
+        """Pasos 2 a 6 de `analyze_xray` sobre los bytes ya leídos."""
+        # 2) Decodificar en memoria con OpenCV
+        try:
+            img = decode_image(content, cv2.IMREAD_UNCHANGED)
+        except ValueError:
             return {
-                "file_path": str(file_path),
+                "file_path": file_path,
                 "prediction": "Error leyendo imagen",
                 "confidence": None
             }
-
-        # 2.a) Detectar si es escala de grises (permitimos pequeños desvíos)
-        is_grayscale = False
-        if len(img.shape) == 2:
-            # ya es monocanal
-            is_grayscale = True
-        elif len(img.shape) == 3 and img.shape[2] == 3:
-            b, g, r = cv2.split(img)
-            # usar diferencia máxima entre canales (tolerancia)
-            max_bg = int(np.max(np.abs(b.astype(np.int16) - g.astype(np.int16))))
-            max_gr = int(np.max(np.abs(g.astype(np.int16) - r.astype(np.int16))))
-            if max_bg <= self.grayscale_tolerance and max_gr <= self.grayscale_tolerance:
-                is_grayscale = True
-
-        if not is_grayscale:
-            annotated = draw_xray_annotation(
-                img_path=file_path,
-                is_chest=False,
-                prediction="Imagen inválida (no está en escala de grises)",
-                confidence=0.0
-            )
-            proc_path = self.repo.save_processed(annotated, f"invalid_{filename}")
-            return {
-                "file_path": str(file_path),
-                "processed_path": proc_path,
-                "prediction": "Imagen inválida (no está en escala de grises)",
-                "confidence": None
-            }
-
-        # 3) Filtro YOLO: si YOLO está cargado, verificar detecciones "fuertes"
-        if self.yolo_loaded and self.yolo_model is not None:
-            try:
-                results = self.yolo_model(str(file_path))  # devuelve lista de Results
-                if results and len(results) > 0:
-                    r = results[0]
-                    boxes = getattr(r, "boxes", None)
-                    if boxes is not None and len(boxes) > 0:
-                        # intentar obtener clases y confs; si falla, consideramos "detecciones" como motivo de rechazo
-                        try:
-                            cls_tensor = boxes.cls  # tensor
-                            conf_tensor = boxes.conf
-                            cls_ids = cls_tensor.cpu().numpy().astype(int).tolist()
-                            confs = conf_tensor.cpu().numpy().tolist()
-                            labels = [r.names[int(c)] for c in cls_ids]
-                            # detecciones "fuertes"
-                            strong = [(lab, conf) for lab, conf in zip(labels, confs) if conf >= self.yolo_conf_threshold]
-                            if len(strong) > 0:
-                                # si TODAS las detecciones fuertes están en la lista de permitidas -> permitir,
-                                # si alguna NO está -> RECHAZAR (no es radiografía)
-                                if not all(lab in self.yolo_allowed for lab, _ in strong):
-                                    annotated = draw_xray_annotation(
-                                        img_path=file_path,
-                                        is_chest=False,
-                                        prediction="Imagen inválida (objetos detectados por YOLO)",
-                                        confidence=0.0
-                                    )
-                                    proc_path = self.repo.save_processed(annotated, f"invalid_{filename}")
-                                    return {
-                                        "file_path": str(file_path),
-                                        "processed_path": proc_path,
-                                        "prediction": "Imagen inválida (objetos detectados por YOLO)",
-                                        "confidence": None
-                                    }
-                        except Exception as e:
-                            # fallback: si no pudimos leer clases/confidencias, y hay cajas -> RECHAZAR
-                            print("⚠️ Error extrayendo clases de YOLO o cajas presentes:", e)
-                            annotated = draw_xray_annotation(
-                                img_path=file_path,
-                                is_chest=False,
-                                prediction="Imagen inválida (detección no válida)",
-                                confidence=0.0
-                            )
-                            proc_path = self.repo.save_processed(annotated, f"invalid_{filename}")
-                            return {
-                                "file_path": str(file_path),
-                                "processed_path": proc_path,
-                                "prediction": "Imagen inválida (detección no válida)",
-                                "confidence": None
-                            }
-            except Exception as e:
-                # si YOLO falla por cualquier motivo, NO bloqueamos el flujo: solo lo logueamos
-                print("⚠️ YOLO inference error (se continúa sin usar la salida):", e)
+        if img.dtype == np.uint16:
+            # PNG de 16 bits (común en radiografías): llevamos a 8 bits como hacía cv2.imread
+            img = (img // 257).astype(np.uint8)
+        # Versión BGR (3 canales) para YOLO y para dibujar la anotación
+        img_bgr = to_bgr(img)
+
+        # 2.a) Cascada barata (miniatura): color → rechazo; radiografía típica → se salta YOLO
+        decision = self.gate.evaluar(img)
+        if decision == RECHAZADA:
+            return self._invalid(img_bgr, filename, file_path, "Imagen inválida (no está en escala de grises)")
+
+        # 3) Filtro YOLO: solo si la cascada no está segura (y YOLO está cargado)
+        if decision == INCIERTA and self.yolo_loaded and self.yolo_model is not None:
+            inicio = time.perf_counter()
+            motivo = self._yolo_rejection(img_bgr)
+            self.gate.registrar("yolo", (time.perf_counter() - inicio) * 1000, RECHAZADA if motivo else ACEPTADA)
+            if motivo:
+                return self._invalid(img_bgr, filename, file_path, motivo)
 
         # 4) Preprocesar a tensor para modelo de neumonía
-        img_tensor = preprocess_image(str(file_path)).to(self.device)  # devuelve tensor [1,1,H,W]
+        img_tensor = preprocess_image(img).to(self.device)  # devuelve tensor [1,1,H,W]
 
         # 5) Predicción de neumonía
         if not self.pneumonia_model_loaded:
             return {
-                "file_path": str(file_path),
+                "file_path": file_path,
                 "prediction": "Modelo de neumonía no entrenado",
                 "confidence": None
             }
 
-        with torch.no_grad():
-            out = self.pneumonia_model(img_tensor)
-            prob = float(torch.sigmoid(out).cpu().numpy().item())  # prob en [0,1]
+        prob = float(self.pneumonia_backend.predict_proba(img_tensor)[0])  # prob en [0,1]
 
         prediction = "Pneumonia" if prob > 0.5 else "Normal"
 
         # 6) Anotar y guardar procesada
         annotated = draw_xray_annotation(
-            img_path=file_path,
+            img_path=img_bgr,
             is_chest=True,
             prediction=prediction,
             confidence=prob
@@ -197,8 +182,52 @@ class PneumoniaService:
         processed_path = self.repo.save_processed(annotated, f"proc_{filename}")
 
         return {
-            "file_path": str(file_path),
+            "file_path": file_path,
             "processed_path": processed_path,
             "prediction": prediction,
             "confidence": prob
         }
+
+    def _invalid(self, img_bgr, filename: str, file_path, prediction: str) -> dict:
+        """Anota la imagen como inválida, la guarda y arma la respuesta."""
+        annotated = draw_xray_annotation(
+            img_path=img_bgr,
+            is_chest=False,
+            prediction=prediction,
+            confidence=0.0
+        )
+        proc_path = self.repo.save_processed(annotated, f"invalid_{filename}")
+        return {
+            "file_path": file_path,
+            "processed_path": proc_path,
+            "prediction": prediction,
+            "confidence": None
+        }
+
+    def _yolo_rejection(self, img_bgr):
+        """Motivo de rechazo si YOLO ve objetos que no son de una radiografía; None si la imagen pasa."""
+        try:
+            results = self.yolo_model(img_bgr)  # devuelve lista de Results
+        except Exception as e:
+            # si YOLO falla por cualquier motivo, NO bloqueamos el flujo: solo lo logueamos
+            print("⚠️ YOLO inference error (se continúa sin usar la salida):", e)
+            return None
+        if not results:
+            return None
+        r = results[0]
+        boxes = getattr(r, "boxes", None)
+        if boxes is None or len(boxes) == 0:
+            return None
+        # intentar obtener clases y confs; si falla, consideramos "detecciones" como motivo de rechazo
+        try:
+            cls_ids = boxes.cls.cpu().numpy().astype(int).tolist()
+            confs = boxes.conf.cpu().numpy().tolist()
+            labels = [r.names[int(c)] for c in cls_ids]
+        except Exception as e:
+            print("⚠️ Error extrayendo clases de YOLO o cajas presentes:", e)
+            return "Imagen inválida (detección no válida)"
+        # detecciones "fuertes": si alguna NO está en la lista de permitidas -> RECHAZAR (no es radiografía)
+        strong = [lab for lab, conf in zip(labels, confs) if conf >= self.yolo_conf_threshold]
+        if strong and not all(lab in self.yolo_allowed for lab in strong):
+            return "Imagen inválida (objetos detectados por YOLO)"
+        return None
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.core.config import settings
+
+
+def huella_archivo(path) -> str:
+    """SHA-256 (16 caracteres) del contenido de un archivo de pesos; None si no existe."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Caché de resultados de visión por contenido de la imagen.
+
+    - Clave: hash de los bytes subidos + versión del modelo (hash de los pesos cargados),
+      así una imagen repetida (aunque tenga otro nombre) no vuelve a pasar por YOLO ni por la CNN,
+      y pesos nuevos nunca reutilizan resultados viejos.
+    - Dos niveles: LRU en memoria (`max_memoria`) y un JSON por clave en `cache_dir`
+      (`max_disco` archivos; se borran los usados hace más tiempo).
+    - `limpiar()` la vacía entera (ej. cuando termina un reentrenamiento).
+    """
+
+    def __init__(self, cache_dir=None, max_memoria: int = 512, max_disco: int = 5000):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memoria = max(0, max_memoria)
+        self.max_disco = max(0, max_disco)
+        self._memoria = OrderedDict()  # clave → resultado; el último es el más reciente
+        self._lock = threading.Lock()
+        self._metricas = dict.fromkeys(["hits_memoria", "hits_disco", "misses", "escrituras", "desalojados"], 0)
+        self._en_disco = 0
+        if self.cache_dir is not None and self.max_disco:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._en_disco = sum(1 for _ in self.cache_dir.glob("*.json"))
+        else:
+            self.cache_dir = None
+
+    @staticmethod
+    def clave(content: bytes, version: str) -> str:
+        h = hashlib.sha256(content)
+        h.update(f"|{version}".encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, clave: str):
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self._metricas["hits_memoria"] += 1
+                return self._memoria[clave]
+
+            path = self._path(clave)
+            try:
+                resultado = json.loads(path.read_text(encoding="utf-8")) if path else None
+            except (FileNotFoundError, json.JSONDecodeError):
+                resultado = None
+            if resultado is None:
+                self._metricas["misses"] += 1
+                return None
+            os.utime(path)  # la fecha de modificación marca el último uso (para el recorte)
+            self._guardar_memoria(clave, resultado)
+            self._metricas["hits_disco"] += 1
+            return resultado
+
+    def put(self, clave: str, resultado: dict):
+        with self._lock:
+            self._guardar_memoria(clave, resultado)
+            path = self._path(clave)
+            if path is not None:
+                nuevo = not path.exists()
+                # Temporal + rename: nunca se lee un JSON a medio escribir
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(resultado, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, path)
+                self._en_disco += nuevo
+                if self._en_disco > self.max_disco:
+                    self._recortar_disco()
+            self._metricas["escrituras"] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._memoria.clear()
+            if self.cache_dir is not None:
+                for path in self.cache_dir.glob("*.json"):
+                    path.unlink(missing_ok=True)
+                self._en_disco = 0
+
+    def estado(self) -> dict:
+        with self._lock:
+            hits = self._metricas["hits_memoria"] + self._metricas["hits_disco"]
+            consultas = hits + self._metricas["misses"]
+            return {
+                **self._metricas,
+                "hit_rate": round(hits / consultas, 4) if consultas else 0.0,
+                "en_memoria": len(self._memoria),
+                "en_disco": self._en_disco,
+                "max_memoria": self.max_memoria,
+                "max_disco": self.max_disco,
+            }
+
+    # ─────────────────────────────────────────────
+    # Internos (con self._lock tomado)
+    # ─────────────────────────────────────────────
+    def _path(self, clave: str):
+        return self.cache_dir / f"{clave}.json" if self.cache_dir is not None else None
+
+    def _guardar_memoria(self, clave, resultado):
+        if not self.max_memoria:
+            return
+        self._memoria[clave] = resultado
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _recortar_disco(self):
+        # Se baja al 90% de una vez, así no se lista el directorio en cada escritura
+        archivos = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        sobrantes = archivos[:max(0, len(archivos) - int(self.max_disco * 0.9))]
+        for path in sobrantes:
+            path.unlink(missing_ok=True)
+        self._en_disco = len(archivos) - len(sobrantes)
+        self._metricas["desalojados"] += len(sobrantes)
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Caché compartida de resultados de /vision (None si VISION_RESULT_CACHE=False)."""
+    global _result_cache
+    if _result_cache is None and settings.VISION_RESULT_CACHE:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    settings.VISION_RESULT_CACHE_DIR,
+                    max_memoria=settings.VISION_RESULT_CACHE_MEMORY,
+                    max_disco=settings.VISION_RESULT_CACHE_MAX_FILES,
+                )
+    return _result_cache
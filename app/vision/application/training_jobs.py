@@ -0,0 +1,204 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+# Estados posibles de un job
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED = {COMPLETED, FAILED, CANCELLED}
+
+
+def _run_training(epochs, lr, events):
+    """
+    Punto de entrada del proceso hijo: entrena y reporta cada época por la cola `events`.
+    Si el servicio usa un backend exportado (PNEUMONIA_BACKEND), su artefacto se regenera
+    aquí mismo: si no, al recargar el modelo se seguiría sirviendo el anterior.
+    Se importa aquí adentro para que el proceso de la API no cargue torch/datos de más.
+    """
+    from app.core.config import settings
+    from app.vision.training.export_pneumonia import export_pneumonia_model
+    from app.vision.training.train_pneumonia import train_pneumonia_model
+
+    try:
+        train_pneumonia_model(epochs=epochs, lr=lr, on_epoch=lambda metrics: events.put(("epoch", metrics)))
+        if settings.PNEUMONIA_BACKEND != "eager":
+            try:
+                export_pneumonia_model(formats=(settings.PNEUMONIA_BACKEND,))
+            except Exception as e:
+                # Los pesos nuevos ya están guardados: el servicio los carga en modo eager
+                # (load_pneumonia_backend rechaza artefactos más viejos que el .pth)
+                print(f"⚠️ No se pudo exportar el backend '{settings.PNEUMONIA_BACKEND}':", e)
+        events.put(("done", None))
+    except Exception as e:
+        events.put(("error", str(e)))
+
+
+class TrainingJobManager:
+    """
+    Jobs de entrenamiento en segundo plano para el modelo de neumonía.
+
+    - Cada entrenamiento corre en un proceso aparte (el event loop de la API no se bloquea).
+    - Solo un entrenamiento a la vez: los demás quedan en cola (no se apilan procesos).
+    - El progreso (métricas por época) llega por una multiprocessing.Queue y se guarda en el job.
+    - Un job en cola o en ejecución se puede cancelar.
+    """
+
+    def __init__(self, target=_run_training, max_history: int = 50, on_finish=None):
+        self._target = target
+        self._max_history = max_history
+        # Callbacks que se ejecutan cuando un job termina (ej. recargar el modelo)
+        self._on_finish = [on_finish] if on_finish else []
+
+        # "spawn": proceso limpio, sin heredar hilos ni estado de torch del servidor
+        self._ctx = mp.get_context("spawn")
+        self._jobs = {}             # job_id → dict con el estado
+        self._pending = deque()     # job_ids en cola
+        self._process = None        # proceso del job en ejecución
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="training-jobs", daemon=True)
+        self._dispatcher.start()
+
+    # ─────────────────────────────────────────────
+    # API pública
+    # ─────────────────────────────────────────────
+    def submit(self, epochs: int, lr: float) -> dict:
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "params": {"epochs": epochs, "lr": lr},
+            "metrics": [],
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._pending.append(job_id)
+            self._prune()
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job, metrics=list(job["metrics"]))
+            if job["status"] == QUEUED:
+                snapshot["queue_position"] = list(self._pending).index(job_id) + 1
+            return snapshot
+
+    def list(self):
+        with self._lock:
+            job_ids = list(self._jobs)
+        return [self.get(job_id) for job_id in job_ids]
+
+    def cancel(self, job_id: str):
+        """Cancela un job en cola o en ejecución. Devuelve el job, o None si no existe."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == QUEUED:
+                self._pending.remove(job_id)
+                job["status"] = CANCELLED
+                job["finished_at"] = time.time()
+            elif job["status"] == RUNNING:
+                # El hilo despachador detecta la terminación y cierra el job
+                job["status"] = CANCELLED
+                if self._process is not None:
+                    self._process.terminate()
+        return self.get(job_id)
+
+    def add_finish_listener(self, callback):
+        self._on_finish.append(callback)
+
+    # ─────────────────────────────────────────────
+    # Hilo despachador: ejecuta los jobs de a uno
+    # ─────────────────────────────────────────────
+    def _dispatch_loop(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                if not self._pending:
+                    self._wakeup.clear()
+                    continue
+                job_id = self._pending.popleft()
+                job = self._jobs[job_id]
+                job["status"] = RUNNING
+                job["started_at"] = time.time()
+
+            self._run_job(job)
+
+    def _run_job(self, job):
+        events = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=self._target,
+            args=(job["params"]["epochs"], job["params"]["lr"], events),
+            daemon=True,
+        )
+        with self._lock:
+            # Un cancel() pudo llegar entre RUNNING y aquí, cuando aún no había proceso que terminar:
+            # en ese caso no se arranca (si no, entrenaría y pisaría los pesos de un job cancelado).
+            # Se arranca con el lock tomado para que cancel() siempre encuentre el proceso.
+            if job["status"] == CANCELLED:
+                job["finished_at"] = time.time()
+                snapshot = dict(job)
+            else:
+                snapshot = None
+                self._process = process
+                process.start()
+        if snapshot is not None:
+            self._notify_finish(snapshot)
+            return
+
+        outcome = None
+        while outcome is None:
+            try:
+                kind, payload = events.get(timeout=0.5)
+            except queue.Empty:
+                if not process.is_alive():
+                    break
+                continue
+
+            with self._lock:
+                if kind == "epoch":
+                    job["metrics"].append(payload)
+                elif kind == "done":
+                    outcome = (COMPLETED, None)
+                elif kind == "error":
+                    outcome = (FAILED, payload)
+
+        process.join()
+        with self._lock:
+            self._process = None
+            if job["status"] == CANCELLED:
+                pass
+            elif outcome is None:
+                job["status"] = FAILED
+                job["error"] = f"El proceso de entrenamiento terminó inesperadamente (código {process.exitcode})"
+            else:
+                job["status"], job["error"] = outcome
+            job["finished_at"] = time.time()
+            snapshot = dict(job)
+
+        self._notify_finish(snapshot)
+
+    def _notify_finish(self, snapshot):
+        for callback in self._on_finish:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print("⚠️ Error en callback de fin de entrenamiento:", e)
+
+    def _prune(self):
+        # Conserva solo los últimos `max_history` jobs terminados
+        finished = [jid for jid, j in self._jobs.items() if j["status"] in FINISHED]
+        for job_id in finished[:-self._max_history]:
+            del self._jobs[job_id]
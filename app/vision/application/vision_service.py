@@ -1,11 +1,26 @@
 from pathlib import Path            # Manejo de rutas de forma más amigable (objetos Path)
+from typing import List           # Anotaciones de tipos
 import cv2                          # OpenCV: usado para leer, escribir y dibujar sobre imágenes
+from app.core.config import settings
 from app.vision.infrastructure.vision_yolo import YoloDetector  # Detector basado en YOLO
+from app.vision.infrastructure.batching_detector import BatchingDetector  # Micro-batching
+from app.vision.infrastructure.image_sink import ImageSink  # Guardado asíncrono en disco
+from app.vision.utils.image_io import load_image  # Decodifica bytes/ruta/ndarray una sola vez
+from app.vision.application.result_cache import get_result_cache, huella_archivo  # Caché por hash de imagen + modelo
 
 class VisionService:
     def __init__(self):
         # Inicializa el detector YOLO
-        self.detector = YoloDetector()
+        yolo = YoloDetector()
+        self.detector = yolo
+
+        # 📦 Micro-batching: agrupa peticiones concurrentes en una sola inferencia
+        if settings.VISION_BATCH_MAX_SIZE > 1:
+            self.detector = BatchingDetector(
+                self.detector,
+                max_batch_size=settings.VISION_BATCH_MAX_SIZE,
+                max_wait_ms=settings.VISION_BATCH_MAX_WAIT_MS,
+            )
 
         # 🟥 Zona restringida (x1, y1, x2, y2) – ajusta a tu gusto
         self.restricted_area = (50, 50, 300, 300)
@@ -16,12 +31,64 @@ class VisionService:
         self.PROCESSED_DIR = self.UPLOAD_DIR / "processed"
         self.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
+        # 💾 Las imágenes procesadas se guardan en segundo plano (u omiten)
+        self.sink = ImageSink(enabled=settings.VISION_PERSIST_PROCESSED)
+
+        # 🎯 Caché de resultados: la versión cambia si cambian los pesos de YOLO o la zona restringida
+        self.cache = get_result_cache()
+        yolo_path = Path(yolo.model_path)
+        self.model_version = f"yolo:{huella_archivo(yolo_path) or yolo_path.name}|zona:{self.restricted_area}"
+
     # ─────────────────────────────────────────────
     # Método principal: detección de objetos
     # ─────────────────────────────────────────────
-    def detect_objects(self, image_path: str):
-        detections = self.detector.detect(image_path)
+    def detect_objects(self, image, filename: str = "imagen.jpg"):
+        # `image` puede ser los bytes subidos, un ndarray o una ruta:
+        # se decodifica UNA vez y ese mismo array lo usan YOLO y el dibujo.
+        # Si los mismos bytes ya se analizaron con este modelo, solo cuesta el hash.
+        clave = self._clave(image)
+        if clave is not None:
+            guardado = self.cache.get(clave)
+            if guardado is not None:
+                return {**guardado, "cached": True}
+
+        img = load_image(image)
+        detections = self.detector.detect(img)
+        result = self._build_result(img, filename, detections)
+        if clave is not None:
+            self.cache.put(clave, result)
+        return result
+
+    # ─────────────────────────────────────────────
+    # Método: detección en lote (una sola inferencia YOLO)
+    # ─────────────────────────────────────────────
+    def detect_objects_batch(self, images: List, filenames: List[str]):
+        # Las que ya están en caché no entran al lote de YOLO
+        claves = [self._clave(image) for image in images]
+        results = [self.cache.get(clave) if clave is not None else None for clave in claves]
+        results = [{**result, "cached": True} if result is not None else None for result in results]
+        pendientes = [i for i, result in enumerate(results) if result is None]
+        if not pendientes:
+            return results
+
+        imgs = [load_image(images[i]) for i in pendientes]
+        detections_por_imagen = self.detector.detect_batch(imgs)
+        for i, img, detections in zip(pendientes, imgs, detections_por_imagen):
+            results[i] = self._build_result(img, filenames[i], detections)
+            if claves[i] is not None:
+                self.cache.put(claves[i], results[i])
+        return results
+
+    def _clave(self, image):
+        # Solo los bytes subidos se cachean (un ndarray o una ruta pueden cambiar por debajo)
+        if self.cache is None or not isinstance(image, (bytes, bytearray)):
+            return None
+        return self.cache.clave(image, self.model_version)
 
+    # ─────────────────────────────────────────────
+    # Método: arma la respuesta (alertas, imagen procesada y resumen)
+    # ─────────────────────────────────────────────
+    def _build_result(self, img, filename: str, detections):
         #  Alertas por intersección (mejor que "contenida 100%")
         alerts = []
         for det in detections:
@@ -32,13 +99,13 @@ class VisionService:
                 alerts.append(f"⚠️ {det['label']} dentro/encima de zona restringida")
 
         #  Dibuja zona + cajas y guarda imagen procesada dentro de app/vision
-        processed_path = self._draw_on_image(image_path, detections)
+        processed_path = self._draw_on_image(img, filename, detections)
 
         #  Resumen
         summary = {
             "total_objects": len(detections),
             "by_label": self._count_by_label(detections),
-            "processed_image": str(processed_path)  # ruta del archivo en app/vision/uploads/processed
+            "processed_image": processed_path  # ruta del archivo en app/vision/uploads/processed (None si no se guarda)
         }
 
         return {
@@ -79,12 +146,9 @@ class VisionService:
         # ─────────────────────────────────────────────
     # Método: dibuja cajas, textos y zona restringida en la imagen
     # ─────────────────────────────────────────────
-    def _draw_on_image(self, image_path, detections):
-        # Leer imagen desde disco
-        img = cv2.imread(image_path)
-        if img is None:
-            # Manejo robusto en caso de error de lectura (evita el "need at least one array to stack")
-            raise RuntimeError(f"No se pudo leer la imagen: {image_path}")
+    def _draw_on_image(self, img, filename, detections):
+        # Dibujamos sobre una copia: el array original ya decodificado no se toca
+        img = img.copy()
 
         #  Zona restringida (rojo)
         rx1, ry1, rx2, ry2 = map(int, self.restricted_area)
@@ -107,8 +171,7 @@ class VisionService:
             cv2.putText(img, tag, (x1, ty),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
-        #  Guardar dentro de app/vision/uploads/processed
-        out_name = f"result_{Path(image_path).name}"
+        #  Guardar dentro de app/vision/uploads/processed (en segundo plano)
+        out_name = f"result_{Path(filename).name}"
         out_path = self.PROCESSED_DIR / out_name
-        cv2.imwrite(str(out_path), img)
-        return out_path
+        return self.sink.write_image(img, out_path)
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Decisiones de la cascada
+RECHAZADA, ACEPTADA, INCIERTA = "rechazada", "aceptada", "incierta"
+
+
+class XrayGate:
+    """
+    Cascada barata que decide si una imagen puede ser una radiografía de tórax antes de gastar YOLO.
+
+    1. croma: en una miniatura (lado mayor `thumb_size`), la diferencia máxima entre canales
+       (cv2.absdiff sobre uint8, sin copias int16). Si supera `chroma_tol` la imagen es a color → rechazada.
+    2. histograma: estadísticas de la miniatura en grises. Si hay contraste (desvío ≥ `std_min`),
+       simetría izquierda/derecha (correlación con el espejo ≥ `symmetry_min`) y la franja central
+       (columna/mediastino) es más clara que los pulmones (cociente ≥ `center_ratio`) → aceptada sin YOLO.
+       Si alguna no se cumple → incierta.
+    3. YOLO: solo para las inciertas (lo corre el servicio, que registra aquí su tiempo con `registrar`).
+
+    Cada etapa lleva contadores de llamadas, decisiones y tiempo acumulado.
+    """
+
+    ETAPAS = ("croma", "histograma", "yolo")
+
+    def __init__(self, thumb_size: int = 128, chroma_tol: int = 6, histograma: bool = True,
+                 std_min: float = 40.0, symmetry_min: float = 0.6, center_ratio: float = 1.05):
+        self.thumb_size = max(8, thumb_size)
+        self.chroma_tol = chroma_tol
+        self.histograma = histograma
+        self.std_min = std_min
+        self.symmetry_min = symmetry_min
+        self.center_ratio = center_ratio
+        self._lock = threading.Lock()
+        self._stats = {etapa: {"llamadas": 0, "ms_total": 0.0, "decisiones": {}} for etapa in self.ETAPAS}
+
+    def version(self) -> str:
+        """Parámetros que cambian el resultado (forman parte de la clave de la caché de resultados)."""
+        hist = f"{self.std_min}/{self.symmetry_min}/{self.center_ratio}" if self.histograma else "off"
+        return f"gate:{self.thumb_size}/{self.chroma_tol}/{hist}"
+
+    def evaluar(self, img: np.ndarray) -> str:
+        """RECHAZADA (a color), ACEPTADA (radiografía típica, no hace falta YOLO) o INCIERTA."""
+        inicio = time.perf_counter()
+        mini = self.miniatura(img)
+        gris = self.es_gris(mini)
+        self.registrar("croma", (time.perf_counter() - inicio) * 1000, ACEPTADA if gris else RECHAZADA)
+        if not gris:
+            return RECHAZADA
+        if not self.histograma:
+            return INCIERTA
+
+        inicio = time.perf_counter()
+        decision = ACEPTADA if self.parece_torax(mini) else INCIERTA
+        self.registrar("histograma", (time.perf_counter() - inicio) * 1000, decision)
+        return decision
+
+    def miniatura(self, img: np.ndarray) -> np.ndarray:
+        alto, ancho = img.shape[:2]
+        escala = self.thumb_size / max(alto, ancho)
+        if escala >= 1:
+            return img
+        # INTER_AREA promedia los píxeles: barato y sin aliasing
+        return cv2.resize(img, (max(1, round(ancho * escala)), max(1, round(alto * escala))),
+                          interpolation=cv2.INTER_AREA)
+
+    def es_gris(self, mini: np.ndarray) -> bool:
+        if mini.ndim == 2:
+            return True
+        if mini.ndim != 3 or mini.shape[2] != 3:
+            return False  # ej. BGRA: como antes, no se considera una radiografía
+        b, g, r = cv2.split(mini)
+        return int(max(cv2.absdiff(b, g).max(), cv2.absdiff(g, r).max())) <= self.chroma_tol
+
+    def parece_torax(self, mini: np.ndarray) -> bool:
+        gris = (cv2.cvtColor(mini, cv2.COLOR_BGR2GRAY) if mini.ndim == 3 else mini).astype(np.float32)
+        if gris.std() < self.std_min:
+            return False
+
+        espejo = gris[:, ::-1]
+        centrado, espejo_centrado = gris - gris.mean(), espejo - espejo.mean()
+        denominador = float(np.sqrt((centrado ** 2).sum() * (espejo_centrado ** 2).sum()))
+        if not denominador or float((centrado * espejo_centrado).sum()) / denominador < self.symmetry_min:
+            return False
+
+        # Franja central (columna y mediastino) vs. franjas de los pulmones, en la mitad de arriba del tórax
+        ancho = gris.shape[1]
+        torax = gris[gris.shape[0] // 6: gris.shape[0] * 5 // 6]
+        centro = torax[:, ancho * 5 // 12: ancho * 7 // 12].mean()
+        pulmones = np.concatenate([torax[:, ancho // 6: ancho // 3], torax[:, ancho * 2 // 3: ancho * 5 // 6]], axis=1).mean()
+        return pulmones > 0 and centro / pulmones >= self.center_ratio
+
+    # ─────────────────────────────────────────────
+    # ⏱️ Contadores por etapa
+    # ─────────────────────────────────────────────
+    def registrar(self, etapa: str, ms: float, decision: str):
+        with self._lock:
+            stats = self._stats[etapa]
+            stats["llamadas"] += 1
+            stats["ms_total"] += ms
+            stats["decisiones"][decision] = stats["decisiones"].get(decision, 0) + 1
+
+    def estado(self) -> dict:
+        with self._lock:
+            etapas = {
+                etapa: {
+                    "llamadas": s["llamadas"],
+                    "ms_promedio": round(s["ms_total"] / s["llamadas"], 3) if s["llamadas"] else 0.0,
+                    "ms_total": round(s["ms_total"], 1),
+                    "decisiones": dict(s["decisiones"]),
+                }
+                for etapa, s in self._stats.items()
+            }
+        grises = etapas["croma"]["decisiones"].get(ACEPTADA, 0)
+        return {
+            "parametros": self.version(),
+            "etapas": etapas,
+            # De las imágenes en grises, cuántas no necesitaron YOLO
+            "yolo_evitado": round(1 - etapas["yolo"]["llamadas"] / grises, 4) if grises else 0.0,
+        }
@@ -5,9 +5,19 @@ class DetectorInterface(ABC):
     @abstractmethod
     def detect(self, image_path: str) -> List[Dict]:
         """
-        Detecta objetos en una imagen y devuelve una lista con:
+        Detecta objetos en una imagen (ruta o ndarray BGR ya decodificado)
+        y devuelve una lista con:
         - label (nombre del objeto)
         - confidence (probabilidad)
         - bbox (coordenadas de la caja)
         """
         pass
+
+    def detect_batch(self, image_paths: List[str]) -> List[List[Dict]]:
+        """
+        Detecta objetos en varias imágenes y devuelve una lista de detecciones
+        por imagen (mismo orden que la entrada).
+        Por defecto procesa una a una; los detectores que soporten lotes
+        (ej. YOLO) pueden sobrescribirlo para hacer una sola inferencia.
+        """
+        return [self.detect(path) for path in image_paths]
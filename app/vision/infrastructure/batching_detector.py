@@ -0,0 +1,87 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict
+
+from app.vision.domain.vision_interface import DetectorInterface
+
+
+class BatchingDetector(DetectorInterface):
+    """
+    Micro-batching delante de un detector (ej. YoloDetector).
+
+    Cada llamada a `detect()` se encola y espera su resultado. Un hilo de fondo
+    junta las peticiones que llegan casi al mismo tiempo (hasta `max_batch_size`
+    imágenes o `max_wait_ms` milisegundos, lo que ocurra primero), ejecuta UNA
+    sola inferencia por lote con `detector.detect_batch(...)` y reparte los
+    resultados a cada petición que estaba esperando.
+
+    Así, con muchas peticiones concurrentes, el costo de YOLO escala con el
+    número de lotes y no con el número de peticiones.
+    """
+
+    def __init__(self, detector: DetectorInterface, max_batch_size: int = 8, max_wait_ms: float = 10):
+        self.detector = detector
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        # Cola de peticiones pendientes: (imagen, Future con el resultado)
+        self._queue = queue.Queue()
+
+        # Hilo "daemon": no impide que el proceso termine
+        self._worker = threading.Thread(target=self._run, name="yolo-batcher", daemon=True)
+        self._worker.start()
+
+    def detect(self, image) -> List[Dict]:
+        # Validamos antes de encolar: una imagen inexistente no debe tumbar el lote completo
+        if isinstance(image, str) and not os.path.exists(image):
+            raise FileNotFoundError(f"❌ No se encontró la imagen: {image}")
+
+        future = Future()
+        self._queue.put((image, future))
+        # Bloquea SOLO el hilo de esta petición hasta que su lote se procese
+        return future.result()
+
+    def detect_batch(self, images: List) -> List[List[Dict]]:
+        # Un lote explícito ya viene armado: va directo al detector
+        return self.detector.detect_batch(images)
+
+    # ─────────────────────────────────────────────
+    # Hilo de fondo: arma lotes y los procesa
+    # ─────────────────────────────────────────────
+    def _run(self):
+        while True:
+            # Espera (sin límite) la primera petición del siguiente lote
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            # Junta más peticiones hasta llenar el lote o agotar la ventana de espera
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        images = [image for image, _ in batch]
+        try:
+            results = self.detector.detect_batch(images)
+        except Exception:
+            # Si el lote falla, reintentamos imagen por imagen para que
+            # una imagen corrupta no haga fallar a las demás peticiones.
+            for image, future in batch:
+                try:
+                    future.set_result(self.detector.detect(image))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        for (_, future), detections in zip(batch, results):
+            future.set_result(detections)
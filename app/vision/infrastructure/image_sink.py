@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+
+
+class ImageSink:
+    """
+    Persistencia asíncrona (y opcional) de imágenes en disco.
+
+    La petición HTTP ya tiene la imagen decodificada en memoria, así que escribirla
+    en disco no debe sumar latencia: las escrituras se encolan en un hilo de fondo
+    y la ruta se devuelve de inmediato (el archivo aparece unos milisegundos después).
+
+    Si `enabled` es False no se escribe nada y se devuelve None como ruta.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # Un solo hilo: las escrituras se hacen en orden y sin competir por disco
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-sink")
+        self._pending = []
+        # Las peticiones llegan desde varios hilos del threadpool a la vez
+        self._lock = threading.Lock()
+
+    def write_image(self, image, path: Path):
+        """Guarda un ndarray (formato OpenCV) en `path` en segundo plano."""
+        if not self.enabled:
+            return None
+        self._submit(cv2.imwrite, str(path), image)
+        return str(path)
+
+    def write_bytes(self, data: bytes, path: Path):
+        """Guarda los bytes originales de un archivo en `path` en segundo plano."""
+        if not self.enabled:
+            return None
+        self._submit(Path(path).write_bytes, data)
+        return str(path)
+
+    def flush(self):
+        """Espera a que terminen todas las escrituras pendientes (útil en tests/apagado)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def _submit(self, fn, *args):
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(_log_error)
+        with self._lock:
+            # Limpiamos las escrituras ya terminadas para no acumular Futures
+            self._pending = [f for f in self._pending if not f.done()]
+            self._pending.append(future)
+
+
+def _log_error(future):
+    # Un fallo de escritura no debe romper la petición, pero sí quedar registrado
+    if future.exception() is not None:
+        print("⚠️ Error guardando imagen en disco:", future.exception())
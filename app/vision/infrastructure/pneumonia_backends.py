@@ -0,0 +1,145 @@
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from app.vision.domain.pneumonia_model import SimpleCNN
+
+# 📦 Artefactos de cada backend, todos junto a pneumonia_cnn.pth
+ARTIFACTS = {
+    "eager": "pneumonia_cnn.pth",         # pesos fp32 (state_dict) → PyTorch "normal"
+    "torchscript": "pneumonia_cnn.ts",    # grafo TorchScript congelado (torch.jit.freeze)
+    "onnx": "pneumonia_cnn.onnx",         # grafo ONNX para ONNX Runtime
+    "int8": "pneumonia_cnn.int8.ts",      # TorchScript con capas Linear cuantizadas a int8
+}
+
+
+class PneumoniaBackend(ABC):
+    """
+    Contrato común de los backends de inferencia del SimpleCNN.
+    Todos reciben un tensor [N,1,224,224] normalizado y devuelven
+    un array con la probabilidad de neumonía de cada imagen.
+    """
+    name = "base"
+
+    @abstractmethod
+    def predict_proba(self, tensor: torch.Tensor) -> np.ndarray:
+        pass
+
+
+class EagerBackend(PneumoniaBackend):
+    """PyTorch en modo eager (comportamiento original)."""
+    name = "eager"
+
+    def __init__(self, model_path: Path, device):
+        self.device = device
+        self.model = SimpleCNN().to(device)
+        self.model.load_state_dict(torch.load(model_path, map_location=device))
+        self.model.eval()
+
+    def predict_proba(self, tensor):
+        with torch.inference_mode():
+            out = self.model(tensor.to(self.device))
+            return torch.sigmoid(out).cpu().numpy().reshape(-1)
+
+
+class TorchScriptBackend(PneumoniaBackend):
+    """Grafo TorchScript congelado: sin overhead de Python por capa y con fusiones de operadores."""
+    name = "torchscript"
+
+    def __init__(self, model_path: Path, device):
+        self.device = device
+        self.model = torch.jit.load(str(model_path), map_location=device)
+        self.model.eval()
+
+    def predict_proba(self, tensor):
+        with torch.inference_mode():
+            out = self.model(tensor.to(self.device))
+            return torch.sigmoid(out).cpu().numpy().reshape(-1)
+
+
+class QuantizedBackend(TorchScriptBackend):
+    """
+    TorchScript con `fc1`/`fc2` cuantizadas dinámicamente a int8 (solo CPU).
+    fc1 concentra ~25.7M de parámetros: en int8 ocupa ~4x menos memoria.
+    """
+    name = "int8"
+
+    def __init__(self, model_path: Path, device=None):
+        super().__init__(model_path, torch.device("cpu"))
+
+
+class OnnxRuntimeBackend(PneumoniaBackend):
+    """ONNX Runtime en CPU (dependencia opcional: `pip install onnxruntime`)."""
+    name = "onnx"
+
+    def __init__(self, model_path: Path, device=None):
+        import onnxruntime as ort  # 👈 import solo cuando se usa
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_proba(self, tensor):
+        x = tensor.detach().cpu().numpy().astype(np.float32, copy=False)
+        logits = self.session.run(None, {self.input_name: x})[0]
+        return (1.0 / (1.0 + np.exp(-logits))).reshape(-1)
+
+
+BACKENDS = {
+    "eager": EagerBackend,
+    "torchscript": TorchScriptBackend,
+    "onnx": OnnxRuntimeBackend,
+    "int8": QuantizedBackend,
+}
+
+
+def load_pneumonia_backend(name: str, models_dir: Path, device) -> PneumoniaBackend:
+    """
+    Crea el backend `name` a partir de su artefacto en `models_dir`.
+    Lanza ValueError si el backend no existe y FileNotFoundError si falta
+    el artefacto (hay que correr antes `python -m app.vision.training.export_pneumonia`)
+    o si es más viejo que pneumonia_cnn.pth (se reentrenó y no se volvió a exportar:
+    cargarlo serviría el modelo anterior).
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend desconocido '{name}'. Opciones: {', '.join(BACKENDS)}")
+
+    path = Path(models_dir) / ARTIFACTS[name]
+    if not path.exists():
+        raise FileNotFoundError(f"No se encontró el artefacto del backend '{name}': {path}")
+    pth_path = Path(models_dir) / ARTIFACTS["eager"]
+    if name != "eager" and pth_path.exists() and path.stat().st_mtime < pth_path.stat().st_mtime:
+        raise FileNotFoundError(f"El artefacto del backend '{name}' es anterior a {pth_path.name}: vuelve a exportarlo")
+
+    return BACKENDS[name](path, device)
+
+
+def save_atomic(path: Path, write) -> Path:
+    """
+    Guarda un artefacto sin dejarlo nunca a medias: `write(ruta)` escribe en un temporal de la
+    misma carpeta y luego os.replace lo pone en su lugar (atómico). Si el proceso se corta
+    (ej. un entrenamiento cancelado con terminate()), queda el archivo anterior intacto.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return path
+
+
+def quantize_int8(model: nn.Module) -> nn.Module:
+    """Cuantización dinámica int8 de las capas Linear (pesos int8, activaciones fp32)."""
+    return torch.ao.quantization.quantize_dynamic(model.cpu().eval(), {nn.Linear}, dtype=torch.qint8)
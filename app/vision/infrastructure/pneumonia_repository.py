@@ -2,18 +2,19 @@
 # Es más robusto y fácil de usar que las cadenas de texto.
 from pathlib import Path 
 
-# Importa el módulo cv2, que es la biblioteca de código abierto de visión por computadora (OpenCV).
-# Se usa para guardar la imagen procesada en el disco.
-import cv2
+# ImageSink escribe en disco en un hilo de fondo, sin bloquear la petición.
+from app.vision.infrastructure.image_sink import ImageSink
 
 class PneumoniaRepository:
-    def __init__(self, base_dir: Path = None):
+    def __init__(self, base_dir: Path = None, persist_raw: bool = True, persist_processed: bool = True):
         """
         Constructor de la clase. Se ejecuta al crear un nuevo objeto PneumoniaRepository.
 
         Args:
             base_dir (Path, opcional): La ruta base para almacenar las imágenes.
             Si no se proporciona (es None), se calcula automáticamente.
+            persist_raw (bool): si False, no se guardan las imágenes originales.
+            persist_processed (bool): si False, no se guardan las imágenes anotadas.
         """
         # Si no se especifica una ruta base, se calcula una ruta predeterminada.
         if base_dir is None:
@@ -37,49 +38,39 @@ class PneumoniaRepository:
         self.raw_dir.mkdir(parents=True, exist_ok=True)
         self.proc_dir.mkdir(parents=True, exist_ok=True)
 
-    async def save_raw(self, file, filename: str) -> Path:
+        # Un "sink" por tipo de imagen: cada uno puede activarse o no por separado.
+        self.raw_sink = ImageSink(enabled=persist_raw)
+        self.proc_sink = ImageSink(enabled=persist_processed)
+
+    def save_raw(self, content: bytes, filename: str):
         """
-        Guarda un archivo subido de manera asíncrona en la carpeta 'raw'.
+        Guarda en segundo plano los bytes originales de un archivo subido en la carpeta 'raw'.
 
         Args:
-            file: El objeto de archivo subido (típicamente de un framework como FastAPI).
+            content (bytes): El contenido del archivo ya leído en memoria.
             filename (str): El nombre del archivo con su extensión (ej. "imagen.jpg").
 
         Returns:
-            str: La ruta completa del archivo guardado como una cadena de texto.
+            str: La ruta donde quedará el archivo (None si no se guardan originales).
         """
         # Combina la ruta de la carpeta 'raw' con el nombre del archivo.
-        file_path = self.raw_dir / filename
-
-        # Lee el contenido del archivo subido de forma asíncrona.
-        # El 'await' pausa la ejecución hasta que la lectura se complete,
-        # lo que permite al programa realizar otras tareas mientras espera.
-        content = await file.read()
-
-        # Abre el archivo en modo de escritura binaria ('wb').
-        # El 'with' asegura que el archivo se cierre automáticamente al salir del bloque.
-        with open(file_path, "wb") as buffer:
-            # Escribe el contenido del archivo en el búfer.
-            buffer.write(content)
+        file_path = self.raw_dir / Path(filename).name
 
-        # Devuelve la ruta del archivo guardado como una cadena de texto.
-        return str(file_path)
+        # La escritura se encola; la petición no espera al disco.
+        return self.raw_sink.write_bytes(content, file_path)
 
-    def save_processed(self, image, filename: str) -> str:
+    def save_processed(self, image, filename: str):
         """
-        Guarda una imagen procesada en la carpeta 'xray_proc'.
+        Guarda en segundo plano una imagen procesada en la carpeta 'xray_proc'.
 
         Args:
             image: La imagen procesada, probablemente un array de NumPy (formato de OpenCV).
             filename (str): El nombre del archivo a guardar.
 
         Returns:
-            str: La ruta completa del archivo guardado como una cadena de texto.
+            str: La ruta donde quedará el archivo (None si no se guardan procesadas).
         """
         # Combina la ruta de la carpeta 'xray_proc' con el nombre del archivo.
-        file_path = self.proc_dir / filename
-        # Utiliza cv2.imwrite() para guardar la imagen en el disco.
-        # Espera que la ruta sea una cadena, por lo que convertimos el objeto Path.
-        cv2.imwrite(str(file_path), image)
-        # Devuelve la ruta del archivo guardado.
-        return str(file_path)
\ No newline at end of file
+        file_path = self.proc_dir / Path(filename).name
+        # cv2.imwrite() se ejecuta en el hilo del sink; devolvemos la ruta de inmediato.
+        return self.proc_sink.write_image(image, file_path)
\ No newline at end of file
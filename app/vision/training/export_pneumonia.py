@@ -0,0 +1,145 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Subset
+
+from app.vision.domain.pneumonia_model import SimpleCNN
+from app.vision.infrastructure.pneumonia_backends import (
+    ARTIFACTS, BACKENDS, load_pneumonia_backend, quantize_int8, save_atomic
+)
+
+# 📂 Directorios base
+BASE_DIR = Path(__file__).resolve().parent.parent  # app/vision
+MODELS_DIR = BASE_DIR / "infrastructure" / "model"
+DATA_DIR = BASE_DIR / "data" / "chest_xray"
+
+
+def export_pneumonia_model(models_dir: Path = MODELS_DIR, formats=("torchscript", "onnx", "int8")):
+    """
+    Exporta el SimpleCNN entrenado (pneumonia_cnn.pth) a los formatos optimizados
+    y deja cada artefacto junto al .pth:
+    - torchscript → pneumonia_cnn.ts       (trace + freeze)
+    - onnx        → pneumonia_cnn.onnx     (batch dinámico)
+    - int8        → pneumonia_cnn.int8.ts  (Linear cuantizadas a int8 + trace + freeze)
+    Cada artefacto se escribe con `save_atomic` (temporal + os.replace).
+    """
+    models_dir = Path(models_dir)
+    pth_path = models_dir / ARTIFACTS["eager"]
+    if not pth_path.exists():
+        raise FileNotFoundError(f"Primero entrena el modelo: no existe {pth_path}")
+
+    model = SimpleCNN()
+    model.load_state_dict(torch.load(pth_path, map_location="cpu"))
+    model.eval()
+
+    example = torch.zeros(1, 1, 224, 224)
+    exported = {}
+
+    for fmt in formats:
+        out_path = models_dir / ARTIFACTS[fmt]
+
+        if fmt == "torchscript":
+            with torch.no_grad():
+                traced = torch.jit.freeze(torch.jit.trace(model, example))
+            save_atomic(out_path, traced.save)
+
+        elif fmt == "int8":
+            with torch.no_grad():
+                traced = torch.jit.freeze(torch.jit.trace(quantize_int8(model), example))
+            save_atomic(out_path, traced.save)
+
+        elif fmt == "onnx":
+            try:
+                save_atomic(out_path, lambda tmp: torch.onnx.export(
+                    model, example, tmp,
+                    input_names=["input"], output_names=["logits"],
+                    dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                    opset_version=17,
+                    dynamo=False,
+                ))
+            except ImportError as e:
+                # `onnx` es opcional: si no está instalado, seguimos con los demás formatos
+                print(f"⚠️ Se omite ONNX (falta dependencia): {e}")
+                continue
+
+        else:
+            raise ValueError(f"Formato desconocido '{fmt}'")
+
+        size_mb = out_path.stat().st_size / 1e6
+        exported[fmt] = str(out_path)
+        print(f"✅ {fmt}: {out_path} ({size_mb:.1f} MB)")
+
+    return exported
+
+
+def check_parity(models_dir: Path = MODELS_DIR, backends=("torchscript", "onnx", "int8"),
+                 split: str = "test", limit: int = None, batch_size: int = 32):
+    """
+    Compara cada backend contra el modelo eager sobre el split `split` de chest_xray.
+
+    Reporta por backend:
+    - max_abs_diff: máxima diferencia de probabilidad frente a eager
+    - agreement: % de imágenes con la misma clase (umbral 0.5) que eager
+    - accuracy: exactitud contra las etiquetas reales
+    - ms_per_image: latencia media por imagen
+    """
+    from app.vision.utils.dataset_wrapper import CustomDataset  # 👈 import solo cuando se llama
+
+    device = torch.device("cpu")
+    dataset = CustomDataset(root=DATA_DIR / split)
+    if limit:
+        dataset = Subset(dataset, list(range(min(limit, len(dataset)))))
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=False)
+
+    # Cargamos las imágenes una sola vez para que todos los backends midan lo mismo
+    batches = [(inputs, labels.numpy()) for inputs, labels in loader]
+    labels = np.concatenate([lab for _, lab in batches])
+
+    def run(backend):
+        probs, start = [], time.perf_counter()
+        for inputs, _ in batches:
+            probs.append(backend.predict_proba(inputs))
+        elapsed = time.perf_counter() - start
+        return np.concatenate(probs), 1000 * elapsed / len(labels)
+
+    reference, ref_ms = run(load_pneumonia_backend("eager", models_dir, device))
+    report = {"eager": {
+        "accuracy": float(((reference > 0.5) == labels).mean()),
+        "ms_per_image": ref_ms,
+    }}
+
+    for name in backends:
+        try:
+            backend = load_pneumonia_backend(name, models_dir, device)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"⚠️ Se omite '{name}': {e}")
+            continue
+
+        probs, ms = run(backend)
+        report[name] = {
+            "max_abs_diff": float(np.max(np.abs(probs - reference))),
+            "agreement": float(((probs > 0.5) == (reference > 0.5)).mean()),
+            "accuracy": float(((probs > 0.5) == labels).mean()),
+            "ms_per_image": ms,
+        }
+
+    print(f"📊 Paridad en '{split}' ({len(labels)} imágenes):")
+    for name, metrics in report.items():
+        print(f"  - {name:12s} " + ", ".join(f"{k}={v:.4f}" for k, v in metrics.items()))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el SimpleCNN de neumonía a backends optimizados")
+    parser.add_argument("--formats", nargs="+", default=["torchscript", "onnx", "int8"],
+                        choices=[b for b in BACKENDS if b != "eager"])
+    parser.add_argument("--parity", action="store_true", help="Verificar paridad contra eager en chest_xray/test")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de imágenes para la verificación")
+    args = parser.parse_args()
+
+    export_pneumonia_model(formats=args.formats)
+    if args.parity:
+        check_parity(backends=args.formats, limit=args.limit)
@@ -4,9 +4,17 @@ import torch.optim as optim
 from app.vision.domain.pneumonia_model import SimpleCNN
 from app.vision.utils.dataset_wrapper import get_loaders
 from pathlib import Path
-import matplotlib.pyplot as plt
+from app.core.plot_service import render_plot
+from app.vision.infrastructure.pneumonia_backends import save_atomic
 
-def train_pneumonia_model(epochs=5, lr=0.001):
+def train_pneumonia_model(epochs=5, lr=0.001, on_epoch=None):
+    """
+    Entrena el SimpleCNN de neumonía y guarda pesos y gráfica de métricas.
+
+    - on_epoch (opcional): función que recibe un dict con las métricas de cada época
+      (epoch, epochs, train_loss, val_loss, val_accuracy). La usa el sistema de jobs
+      para reportar el progreso mientras el entrenamiento corre en otro proceso.
+    """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")  #si tienes GPU con CUDA, usará la GPU. Si no, se queda en GPU 
 
 
@@ -76,25 +84,41 @@ def train_pneumonia_model(epochs=5, lr=0.001):
         val_accuracies.append(accuracy)
 
         print(f"Epoch {epoch+1}/{epochs}, Train Loss: {epoch_loss:.4f}, Val Loss: {val_loss:.4f}, Val Acc: {accuracy:.2f}")
-
-    # Guardar modelo
-    torch.save(model.state_dict(), save_path)
+        if on_epoch is not None:
+            on_epoch({
+                "epoch": epoch + 1,
+                "epochs": epochs,
+                "train_loss": epoch_loss,
+                "val_loss": val_loss,
+                "val_accuracy": accuracy,
+            })
+
+    # Guardar modelo (temporal + os.replace: si cancelan el job a mitad, el .pth anterior queda intacto)
+    save_atomic(save_path, lambda tmp: torch.save(model.state_dict(), tmp))
     print(f"✅ Modelo guardado en {save_path}")
 
-    # Guardar gráfica
-    plt.figure(figsize=(8, 6))
-    plt.plot(train_losses, label="Train Loss")
-    plt.plot(val_losses, label="Val Loss")
-    plt.plot(val_accuracies, label="Val Accuracy")
-    plt.xlabel("Epoch")
-    plt.ylabel("Value")
-    plt.title("Training Metrics - Pneumonia CNN")
-    plt.legend()
-    plt.grid()
-    plt.tight_layout()
-    plt.savefig(plot_path)
-    plt.close()
+    # Guardar gráfica (este código ya corre en el proceso del job, fuera de la API)
+    render_plot("lines", {
+        "series": [
+            {"values": train_losses, "label": "Train Loss"},
+            {"values": val_losses, "label": "Val Loss"},
+            {"values": val_accuracies, "label": "Val Accuracy"},
+        ],
+        "figsize": [8, 6],
+        "grid": True,
+        "xlabel": "Epoch",
+        "ylabel": "Value",
+        "title": "Training Metrics - Pneumonia CNN",
+    }, plot_path)
     print(f"📊 Gráfica guardada en {plot_path}")
 
+    return {
+        "model_path": str(save_path),
+        "plot_path": str(plot_path),
+        "train_losses": train_losses,
+        "val_losses": val_losses,
+        "val_accuracies": val_accuracies,
+    }
+
 if __name__ == "__main__":
     train_pneumonia_model()
@@ -3,6 +3,7 @@ from torchvision.datasets import ImageFolder  # Para leer imágenes organizadas
 from torch.utils.data import DataLoader, Subset  # DataLoader = hace batches, Subset = selecciona subconjunto
 from pathlib import Path  # Manejo elegante de rutas de archivos/carpetas
 from app.vision.utils.preprocess import preprocess_image  # Tu función personalizada para procesar imágenes
+from app.vision.utils.tensor_cache import get_cached_dataset  # Caché uint8 memory-mapped ya preprocesada
 import torch  # Framework principal de deep learning
 
 
@@ -27,7 +28,7 @@ class CustomDataset(ImageFolder):
 
 
 # 🔹 Función para crear los DataLoaders (entrenamiento, validación, test)
-def get_loaders(batch_size=32, subset_debug=False):
+def get_loaders(batch_size=32, subset_debug=False, use_cache=True):
     # Localizamos la carpeta base (subimos dos niveles desde este archivo)
     BASE_DIR = Path(__file__).resolve().parent.parent
     
@@ -35,9 +36,16 @@ def get_loaders(batch_size=32, subset_debug=False):
     data_dir = BASE_DIR / "data" / "chest_xray"
 
     # Creamos datasets para cada partición de los datos
-    train_dataset = CustomDataset(root=data_dir / "train")  # Imágenes de entrenamiento
-    val_dataset = CustomDataset(root=data_dir / "val")      # Imágenes de validación
-    test_dataset = CustomDataset(root=data_dir / "test")    # Imágenes de prueba final
+    if use_cache:
+        # 💾 Caché: las imágenes se decodifican y redimensionan una sola vez (primera corrida);
+        # las épocas siguientes leen uint8 memory-mapped. Se reconstruye sola si cambian los archivos.
+        train_dataset = get_cached_dataset("train", data_dir)
+        val_dataset = get_cached_dataset("val", data_dir)
+        test_dataset = get_cached_dataset("test", data_dir)
+    else:
+        train_dataset = CustomDataset(root=data_dir / "train")  # Imágenes de entrenamiento
+        val_dataset = CustomDataset(root=data_dir / "val")      # Imágenes de validación
+        test_dataset = CustomDataset(root=data_dir / "test")    # Imágenes de prueba final
 
     # 🔹 Opción: usar solo un subconjunto pequeño del dataset (útil para pruebas rápidas)
     if subset_debug:
@@ -1,12 +1,14 @@
 import cv2  # 📦 Librería OpenCV → permite leer imágenes, dibujar texto, rectángulos, etc.
+import numpy as np
+from app.vision.utils.image_io import to_bgr
 
 # 🔹 Función que dibuja anotaciones sobre una radiografía
-def draw_xray_annotation(img_path: str, is_chest: bool, prediction: str, confidence: float):
+def draw_xray_annotation(img_path, is_chest: bool, prediction: str, confidence: float):
     """
     Dibuja texto sobre la radiografía dependiendo del resultado.
     
     Parámetros:
-    - img_path (str): ruta de la imagen a procesar.
+    - img_path (str | ndarray): ruta de la imagen o imagen ya decodificada en memoria.
     - is_chest (bool): indica si la imagen realmente es de tórax.
     - prediction (str): predicción del modelo ("Normal" o "Neumonia").
     - confidence (float): nivel de confianza del modelo (0.0 a 1.0).
@@ -15,8 +17,14 @@ def draw_xray_annotation(img_path: str, is_chest: bool, prediction: str, confide
     - img: la imagen con el texto/anotación dibujada.
     """
 
-    #  Leemos la imagen desde la ruta usando OpenCV
-    img = cv2.imread(img_path)
+    #  Si ya tenemos la imagen en memoria, dibujamos sobre una copia en BGR;
+    #  si no, la leemos desde la ruta usando OpenCV
+    if isinstance(img_path, np.ndarray):
+        img = to_bgr(img_path)
+        if img is img_path:
+            img = img.copy()  # no modificar el array original
+    else:
+        img = cv2.imread(str(img_path))
 
     #  Caso 1: la imagen NO es de tórax
     if not is_chest:
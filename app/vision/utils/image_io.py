@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+
+
+def decode_image(data: bytes, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """
+    Decodifica en memoria los bytes de una imagen subida (sin pasar por disco).
+
+    Parámetros:
+    - data (bytes): contenido del archivo (jpg, png, ...).
+    - flags: modo de lectura de OpenCV (por defecto BGR de 3 canales).
+
+    Devuelve:
+    - ndarray con la imagen. Lanza ValueError si los bytes no son una imagen válida.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    img = cv2.imdecode(buffer, flags) if buffer.size else None
+    if img is None:
+        raise ValueError("No se pudo decodificar la imagen")
+    return img
+
+
+def load_image(source) -> np.ndarray:
+    """
+    Devuelve la imagen en BGR a partir de bytes, de una ruta o de un ndarray ya decodificado.
+    Así los servicios aceptan cualquiera de las tres formas y solo decodifican una vez.
+    """
+    if isinstance(source, np.ndarray):
+        return to_bgr(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return decode_image(bytes(source))
+
+    img = cv2.imread(str(source))
+    if img is None:
+        raise RuntimeError(f"No se pudo leer la imagen: {source}")
+    return img
+
+
+def to_bgr(img: np.ndarray) -> np.ndarray:
+    """Convierte una imagen monocanal o BGRA a BGR de 3 canales (si ya es BGR la devuelve tal cual)."""
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img
+
+
+def to_gray(img: np.ndarray) -> np.ndarray:
+    """Convierte una imagen BGR o BGRA a escala de grises (si ya es monocanal la devuelve tal cual)."""
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -2,9 +2,15 @@ import cv2
 import torch
 import numpy as np
 from torchvision import transforms
+from app.vision.utils.image_io import to_gray
 
-def preprocess_image(file_path: str, target_size=(224, 224), for_batch: bool = True):
-    img = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+def preprocess_image(file_path, target_size=(224, 224), for_batch: bool = True):
+    # file_path puede ser una ruta o una imagen ya decodificada (ndarray):
+    # con el ndarray evitamos volver a leer y decodificar el archivo.
+    if isinstance(file_path, np.ndarray):
+        img = to_gray(file_path)
+    else:
+        img = cv2.imread(str(file_path), cv2.IMREAD_GRAYSCALE)
     img = cv2.resize(img, target_size)
     img = img / 255.0
     img = (img - 0.5) / 0.5  # Normalizar a [-1,1]
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from torchvision.datasets import ImageFolder
+
+# 📂 Dónde viven los datos y la caché
+BASE_DIR = Path(__file__).resolve().parent.parent  # app/vision
+DATA_DIR = BASE_DIR / "data" / "chest_xray"
+CACHE_DIR = BASE_DIR / "data" / "cache"
+
+SPLITS = ("train", "val", "test")
+
+
+# 🔹 Huella de los archivos fuente: si cambia algún archivo (ruta, tamaño o fecha), cambia la huella
+def fingerprint(samples, root: Path) -> str:
+    h = hashlib.sha256()
+    for path, label in samples:
+        st = os.stat(path)
+        rel = os.path.relpath(path, root)
+        h.update(f"{rel}|{label}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _cache_paths(cache_dir: Path, split: str):
+    return {
+        "images": cache_dir / f"{split}_images.npy",   # uint8 [N,H,W] (memory-mapped)
+        "labels": cache_dir / f"{split}_labels.npy",   # int64 [N]
+        "index": cache_dir / f"{split}_index.json",    # huella, clases y lista de archivos
+    }
+
+
+def build_split_cache(split_dir: Path, cache_dir: Path, split: str, target_size=(224, 224)) -> dict:
+    """
+    Decodifica y redimensiona UNA sola vez todas las imágenes de un split y las guarda como:
+    - <split>_images.npy → array uint8 [N,224,224] que luego se abre con memory-map
+    - <split>_labels.npy → etiquetas
+    - <split>_index.json → huella de los archivos fuente (para invalidar la caché)
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    paths = _cache_paths(cache_dir, split)
+
+    # ImageFolder nos da el mismo orden y mapeo de clases que usa el entrenamiento
+    folder = ImageFolder(split_dir)
+    samples = folder.samples
+    width, height = target_size
+
+    # Escribimos a un archivo temporal y lo renombramos al final: una caché a medio
+    # construir (ej. si se corta el proceso) nunca queda como válida.
+    tmp_images = paths["images"].with_suffix(".tmp.npy")
+    images = np.lib.format.open_memmap(tmp_images, mode="w+", dtype=np.uint8, shape=(len(samples), height, width))
+    for i, (path, _) in enumerate(samples):
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise RuntimeError(f"No se pudo leer la imagen: {path}")
+        images[i] = cv2.resize(img, target_size)
+    images.flush()
+    del images
+    os.replace(tmp_images, paths["images"])
+
+    np.save(paths["labels"], np.asarray([label for _, label in samples], dtype=np.int64))
+
+    index = {
+        "fingerprint": fingerprint(samples, split_dir),
+        "classes": folder.classes,
+        "class_to_idx": folder.class_to_idx,
+        "target_size": list(target_size),
+        "count": len(samples),
+        "files": [os.path.relpath(path, split_dir) for path, _ in samples],
+    }
+    with open(paths["index"], "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    print(f"💾 Caché '{split}' construida: {len(samples)} imágenes en {paths['images']}")
+    return index
+
+
+def ensure_split_cache(split_dir: Path, cache_dir: Path, split: str, target_size=(224, 224)) -> dict:
+    """Devuelve las rutas de la caché del split, reconstruyéndola si falta o si los archivos fuente cambiaron."""
+    paths = _cache_paths(cache_dir, split)
+
+    valid = False
+    if all(p.exists() for p in paths.values()):
+        with open(paths["index"], encoding="utf-8") as f:
+            index = json.load(f)
+        samples = ImageFolder(split_dir).samples
+        valid = (
+            index.get("target_size") == list(target_size)
+            and index.get("count") == len(samples)
+            and index.get("fingerprint") == fingerprint(samples, split_dir)
+        )
+
+    if not valid:
+        print(f"⏳ Caché '{split}' inexistente o desactualizada, construyendo...")
+        build_split_cache(split_dir, cache_dir, split, target_size)
+
+    return paths
+
+
+# 🔹 Dataset que lee de la caché memory-mapped (sin decodificar JPEG en cada época)
+class CachedXrayDataset(Dataset):
+    def __init__(self, images_path: Path, labels_path: Path):
+        # mmap_mode="c" (copy-on-write): el SO pagina el archivo bajo demanda y
+        # torch.from_numpy puede envolver cada imagen sin copiarla.
+        self.images = np.load(images_path, mmap_mode="c")
+        self.labels = np.load(labels_path)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        # Vista uint8 [H,W] sin copia → float32 normalizado a [-1,1] como preprocess_image
+        img = torch.from_numpy(self.images[index])
+        tensor = img.unsqueeze(0).to(torch.float32).div_(127.5).sub_(1.0)  # [1,H,W]
+        return tensor, int(self.labels[index])
+
+
+def get_cached_dataset(split: str, data_dir: Path = DATA_DIR, cache_dir: Path = CACHE_DIR) -> CachedXrayDataset:
+    paths = ensure_split_cache(data_dir / split, cache_dir, split)
+    return CachedXrayDataset(paths["images"], paths["labels"])
+
+
+if __name__ == "__main__":
+    # Construye (o valida) la caché de todos los splits: python -m app.vision.utils.tensor_cache
+    for split in SPLITS:
+        ensure_split_cache(DATA_DIR / split, CACHE_DIR, split)
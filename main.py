@@ -24,6 +24,7 @@ def create_app() -> FastAPI:
     from app.recomendation.api.routes import router as recommendation_router
     from app.prediction.api.routes import router as prediction_router
     from app.automation.api.routes import router as automation_router
+    from app.core.plot_routes import router as plots_router
 
     # Incluye routers
     app.include_router(nlp_router)
@@ -31,6 +32,7 @@ def create_app() -> FastAPI:
     app.include_router(recommendation_router)
     app.include_router(prediction_router)
     app.include_router(automation_router)
+    app.include_router(plots_router)
     return app
 
 app = create_app()
@@ -0,0 +1,306 @@
+import time
+import pytest
+from app.automation.infrastructure.model_residency import ModelResidency
+
+
+def test_importar_rutas_no_carga_whisper():
+    """
+    Importar las rutas de automatización no importa whisper ni carga ningún modelo.
+    """
+    import subprocess
+    import sys
+
+    codigo = "import sys, app.automation.api.routes; print('whisper' in sys.modules)"
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    assert salida.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_residencia_lru_inactividad_y_lista_blanca():
+    """
+    Los modelos se cargan una sola vez al usarse, se descartan por LRU y por inactividad,
+    nunca mientras están en uso, y solo se aceptan los de la lista blanca.
+    """
+    cargas = []
+
+    def loader(nombre):
+        cargas.append(nombre)
+        return f"modelo-{nombre}"
+
+    residencia = ModelResidency(loader, permitidos=["tiny", "base", "small"], max_resident=2, idle_timeout=60)
+    assert residencia.cargados() == []  # nada se carga por adelantado
+
+    with residencia.usar("tiny") as m:
+        assert m == "modelo-tiny"
+    with residencia.usar("tiny"):
+        pass
+    assert cargas == ["tiny"]  # reutilizado
+
+    with residencia.usar("base"):
+        with residencia.usar("small"):
+            # tiny es el menos usado recientemente y no está prestado → sale
+            assert residencia.cargados() == ["base", "small"]
+    assert cargas == ["tiny", "base", "small"]
+
+    with pytest.raises(ValueError):
+        with residencia.usar("large"):
+            pass
+
+    # inactividad: se descargan solo los que no están en uso
+    with residencia.usar("small"):
+        descargados = residencia.descargar_inactivos(ahora=time.monotonic() + 120)
+    assert descargados == ["base"] and residencia.cargados() == ["small"]
+
+    residencia.preload(["base"], en_segundo_plano=False)
+    assert residencia.cargados() == ["small", "base"]
+    assert [m["modelo"] for m in residencia.estado()["cargados"]] == ["base", "small"]
+
+
+def _transcripcion_falsa(audio_path, model_size):
+    # Sustituto del trabajador Whisper: tarda un poco y dice qué proceso lo atendió
+    import os
+    import time
+    time.sleep(0.5)
+    if model_size == "roto":
+        raise RuntimeError("audio ilegible")
+    return {"text": f"{os.path.basename(audio_path)}:{model_size}", "worker_pid": os.getpid(), "resident_models": [model_size]}
+
+
+def test_cola_de_transcripciones_paralela_con_contrapresion(tmp_path):
+    """
+    Las transcripciones corren en varios procesos a la vez; con la cola llena `submit`
+    rechaza (429 en la API); al terminar se borra el audio temporal.
+    """
+    from concurrent.futures import wait
+    from app.automation.application.transcription_jobs import (
+        TranscriptionJobManager, QueueFullError, COMPLETED, FAILED,
+    )
+
+    jobs = TranscriptionJobManager(workers=2, max_queue=1, target=_transcripcion_falsa)
+    audios = []
+    for i in range(4):
+        audio = tmp_path / f"audio{i}.wav"
+        audio.write_bytes(b"RIFF")
+        audios.append(audio)
+
+    try:
+        enviados = [jobs.submit(str(audios[0]), "base"), jobs.submit(str(audios[1]), "base"),
+                    jobs.submit(str(audios[2]), "roto")]
+        with pytest.raises(QueueFullError):
+            jobs.submit(str(audios[3]), "base")
+
+        a, b, c = (jobs.wait(j["id"], timeout=120) for j in enviados)
+        assert a["status"] == b["status"] == COMPLETED and a["result"]["text"] == "audio0.wav:base"
+        assert c["status"] == FAILED and "audio ilegible" in c["error"]
+        assert a["result"]["worker_pid"] != b["result"]["worker_pid"]  # en paralelo, cada uno en su proceso
+        assert not any(audio.exists() for audio in audios[:3])
+        assert jobs.stats()["queued"] == jobs.stats()["running"] == 0
+
+        jobs.submit(str(audios[3]), "base")  # ya hay espacio otra vez
+    finally:
+        jobs.shutdown()
+
+
+class _WhisperFalso:
+    def transcribe(self, muestras, **kwargs):
+        return {"text": f"{len(muestras)} muestras"}
+
+
+def _precarga_con_whisper_falso(nombres):
+    # Inicializador de prueba: el mismo _precargar_whisper, pero con un cargador que no descarga modelos
+    from app.automation.application import transcription_jobs
+    from app.automation.infrastructure import whisper_engine
+    from app.automation.infrastructure.model_residency import ModelResidency
+
+    whisper_engine._residency = ModelResidency(lambda nombre: _WhisperFalso(), permitidos=["tiny", "base"], max_resident=2)
+    transcription_jobs._precargar_whisper(nombres)
+
+
+def test_trabajadores_precargan_whisper():
+    """Con `preload` cada trabajador carga los modelos al arrancar: el primer job ya los encuentra residentes."""
+    import io
+    import wave
+    from app.automation.application.transcription_jobs import TranscriptionJobManager, COMPLETED
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x00\x00" * 16000)
+
+    jobs = TranscriptionJobManager(workers=1, max_queue=0, preload=["tiny"], initializer=_precarga_con_whisper_falso)
+    try:
+        job = jobs.wait(jobs.submit(buffer.getvalue(), "base")["id"], timeout=120)
+        assert job["status"] == COMPLETED and job["result"]["text"] == "16000 muestras"
+        # "tiny" no lo usó ningún job: está porque el trabajador lo precargó
+        assert sorted(job["result"]["resident_models"]) == ["base", "tiny"]
+    finally:
+        jobs.shutdown()
+
+
+def test_ventanas_cortan_en_la_pausa_y_conservan_el_tiempo():
+    """Las ventanas terminan en el silencio más cercano al límite y no se pierde ni repite audio."""
+    import numpy as np
+    from app.automation.infrastructure.audio_stream import ventanas
+
+    sr = 1000
+    voz = np.sin(np.arange(12 * sr, dtype=np.float32)) * 0.5
+    voz[8 * sr:int(8.3 * sr)] = 0.0  # pausa entre 8.0 s y 8.3 s
+    bloques = np.array_split(voz, 7)  # llegan por pedazos, como desde ffmpeg
+
+    salida = list(ventanas(bloques, window_s=10, sr=sr, buscar_s=5))
+    assert len(salida) == 2
+    (inicio1, v1), (inicio2, v2) = salida
+    assert inicio1 == 0.0 and 8.0 <= len(v1) / sr <= 8.3
+    assert inicio2 == len(v1) / sr
+    assert len(v1) + len(v2) == len(voz)
+
+    fijas = list(ventanas(np.array_split(voz, 3), window_s=5, sr=sr, vad=False))
+    assert [i for i, _ in fijas] == [0.0, 5.0, 10.0] and len(fijas[-1][1]) == 2 * sr
+
+
+def _transcripcion_por_ventanas_falsa(audio_path, model_size, job_id, eventos, window_s):
+    # Sustituto del trabajador en streaming: publica tres segmentos espaciados
+    import time
+    segmentos = []
+    for i in range(3):
+        time.sleep(0.3)
+        segmento = {"window": i, "start": i * window_s, "end": (i + 1) * window_s, "text": f"parte {i}"}
+        segmentos.append(segmento)
+        eventos.put((job_id, segmento))
+    return {"text": " ".join(s["text"] for s in segmentos), "segments": segmentos}
+
+
+def test_transcripcion_en_streaming_publica_segmentos_parciales(tmp_path):
+    """Los segmentos aparecen en el job mientras el trabajador sigue transcribiendo."""
+    import time
+    from app.automation.application.transcription_jobs import TranscriptionJobManager, COMPLETED
+
+    audio = tmp_path / "largo.wav"
+    audio.write_bytes(b"RIFF")
+    jobs = TranscriptionJobManager(workers=1, max_queue=1, stream_target=_transcripcion_por_ventanas_falsa)
+    try:
+        job = jobs.submit(str(audio), "base", stream=True, window_s=30)
+        parciales = []
+        limite = time.time() + 120
+        while time.time() < limite:
+            actual = jobs.get(job["id"])
+            if actual["status"] == COMPLETED:
+                break
+            parciales.append(len(actual["segments"]))
+            time.sleep(0.05)
+
+        final = jobs.get(job["id"])
+        assert final["status"] == COMPLETED and final["result"]["text"] == "parte 0 parte 1 parte 2"
+        assert [s["start"] for s in final["segments"]] == [0, 30, 60]
+        assert any(0 < n < 3 for n in parciales)  # hubo texto antes de terminar
+    finally:
+        jobs.shutdown()
+
+
+def test_wav_se_decodifica_en_memoria_a_16k_mono():
+    """Un WAV estéreo a 44.1 kHz (bytes subidos) queda en float32 mono a 16 kHz sin ffmpeg ni disco."""
+    import io
+    import wave
+    import numpy as np
+    from app.automation.infrastructure.audio_stream import SAMPLE_RATE, cargar_audio, iter_pcm
+
+    sr, segundos = 44100, 3
+    t = np.arange(sr * segundos) / sr
+    tono = 0.5 * np.sin(2 * np.pi * 440 * t)
+    estereo = np.stack([tono, tono], axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sr)
+        wav.writeframes((estereo * 32767).astype("<i2").tobytes())
+    datos = buffer.getvalue()
+
+    muestras = cargar_audio(datos)
+    assert muestras.dtype == np.float32 and len(muestras) == SAMPLE_RATE * segundos
+    assert abs(np.abs(muestras[1000:-1000]).max() - 0.5) < 0.02
+
+    frecuencias = np.fft.rfftfreq(len(muestras), 1 / SAMPLE_RATE)
+    assert abs(frecuencias[np.argmax(np.abs(np.fft.rfft(muestras)))] - 440) < 1  # el tono se conserva
+
+    bloques = list(iter_pcm(datos, bloque_s=1.0))
+    assert len(bloques) == 3 and sum(len(b) for b in bloques) == len(muestras)
+
+
+def test_ffmpeg_con_error_al_final_no_entrega_audio_truncado(tmp_path, monkeypatch):
+    """
+    Si ffmpeg termina con error después de haber entregado audio (ej. final corrupto), la
+    decodificación falla igual: el texto truncado no se da por bueno ni se guarda en la caché.
+    """
+    import os
+    from app.core.config import settings
+    from app.automation.infrastructure.audio_stream import cargar_audio
+
+    # ffmpeg falso: 1 s de PCM en silencio y luego sale con error
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text("#!/bin/sh\nhead -c 32000 /dev/zero\necho 'Invalid data found' >&2\nexit 1\n")
+    os.chmod(ffmpeg, 0o755)
+    monkeypatch.setattr(settings, "FFMPEG_BIN", str(ffmpeg))
+
+    with pytest.raises(RuntimeError, match="Invalid data found"):
+        cargar_audio(b"\x00" * 1000)  # desde un pipe (no reintenta con temporal: ya salió audio)
+    audio = tmp_path / "grabacion.mp3"
+    audio.write_bytes(b"\x00" * 1000)
+    with pytest.raises(RuntimeError, match="código 1"):
+        cargar_audio(str(audio))
+
+
+def test_cache_de_transcripciones_memoria_disco_y_caducidad(tmp_path, monkeypatch):
+    """Aciertos en memoria y en disco (sobrevive a otra instancia), caducidad por TTL y recorte por tamaño."""
+    import time
+    from app.automation.infrastructure.transcription_cache import TranscriptionCache
+
+    ruta = tmp_path / "transcripciones.sqlite"
+    cache = TranscriptionCache(ruta, max_memoria=1, max_disco=2, ttl=100)
+    a = cache.clave(b"audio a", "base", "es")
+    b = cache.clave(b"audio b", "base", "es")
+    assert a != cache.clave(b"audio a", "small", "es") != cache.clave(b"audio a", "base", "en")
+
+    assert cache.get(a) is None
+    cache.put(a, {"text": "hola"})
+    cache.put(b, {"text": "chao"})        # `a` sale de memoria (max_memoria=1) pero sigue en disco
+    assert cache.get(b) == {"text": "chao"}
+    assert cache.get(a) == {"text": "hola"}
+    estado = cache.estado()
+    assert (estado["hits_memoria"], estado["hits_disco"], estado["misses"]) == (1, 1, 1)
+
+    otra = TranscriptionCache(ruta, max_memoria=4, max_disco=2, ttl=100)  # ej. después de reiniciar
+    assert otra.get(b) == {"text": "chao"}
+    otra.put(otra.clave(b"audio c", "base", "es"), {"text": "nuevo"})  # excede max_disco: sale el menos usado
+    assert otra.estado()["en_disco"] == 2 and otra.estado()["desalojados"] == 1
+
+    ahora = time.time()
+    monkeypatch.setattr(time, "time", lambda: ahora + 101)
+    assert otra.get(b) is None and otra.estado()["expirados"] == 1
+
+
+def _transcripcion_de_bytes(audio, model_size):
+    import os
+    return {"text": audio.decode(), "worker_pid": os.getpid(), "resident_models": [model_size]}
+
+
+def test_audio_repetido_sale_de_la_cache_sin_encolar(tmp_path):
+    from app.automation.application.transcription_jobs import TranscriptionJobManager, COMPLETED
+    from app.automation.infrastructure.transcription_cache import TranscriptionCache
+
+    cache = TranscriptionCache(tmp_path / "cache.sqlite")
+    jobs = TranscriptionJobManager(workers=1, max_queue=0, target=_transcripcion_de_bytes, cache=cache)
+    try:
+        primero = jobs.wait(jobs.submit(b"nota de voz", "base")["id"], timeout=120)
+        assert primero["status"] == COMPLETED and "cached" not in primero["result"]
+
+        repetido = jobs.submit(b"nota de voz", "base")
+        assert repetido["status"] == COMPLETED and repetido["result"] == {"text": "nota de voz", "cached": True}
+        assert jobs.future(repetido["id"]) is None
+        assert jobs.stats()["cache"]["hits_memoria"] == 1
+
+        otro_modelo = jobs.submit(b"nota de voz", "small")  # otra clave: sí pasa por el trabajador
+        assert jobs.wait(otro_modelo["id"], timeout=120)["result"].get("cached") is None
+    finally:
+        jobs.shutdown()
@@ -21,5 +21,9 @@ def test_generar_graficas_guardar(tmp_path):
 
     data = generar_graficas(save_plot=True)
     assert "conteo" in data
+
+    # la gráfica se dibuja en segundo plano: esperamos a que termine
+    from app.core.plot_service import get_plot_service, READY
+    assert get_plot_service().wait(data["plot_token"], timeout=60) == READY
     archivos = list(tmp_path.glob("*.png"))
     assert len(archivos) > 0  # se generó una gráfica
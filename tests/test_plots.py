@@ -0,0 +1,68 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from main import app
+from app.core import plot_service
+from app.core.plot_service import PlotService, plot_token, READY
+
+client = TestClient(app)
+
+
+def test_plot_service_render_and_cache(tmp_path):
+    """
+    La gráfica se dibuja en otro proceso; los mismos datos reutilizan el PNG cacheado.
+    """
+    service = PlotService(tmp_path / "cache")
+    spec = {"series": [{"values": [3.0, 2.0, 1.0]}], "title": "Pérdida"}
+    copia = tmp_path / "copia.png"
+
+    token = service.submit("lines", spec, copy_to=copia)
+    assert service.wait(token, timeout=60) == READY
+    assert service.path(token).exists()
+    assert copia.exists()
+
+    # Mismos datos → mismo token, sin volver a dibujar
+    assert service.submit("lines", dict(spec)) == token
+    assert service.status(token) == READY
+
+    # Otros datos (incluidos arrays de NumPy) → otro token
+    otro = {"y_true": np.array([0, 1, 1]), "y_score": np.array([0.2, 0.7, 0.4])}
+    assert plot_token("roc", otro) != plot_token("roc", {**otro, "y_score": np.array([0.2, 0.7, 0.5])})
+    service.shutdown()
+
+
+def test_plot_service_recorta_cache(tmp_path):
+    """
+    Con `max_files` la caché no crece sin límite: al pasarse se borran los PNG usados hace más tiempo.
+    """
+    service = PlotService(tmp_path, max_files=3)
+    tokens = []
+    for i in range(3):
+        tokens.append(service.submit("bar", {"labels": ["a"], "values": [i]}))
+        assert service.wait(tokens[-1], timeout=60) == READY
+
+    assert service.submit("bar", {"labels": ["a"], "values": [0]}) == tokens[0]  # acierto: cuenta como uso
+    nuevo = service.submit("bar", {"labels": ["a"], "values": [3]})
+    assert service.wait(nuevo, timeout=60) == READY
+
+    # 4 > 3 → se baja al 90% (2 archivos): quedan el recién usado y el nuevo
+    assert sorted(p.name for p in tmp_path.glob("*.png")) == sorted(f"{t}.png" for t in (tokens[0], nuevo))
+    assert service.status(tokens[1]) is None
+    service.shutdown()
+
+
+def test_plot_endpoint(tmp_path, monkeypatch):
+    """
+    /plots/{token} sirve el PNG cuando está listo y 404 si el token no existe.
+    """
+    service = PlotService(tmp_path)
+    monkeypatch.setattr(plot_service, "_plot_service", service)
+
+    token = service.submit("bar", {"labels": ["a", "b"], "values": [1, 2]})
+    service.wait(token, timeout=60)
+
+    response = client.get(f"/plots/{token}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+
+    assert client.get("/plots/desconocido").status_code == 404
+    service.shutdown()
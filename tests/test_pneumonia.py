@@ -55,15 +55,239 @@ def test_get_pneumonia_metrics_not_found():
 # -----------------------------
 def test_train_pneumonia_success(monkeypatch):
     """
-    Simula entrenamiento exitoso del modelo.
+    Simula el encolado exitoso de un entrenamiento (sin lanzar el proceso real).
     """
 
-    def fake_train(epochs, lr):
-        return None
+    def fake_submit(self, epochs, lr):
+        return {"id": "job123", "status": "queued", "params": {"epochs": epochs, "lr": lr}}
 
-    from app.vision.training import train_pneumonia
-    monkeypatch.setattr(train_pneumonia, "train_pneumonia_model", fake_train)
+    from app.vision.application.training_jobs import TrainingJobManager
+    monkeypatch.setattr(TrainingJobManager, "submit", fake_submit)
 
     response = client.post("/vision/train?epochs=2&lr=0.001")
     assert response.status_code == 200
-    assert "Modelo de neumonía reentrenado" in response.json()["message"]
+    data = response.json()
+    assert "Entrenamiento del modelo de neumonía encolado" in data["message"]
+    assert data["job_id"] == "job123"
+    assert data["status"] == "queued"
+
+
+def test_training_job_not_found():
+    response = client.get("/vision/train/jobs/no-existe")
+    assert response.status_code == 404
+
+
+def _entrenamiento_falso(epochs, lr, events):
+    """Reemplazo de _run_training (a nivel de módulo para poder usarlo con spawn): `lr` = segundos por época."""
+    import time
+
+    for epoca in range(1, epochs + 1):
+        time.sleep(lr)
+        events.put(("epoch", {"epoch": epoca}))
+    events.put(("done", None))
+
+
+def _esperar(condicion, timeout=30):
+    import time
+
+    limite = time.time() + timeout
+    while not condicion():
+        assert time.time() < limite, "se agotó la espera"
+        time.sleep(0.05)
+
+
+def _esperar_job(jobs, job_id, estados):
+    _esperar(lambda: jobs.get(job_id)["status"] in estados)
+    return jobs.get(job_id)
+
+
+def test_training_jobs_en_cola_de_a_uno():
+    """Un entrenamiento a la vez: el segundo espera en cola y arranca cuando termina el primero."""
+    from app.vision.application.training_jobs import TrainingJobManager, COMPLETED, RUNNING
+
+    terminados = []
+    jobs = TrainingJobManager(target=_entrenamiento_falso, on_finish=lambda job: terminados.append(job["id"]))
+    primero = jobs.submit(epochs=3, lr=0.3)
+    segundo = jobs.submit(epochs=1, lr=0.01)
+
+    _esperar_job(jobs, primero["id"], {RUNNING})
+    en_cola = jobs.get(segundo["id"])
+    assert en_cola["status"] == "queued" and en_cola["queue_position"] == 1
+
+    primero = _esperar_job(jobs, primero["id"], {COMPLETED})
+    segundo = _esperar_job(jobs, segundo["id"], {COMPLETED})
+    assert [m["epoch"] for m in primero["metrics"]] == [1, 2, 3]
+    assert segundo["started_at"] >= primero["finished_at"]
+    assert terminados == [primero["id"], segundo["id"]]
+
+
+def test_training_jobs_cancelar_en_cola_y_en_ejecucion():
+    """Cancelar un job en cola lo saca de la cola; cancelar uno en ejecución termina su proceso."""
+    from app.vision.application.training_jobs import TrainingJobManager, CANCELLED, COMPLETED, RUNNING
+
+    terminados = []
+    jobs = TrainingJobManager(target=_entrenamiento_falso, on_finish=lambda job: terminados.append(job["status"]))
+    largo = jobs.submit(epochs=100, lr=0.1)
+    en_cola = jobs.submit(epochs=1, lr=0.01)
+    _esperar_job(jobs, largo["id"], {RUNNING})
+
+    assert jobs.cancel(en_cola["id"])["status"] == CANCELLED
+    assert jobs.cancel(largo["id"])["status"] == CANCELLED
+
+    _esperar(lambda: terminados)  # el despachador cierra el job cuando el proceso termina
+    largo = jobs.get(largo["id"])
+    assert largo["finished_at"] is not None and len(largo["metrics"]) < 100
+    assert jobs._process is None and terminados == [CANCELLED]
+    assert jobs.get(en_cola["id"])["started_at"] is None
+
+    # El despachador sigue funcionando después de las cancelaciones
+    siguiente = jobs.submit(epochs=1, lr=0.01)
+    assert _esperar_job(jobs, siguiente["id"], {COMPLETED})["metrics"] == [{"epoch": 1}]
+
+
+def test_training_job_cancelado_antes_de_arrancar_no_lanza_el_proceso(monkeypatch):
+    """
+    Si el cancel llega después de marcar RUNNING pero antes de crear el proceso,
+    el entrenamiento no debe arrancar (pisaría los pesos sin recargar el modelo).
+    """
+    from app.vision.application.training_jobs import TrainingJobManager, CANCELLED
+
+    terminados = []
+    jobs = TrainingJobManager(target=_entrenamiento_falso, on_finish=lambda job: terminados.append(job["status"]))
+    creados = []
+    crear = jobs._ctx.Process
+    monkeypatch.setattr(jobs._ctx, "Process", lambda *a, **kw: creados.append(crear(*a, **kw)) or creados[-1])
+
+    job = {"id": "x", "status": CANCELLED, "params": {"epochs": 1, "lr": 0.01}, "metrics": [],
+           "error": None, "started_at": 0.0, "finished_at": None}
+    jobs._run_job(job)
+
+    assert len(creados) == 1 and creados[0].exitcode is None  # nunca se llamó a start()
+    assert job["status"] == CANCELLED and job["finished_at"] is not None
+    assert jobs._process is None and terminados == [CANCELLED]
+
+
+def test_cascada_de_radiografias_salta_yolo_en_las_tipicas():
+    """Color → rechazo; radiografía típica → aceptada sin YOLO; resto → incierta (decide YOLO)."""
+    import numpy as np
+    from app.vision.application.xray_gate import XrayGate, RECHAZADA, ACEPTADA, INCIERTA
+
+    gate = XrayGate(thumb_size=64)
+
+    # Tórax sintético: cuerpo claro, dos pulmones oscuros simétricos y columna clara al centro
+    torax = np.full((512, 512), 200, dtype=np.uint8)
+    yy, xx = np.mgrid[0:512, 0:512]
+    for cx in (150, 362):
+        torax[((xx - cx) / 90.0) ** 2 + ((yy - 240) / 170.0) ** 2 <= 1] = 40
+    assert gate.evaluar(torax) == ACEPTADA
+    assert gate.evaluar(np.stack([torax] * 3, axis=2)) == ACEPTADA  # RGB que en realidad es gris
+
+    color = np.stack([torax, torax, np.clip(torax.astype(int) + 60, 0, 255).astype(np.uint8)], axis=2)
+    assert gate.evaluar(color) == RECHAZADA
+
+    degradado = np.tile(np.linspace(0, 255, 512).astype(np.uint8), (512, 1))  # gris pero asimétrico
+    assert gate.evaluar(degradado) == INCIERTA
+    assert gate.evaluar(np.full((300, 300), 128, dtype=np.uint8)) == INCIERTA  # sin contraste
+
+    estado = gate.estado()
+    assert estado["etapas"]["croma"]["llamadas"] == 5
+    assert estado["etapas"]["croma"]["decisiones"] == {ACEPTADA: 4, RECHAZADA: 1}
+    assert estado["etapas"]["histograma"]["decisiones"] == {ACEPTADA: 2, INCIERTA: 2}
+
+
+def test_backends_exportados_paridad_y_artefacto_viejo(tmp_path):
+    """
+    Un SimpleCNN aleatorio se exporta a TorchScript/ONNX/int8: cada backend carga su artefacto y
+    da las mismas probabilidades que eager. Si el .pth es más nuevo (reentrenamiento), el artefacto se rechaza.
+    """
+    import os
+    import numpy as np
+    import torch
+    from app.vision.domain.pneumonia_model import SimpleCNN
+    from app.vision.infrastructure.pneumonia_backends import ARTIFACTS, PneumoniaBackend, load_pneumonia_backend
+    from app.vision.training.export_pneumonia import export_pneumonia_model
+
+    with pytest.raises(TypeError):
+        PneumoniaBackend()  # contrato abstracto
+
+    torch.manual_seed(0)
+    torch.save(SimpleCNN().state_dict(), tmp_path / ARTIFACTS["eager"])
+    exportados = export_pneumonia_model(tmp_path)
+    assert {"torchscript", "int8"} <= set(exportados)
+    assert not list(tmp_path.glob("*.tmp"))  # escrituras atómicas: sin temporales sueltos
+
+    entrada = torch.randn(3, 1, 224, 224)
+    cpu = torch.device("cpu")
+    referencia = load_pneumonia_backend("eager", tmp_path, cpu).predict_proba(entrada)
+    assert referencia.shape == (3,)
+    for nombre, tolerancia in [("torchscript", 1e-5), ("onnx", 1e-4), ("int8", 5e-2)]:
+        if nombre not in exportados:
+            continue
+        probs = load_pneumonia_backend(nombre, tmp_path, cpu).predict_proba(entrada)
+        assert np.abs(probs - referencia).max() < tolerancia, nombre
+
+    # Reentrenamiento que solo reescribe el .pth: el .ts quedó viejo y no se debe cargar
+    pth = tmp_path / ARTIFACTS["eager"]
+    os.utime(pth, (pth.stat().st_atime, (tmp_path / ARTIFACTS["torchscript"]).stat().st_mtime + 10))
+    with pytest.raises(FileNotFoundError, match="anterior"):
+        load_pneumonia_backend("torchscript", tmp_path, cpu)
+
+
+def test_cache_de_tensores_igual_a_preprocess_y_se_reconstruye(tmp_path):
+    """
+    La caché uint8 memory-mapped da los mismos tensores que CustomDataset (preprocess_image) y se
+    reconstruye sola cuando cambia un archivo fuente; si nada cambió, se reutiliza tal cual.
+    """
+    import os
+    import cv2
+    import numpy as np
+    from app.vision.utils.dataset_wrapper import CustomDataset
+    from app.vision.utils.tensor_cache import get_cached_dataset
+
+    rng = np.random.default_rng(0)
+    split_dir = tmp_path / "chest_xray" / "train"
+    for clase, tamanos in [("NORMAL", [(300, 260), (224, 224)]), ("PNEUMONIA", [(180, 240), (512, 400), (90, 120)])]:
+        (split_dir / clase).mkdir(parents=True)
+        for i, (alto, ancho) in enumerate(tamanos):
+            cv2.imwrite(str(split_dir / clase / f"{i}.png"), rng.integers(0, 256, (alto, ancho), dtype=np.uint8))
+
+    cache_dir = tmp_path / "cache"
+    cacheado = get_cached_dataset("train", tmp_path / "chest_xray", cache_dir)
+    original = CustomDataset(root=split_dir)
+    assert len(cacheado) == len(original) == 5
+    for i in range(len(original)):
+        (t_cache, y_cache), (t_orig, y_orig) = cacheado[i], original[i]
+        assert t_cache.shape == t_orig.shape == (1, 224, 224) and y_cache == y_orig
+        assert (t_cache - t_orig).abs().max().item() < 1e-6  # solo redondeo de float32
+
+    imagenes = cache_dir / "train_images.npy"
+    antes = imagenes.stat().st_mtime_ns
+    get_cached_dataset("train", tmp_path / "chest_xray", cache_dir)
+    assert imagenes.stat().st_mtime_ns == antes  # huella igual: no se reconstruye
+
+    # Se reescribe una imagen (otra fecha de modificación) → la caché se reconstruye
+    cambiada = split_dir / "NORMAL" / "1.png"
+    cv2.imwrite(str(cambiada), np.full((224, 224), 255, dtype=np.uint8))
+    os.utime(cambiada, ns=(cambiada.stat().st_atime_ns, cambiada.stat().st_mtime_ns + 10**9))
+    reconstruido = get_cached_dataset("train", tmp_path / "chest_xray", cache_dir)
+    assert imagenes.stat().st_mtime_ns != antes
+    assert (reconstruido[1][0] - CustomDataset(root=split_dir)[1][0]).abs().max().item() < 1e-6
+    assert reconstruido[1][0].min().item() == 1.0
+
+
+def test_save_atomic_conserva_el_archivo_anterior_si_falla(tmp_path):
+    """Un guardado interrumpido (ej. job cancelado) no deja el artefacto truncado: sigue el anterior."""
+    from app.vision.infrastructure.pneumonia_backends import save_atomic
+
+    destino = tmp_path / "pneumonia_cnn.pth"
+    save_atomic(destino, lambda tmp: open(tmp, "wb").write(b"pesos v1"))
+
+    def corte(tmp):
+        with open(tmp, "wb") as f:
+            f.write(b"pesos v2 a med")
+        raise KeyboardInterrupt  # como un proceso terminado a mitad de la escritura
+
+    with pytest.raises(KeyboardInterrupt):
+        save_atomic(destino, corte)
+    assert destino.read_bytes() == b"pesos v1"
+    assert [p.name for p in tmp_path.iterdir()] == ["pneumonia_cnn.pth"]
@@ -68,3 +68,123 @@ def test_predict_logistic():
     # predicción inválida (energía fuera de rango)
     response = client.get("/prediction/logistic/predict", params={"x1": 5, "x2": 2})
     assert response.status_code in (400, 422)
+
+
+# ==================== TEST REGISTRO DE MODELOS ====================
+
+def test_predict_expone_version_del_modelo():
+    """
+    Las predicciones informan qué versión del modelo respondió.
+    """
+    response = client.get("/prediction/linear/predict", params={"x": 40})
+    assert response.status_code == 200
+    assert response.json()["model_version"]
+
+
+def test_model_registry_cachea_y_recarga(tmp_path):
+    """
+    El registro carga el modelo una sola vez y cambia de versión cuando cambia el .pth.
+    """
+    from app.prediction.domain.models import LinearRegressor
+    from app.prediction.infrastructure.model_registry import ModelRegistry
+    from app.prediction.infrastructure.model_storage import save_model
+
+    path = str(tmp_path / "linear.pth")
+    registry = ModelRegistry()
+    assert registry.get(LinearRegressor, path) == (None, None)
+
+    save_model(LinearRegressor(), path)
+    model_a, version_a = registry.get(LinearRegressor, path)
+    model_b, version_b = registry.get(LinearRegressor, path)
+    assert model_a is model_b and version_a == version_b  # sin recargar del disco
+
+    nueva_version = registry.publish(LinearRegressor(), path)
+    model_c, version_c = registry.get(LinearRegressor, path)
+    assert version_c == nueva_version != version_a
+    assert model_c is not model_a
+    # Escritura atómica: no quedan temporales junto al .pth
+    assert [p.name for p in tmp_path.iterdir()] == ["linear.pth"]
+
+
+# ==================== TEST PREDICCIÓN EN LOTE ====================
+
+def test_predict_linear_batch():
+    """
+    El lote devuelve una línea NDJSON por tamaño, con la versión en el header.
+    """
+    import json
+
+    response = client.post("/prediction/linear/predict-batch", json={"x": [20, 40, 60]})
+    assert response.status_code == 200
+    filas = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [f["tamaño_cm"] for f in filas] == [20, 40, 60]
+    assert all(f["peso_pred_kg"] >= 0.5 for f in filas)
+    assert response.headers["X-Model-Version"]
+
+    # Un solo valor fuera de rango invalida el lote
+    response = client.post("/prediction/linear/predict-batch", json={"x": [40, 200]})
+    assert response.status_code == 400
+
+
+def test_predict_logistic_batch_csv():
+    """
+    El lote logístico acepta un CSV subido y valida los rangos de forma vectorizada.
+    """
+    import json
+
+    csv = "velocidad,energia\n5,0.5\n15,0.9\n"
+    response = client.post(
+        "/prediction/logistic/predict-batch/file",
+        params={"col_x1": "velocidad", "col_x2": "energia"},
+        files={"file": ("gatos.csv", csv.encode(), "text/csv")}
+    )
+    assert response.status_code == 200
+    filas = [json.loads(line) for line in response.text.splitlines() if line]
+    assert len(filas) == 2
+    assert all(0 <= f["probabilidad"] <= 1 and f["clase"] in (0, 1) for f in filas)
+
+    response = client.post(
+        "/prediction/logistic/predict-batch",
+        json={"x1": [5, 30], "x2": [0.5, 0.5]}
+    )
+    assert response.status_code == 400
+
+
+# ==================== TEST SOLVERS ====================
+
+def test_solvers_match_sgd():
+    """
+    Los solvers rápidos llegan a una pérdida igual o menor que el SGD original.
+    """
+    import torch
+    from app.prediction.application.solvers import (
+        generate_linear_data, generate_logistic_data, fit_linear, fit_logistic
+    )
+
+    x, y = generate_linear_data(500, generator=torch.Generator().manual_seed(0))
+    _, _, exacto = fit_linear(x, y, solver="lstsq")
+    _, _, sgd = fit_linear(x, y, solver="sgd")
+    assert exacto[-1] <= sgd[-1]
+
+    x, y = generate_logistic_data(500, generator=torch.Generator().manual_seed(0))
+    _, _, newton = fit_logistic(x, y, solver="newton")
+    _, _, lbfgs = fit_logistic(x, y, solver="lbfgs")
+    _, _, sgd = fit_logistic(x, y, solver="sgd")
+    assert newton[-1] == pytest.approx(lbfgs[-1], abs=1e-4)
+    assert newton[-1] <= sgd[-1]
+
+    with pytest.raises(ValueError):
+        fit_linear(x, y, solver="newton")
+
+
+def test_train_solver_params():
+    """
+    El solver y el tamaño del dataset se eligen desde la función de entrenamiento.
+    """
+    data = train_linear_model(save_plot=False, solver="sgd", n_samples=100)
+    assert data["solver"] == "sgd" and data["n_samples"] == 100
+
+    data = train_logistic_model(save_plot=False, solver="lbfgs", n_samples=10_000)
+    assert data["solver"] == "lbfgs"
+    assert data["accuracy"] > 0.8
+    assert data["train_ms"] >= 0
@@ -0,0 +1,431 @@
+import pytest
+import pandas as pd
+from app.recomendation.application.etl.extract_service import generar_dataset, PRODUCTOS
+
+
+def test_generar_dataset_por_bloques(tmp_path):
+    """
+    El dataset se escribe por bloques, es reproducible con la semilla
+    y cada producto pertenece a su categoría.
+    """
+    from app.recomendation.infrastructure.compras_storage import ComprasStorage
+
+    storage = ComprasStorage(tmp_path / "pq")
+    ruta_a = generar_dataset(2500, seed=7, chunk_size=1000, ruta=tmp_path / "a.csv", storage=storage)
+    ruta_b = generar_dataset(2500, seed=7, chunk_size=333, ruta=tmp_path / "b.csv", storage=storage)
+
+    # misma semilla → mismo archivo, sin importar el tamaño de bloque
+    assert open(ruta_a, encoding="utf-8-sig").read() == open(ruta_b, encoding="utf-8-sig").read()
+
+    df = pd.read_csv(ruta_a, encoding="utf-8-sig")
+    assert list(df.columns) == ["id_compra", "cliente", "producto", "categoria", "precio", "fecha_compra"]
+    assert len(df) == 2500 and df["id_compra"].is_unique
+    assert df["precio"].between(2000, 30000).all()
+    assert all(p in PRODUCTOS[c] for c, p in zip(df["categoria"], df["producto"]))
+    assert pd.to_datetime(df["fecha_compra"], format="%Y-%m-%d").notna().all()
+
+
+def test_validar_columnas_igual_que_marshmallow():
+    """
+    La validación por columnas acepta y rechaza exactamente las mismas filas
+    que CompraSchema.validate aplicado fila por fila.
+    """
+    import numpy as np
+    from app.recomendation.application.etl.transform_service import CompraSchema
+    from app.recomendation.application.etl.validation import validar_columnas
+
+    df = pd.DataFrame({
+        "id_compra": [1, 2, 3, 4, 5, 6],
+        "cliente": ["Ana", np.nan, "Luis", "Eva", "Juan", "Sara"],
+        "producto": ["Avena"] * 6,
+        "categoria": ["Granos"] * 6,
+        "precio": [1500.0, 2000.0, np.nan, 4000.0, "12", "abc"],
+        "fecha_compra": ["2025-01-02", "2025-01-02", "2025-01-02", "2025-13-01", "2025-01-03", "2025-01-03"],
+    }, dtype=object)
+
+    schema = CompraSchema()
+    esperadas = [i for i, row in df.iterrows() if not schema.validate(schema.convertir_fecha(row.to_dict()))]
+
+    validos, reporte = validar_columnas(df, schema)
+    assert validos.index.tolist() == esperadas == [0, 4]
+    assert reporte["total_invalidos"] == 4
+    assert reporte["por_campo"] == {"cliente": 1, "precio": 2, "fecha_compra": 1}
+
+
+def test_etl_streaming_memoria_constante(tmp_path):
+    """
+    El pipeline por bloques carga todo a la base (aquí SQLite) sin duplicados
+    y sin escribir copias intermedias si no se piden.
+    """
+    from sqlalchemy import create_engine
+    from app.recomendation.application.etl.streaming_pipeline import run_etl_streaming
+    from app.recomendation.infrastructure.compras_storage import ComprasStorage
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    storage = ComprasStorage(tmp_path / "pq")
+    resumen = run_etl_streaming(5000, seed=1, chunk_size=1000, queue_depth=2, snapshots=False,
+                                engine=engine, storage=storage)
+
+    assert resumen["generados"] == resumen["validos"] == resumen["cargados"] == 5000
+    assert resumen["snapshots"] == []
+    conteo = pd.read_sql("SELECT COUNT(DISTINCT id_compra) AS n FROM compras", engine)
+    assert conteo["n"][0] == 5000
+    assert not storage.base_dir.exists()
+
+
+def test_compras_storage_parquet(tmp_path):
+    """
+    Las etapas en Parquet conservan los tipos, permiten leer solo algunas columnas
+    y filtrar por rango de fechas (solo se abren las particiones del rango).
+    """
+    from app.recomendation.application.etl.extract_service import generar_compras
+    from app.recomendation.infrastructure.compras_storage import ComprasStorage
+
+    storage = ComprasStorage(tmp_path / "pq")
+    original = pd.concat(generar_compras(3000, seed=5, chunk_size=1000), ignore_index=True)
+    assert storage.write("raw", generar_compras(3000, seed=5, chunk_size=1000)) == 3000
+
+    df = storage.read("raw").sort_values("id_compra", ignore_index=True)
+    assert len(df) == 3000
+    assert pd.api.types.is_integer_dtype(df["id_compra"]) and pd.api.types.is_float_dtype(df["precio"])
+    assert pd.api.types.is_datetime64_any_dtype(df["fecha_compra"])
+    assert isinstance(df["categoria"].dtype, pd.CategoricalDtype)
+    assert df["producto"].astype(str).tolist() == original["producto"].astype(str).tolist()
+
+    # una carpeta por mes
+    assert all(p.name.startswith("mes=") for p in storage.path("raw").iterdir())
+
+    # proyección + poda por fechas
+    fechas = pd.to_datetime(original["fecha_compra"])
+    desde = fechas.median().normalize().replace(day=1)
+    hasta = desde + pd.offsets.MonthEnd(0)
+    mes = storage.read("raw", columns=["id_compra", "fecha_compra"], desde=desde, hasta=hasta)
+    assert list(mes.columns) == ["id_compra", "fecha_compra"]
+    assert len(mes) == fechas.between(desde, hasta).sum() > 0
+    assert sum(len(b) for b in storage.iter_batches("raw", batch_size=500)) == 3000
+
+
+def test_ids_vistos_entre_bloques():
+    """
+    Los id_compra repetidos en bloques distintos se descartan.
+    """
+    from app.recomendation.application.etl.streaming_pipeline import IdsVistos
+
+    vistos = IdsVistos()
+    assert vistos.filtrar_nuevos(pd.Series([1, 2, 3])).tolist() == [True, True, True]
+    assert vistos.filtrar_nuevos(pd.Series([3, 4, -1])).tolist() == [False, True, True]
+    assert vistos.filtrar_nuevos(pd.Series([-1, 10**12])).tolist() == [False, True]
+
+
+# ==================== CARGA MASIVA (staging + swap / upsert) ====================
+
+def _motores_de_prueba(tmp_path):
+    """SQLite siempre; PostgreSQL real solo si se define TEST_DATABASE_URL."""
+    import os
+    from sqlalchemy import create_engine
+
+    motores = [create_engine(f"sqlite:///{tmp_path / 'carga.db'}")]
+    if os.getenv("TEST_DATABASE_URL"):
+        motores.append(create_engine(os.environ["TEST_DATABASE_URL"]))
+    return motores
+
+
+def test_bulk_loader_swap_y_upsert(tmp_path):
+    """
+    El reemplazo deja la tabla con su clave primaria y el upsert actualiza o inserta por id_compra.
+    """
+    from sqlalchemy import inspect
+    from app.recomendation.application.etl.extract_service import generar_compras
+    from app.recomendation.infrastructure.bulk_loader import BulkLoader
+
+    df = next(generar_compras(500, seed=3))
+    df["fecha_compra"] = pd.to_datetime(df["fecha_compra"])
+
+    for engine in _motores_de_prueba(tmp_path):
+        loader = BulkLoader(engine, "compras_test")
+        assert loader.cargar(df) == 500
+        assert loader.cargar(df) == 500  # segunda carga: swap sobre la tabla existente
+        indices = [i["name"] for i in inspect(engine).get_indexes("compras_test")]
+        assert "idx_compras_test_fecha" in indices
+        assert not inspect(engine).has_table("compras_test_staging")
+
+        cambios = df.head(2).assign(precio=1.0)
+        nuevos = df.head(1).assign(id_compra=10_000, precio=2.0)
+        loader.cargar(iter([cambios, nuevos]), modo="upsert")
+
+        res = pd.read_sql("SELECT COUNT(*) AS n, SUM(CASE WHEN precio = 1.0 THEN 1 ELSE 0 END) AS cambiados FROM compras_test", engine)
+        assert res["n"][0] == 501 and res["cambiados"][0] == 2
+
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE compras_test")
+
+
+
+@pytest.mark.parametrize("motor", ["sqlite", "postgres"])
+def test_bulk_loader_upsert_ultima_fila_gana(tmp_path, motor):
+    """
+    Con ids repetidos en un mismo upsert (dentro de un bloque y entre bloques) queda la última fila,
+    en SQLite y en PostgreSQL. PostgreSQL solo corre si se define TEST_DATABASE_URL.
+    """
+    import os
+    from sqlalchemy import create_engine
+    from app.recomendation.application.etl.extract_service import generar_compras
+    from app.recomendation.infrastructure.bulk_loader import BulkLoader
+
+    if motor == "postgres":
+        if not os.getenv("TEST_DATABASE_URL"):
+            pytest.skip("TEST_DATABASE_URL no definida (sin servidor PostgreSQL)")
+        engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    else:
+        engine = create_engine(f"sqlite:///{tmp_path / 'carga.db'}")
+
+    df = next(generar_compras(300, seed=5))
+    loader = BulkLoader(engine, "compras_orden")
+    loader.cargar(df)
+
+    repetidas = pd.concat([df.head(50).assign(precio=float(i)) for i in range(1, 40)])  # id 1..50, 39 veces
+    loader.cargar(iter([repetidas, df.head(10).assign(precio=99.0)]), modo="upsert")
+
+    precios = pd.read_sql("SELECT id_compra, precio FROM compras_orden ORDER BY id_compra", engine)
+    assert len(precios) == 300
+    assert precios["precio"].iloc[:10].tolist() == [99.0] * 10
+    assert precios["precio"].iloc[10:50].tolist() == [39.0] * 40
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE compras_orden")
+        conn.exec_driver_sql("DROP TABLE compras_orden_cargas")
+
+# ==================== RECOMENDACIONES (índice item-item) ====================
+
+def test_item_index_similares_y_recomendaciones(tmp_path):
+    """
+    El índice se construye desde la tabla de compras: los productos que compran los mismos
+    clientes quedan como vecinos y a cada cliente se le recomienda lo que aún no tiene.
+    """
+    from sqlalchemy import create_engine
+    from app.recomendation.application.recommendation_service import ItemIndex
+
+    compras = pd.DataFrame([
+        ("Ana", "Arroz"), ("Ana", "Fríjoles"), ("Ana", "Arroz"),
+        ("Luis", "Arroz"), ("Luis", "Fríjoles"), ("Luis", "Aceite"),
+        ("Eva", "Arroz"), ("Eva", "Aceite"),
+        ("Juan", "Jabón"), ("Juan", "Cloro"),
+    ], columns=["cliente", "producto"])
+    compras.insert(0, "id_compra", range(1, len(compras) + 1))
+    compras["fecha_compra"] = "2025-01-01"
+    engine = create_engine(f"sqlite:///{tmp_path / 'reco.db'}")
+    compras.to_sql("compras", engine, index=False)
+
+    indice = ItemIndex.desde_db(engine, top_k=2)
+    assert indice.info()["interacciones"] == 9  # la compra repetida de Ana cuenta una vez
+
+    similares = indice.similares("Fríjoles")
+    assert [s["producto"] for s in similares] == ["Arroz", "Aceite"]
+    assert similares[0]["co_compras"] == 2 and abs(similares[0]["score"] - 2 / (2 * 3) ** 0.5) < 1e-6
+    assert [s["producto"] for s in indice.similares("Jabón")] == ["Cloro"]
+
+    assert [r["producto"] for r in indice.recomendar("Ana")] == ["Aceite"]
+    assert [r["producto"] for r in indice.recomendar("Eva")] == ["Fríjoles"]
+    assert indice.recomendar("Juan") == []
+
+    try:
+        indice.similares("Televisor")
+        assert False, "debía fallar"
+    except KeyError:
+        pass
+
+
+def test_item_index_incremental_igual_a_reconstruccion(tmp_path, monkeypatch):
+    """
+    Las compras nuevas (id_compra > marca de agua) se aplican sin reconstruir y el resultado
+    es el mismo que construir desde cero; si la tabla se reemplaza, se reconstruye.
+    """
+    from sqlalchemy import create_engine
+    from app.core.config import settings
+    from app.recomendation.application import recommendation_service as rs
+    from app.recomendation.application.etl.extract_service import generar_compras
+
+    monkeypatch.setattr(settings, "RECO_COMPACT_EVERY", 100)
+    monkeypatch.setattr(settings, "RECO_COMPACT_RATIO", 10.0)
+    monkeypatch.setattr(rs, "_indice", None)
+    engine = create_engine(f"sqlite:///{tmp_path / 'reco.db'}")
+
+    df = next(generar_compras(3000, seed=2, nombres_pool=400))[["id_compra", "cliente", "producto", "fecha_compra"]]
+    df.iloc[:2500].to_sql("compras", engine, index=False)
+    base = rs.construir_indice(engine, top_k=5)
+    assert base.marca_id == 2500
+
+    nuevas = pd.concat([df.iloc[2500:], pd.DataFrame([
+        {"id_compra": 5000, "cliente": "Cliente Nuevo", "producto": "Producto Nuevo", "fecha_compra": "2030-01-01"},
+        {"id_compra": 5001, "cliente": "Cliente Nuevo", "producto": "Avena", "fecha_compra": "2030-01-01"},
+    ])])
+    nuevas.to_sql("compras", engine, index=False, if_exists="append")
+
+    inc = rs.actualizar_indice(engine)
+    assert inc is not base and inc.actualizaciones == 1
+    assert (inc.marca_id, inc.marca_fecha) == (5001, "2030-01-01")
+
+    completo = rs.ItemIndex.desde_db(engine, top_k=5)
+    assert inc.X.nnz == completo.X.nnz
+    for p in completo.productos:
+        assert [(s["producto"], s["co_compras"]) for s in inc.similares(p)] == \
+               [(s["producto"], s["co_compras"]) for s in completo.similares(p)]
+    for c in completo.clientes[:50].tolist() + ["Cliente Nuevo"]:
+        assert inc.recomendar(c) == completo.recomendar(c)
+
+    # tabla reemplazada (los ids vuelven a empezar) → reconstrucción completa
+    df.iloc[:100].to_sql("compras", engine, index=False, if_exists="replace")
+    reconstruido = rs.actualizar_indice(engine)
+    assert reconstruido.actualizaciones == 0 and reconstruido.marca_id == 100
+
+
+
+def test_item_index_upsert_sobre_ids_indexados_reconstruye(tmp_path, monkeypatch):
+    """
+    Un upsert que reescribe compras ya indexadas (mismos ids, otros datos) no se puede aplicar
+    como delta: el registro de cargas lo detecta y el índice queda igual a una reconstrucción.
+    Un upsert que solo trae ids nuevos sigue siendo incremental.
+    """
+    from app.recomendation.application import recommendation_service as rs
+    from app.recomendation.application.etl.extract_service import generar_compras
+    from app.recomendation.infrastructure.bulk_loader import BulkLoader
+
+    monkeypatch.setattr(rs, "_indice", None)
+    for engine in _motores_de_prueba(tmp_path):
+        loader = BulkLoader(engine, "compras")
+        loader.cargar(next(generar_compras(1500, seed=1, nombres_pool=300)))
+        base = rs.construir_indice(engine, top_k=5)
+
+        # generar_compras vuelve a numerar desde 1: mismos ids, compras distintas
+        loader.cargar(next(generar_compras(1500, seed=2, nombres_pool=300)), modo="upsert")
+        indice = rs.actualizar_indice(engine)
+        completo = rs.ItemIndex.desde_db(engine, top_k=5)
+        assert indice is not base and indice.actualizaciones == 0
+        assert indice.info()["interacciones"] == completo.info()["interacciones"]
+        assert indice.info()["clientes"] == completo.info()["clientes"]
+        assert indice.marca_lote == 2
+
+        nuevas = next(generar_compras(50, seed=4, nombres_pool=300)).assign(id_compra=lambda d: d["id_compra"] + 1500)
+        loader.cargar(nuevas, modo="upsert")
+        inc = rs.actualizar_indice(engine)
+        assert inc.actualizaciones == 1 and inc.marca_id == 1550 and inc.marca_lote == 3
+        assert inc.X.nnz == rs.ItemIndex.desde_db(engine, top_k=5).X.nnz
+
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE compras")
+            conn.exec_driver_sql("DROP TABLE compras_cargas")
+        monkeypatch.setattr(rs, "_indice", None)
+
+# ==================== AGREGADOS (tendencias y popularidad) ====================
+
+def test_agregados_trending_y_cold_start(tmp_path, monkeypatch):
+    """
+    Cada carga deja las tablas resumen (diaria y popularidad); /trending y el cold-start
+    se calculan solo con ellas y las compras recientes pesan más que las viejas.
+    """
+    from sqlalchemy import create_engine
+    from app.recomendation.application import popularity_service as ps
+    from app.recomendation.application.etl.load_service import cargar_bloques
+
+    monkeypatch.setattr(ps, "_populares", None)
+    engine = create_engine(f"sqlite:///{tmp_path / 'agg.db'}")
+    filas = (
+        [("Ana", "Avena", "Granos", 1000.0, "2025-03-31")] * 3      # recientes
+        + [("Luis", "Arroz Roa", "Alimentos", 2000.0, "2025-01-01")] * 5  # más, pero viejas
+        + [("Eva", "Coca-Cola", "Bebidas", 3000.0, "2025-03-20")]
+    )
+    df = pd.DataFrame(filas, columns=["cliente", "producto", "categoria", "precio", "fecha_compra"])
+    df.insert(0, "id_compra", range(1, len(df) + 1))
+    cargar_bloques(iter([df]), engine)
+
+    diaria = pd.read_sql("SELECT * FROM compras_diarias ORDER BY fecha", engine)
+    assert diaria[["producto", "compras"]].values.tolist() == [["Arroz Roa", 5], ["Coca-Cola", 1], ["Avena", 3]]
+    assert diaria["ingresos"].tolist() == [10000.0, 3000.0, 3000.0]
+
+    pop = pd.read_sql("SELECT * FROM popularidad_productos", engine)
+    assert pop["producto"].tolist() == ["Avena", "Coca-Cola", "Arroz Roa"]  # el decaimiento castiga lo viejo
+
+    t = ps.trending(engine, window=30)
+    assert (t["desde"], t["hasta"]) == ("2025-03-02", "2025-03-31")
+    assert [p["producto"] for p in t["productos"]] == ["Avena", "Coca-Cola"]
+    assert [c["categoria"] for c in t["categorias"]] == ["Granos", "Bebidas"]
+    assert [p["producto"] for p in ps.trending(engine, categoria="Alimentos", window=365)["productos"]] == ["Arroz Roa"]
+
+    # cold-start: populares sin lo que el cliente ya compró
+    assert [p["producto"] for p in ps.populares(2, engine=engine)] == ["Avena", "Coca-Cola"]
+    assert [p["producto"] for p in ps.populares(2, excluir=["Avena"], engine=engine)] == ["Coca-Cola", "Arroz Roa"]
+
+
+
+def test_agregados_upsert_solo_recalcula_los_dias_tocados(tmp_path, monkeypatch):
+    """
+    Tras un upsert solo se recalculan los días de la carga (los de las filas nuevas y los que tenían
+    las filas reescritas); el resto de compras_diarias no se vuelve a calcular y el resultado
+    coincide con una reconstrucción completa.
+    """
+    from sqlalchemy import create_engine
+    from app.recomendation.application import popularity_service as ps
+    from app.recomendation.application.etl.extract_service import generar_compras
+    from app.recomendation.application.etl.load_service import cargar_bloques
+
+    monkeypatch.setattr(ps, "_populares", None)
+    engine = create_engine(f"sqlite:///{tmp_path / 'agg.db'}")
+    df = next(generar_compras(2000, seed=7))
+    cargar_bloques(iter([df]), engine)
+
+    # Marca en un día que el upsert no toca: si se reconstruyera todo, desaparecería
+    intacto = pd.read_sql("SELECT fecha, producto FROM compras_diarias ORDER BY fecha LIMIT 1", engine).iloc[0]
+    viejo = df[df["fecha_compra"].astype(str).str[:10] != str(intacto["fecha"])[:10]].head(3)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE compras_diarias SET compras = 999 WHERE fecha = ? AND producto = ?",
+                             (intacto["fecha"], intacto["producto"]))
+
+    movidas = viejo.assign(fecha_compra="2031-01-01")  # cambian de día: el día viejo también se recalcula
+    nuevas = df.head(2).assign(id_compra=[5000, 5001], fecha_compra="2031-01-02")
+    cargar_bloques(iter([movidas, nuevas]), engine, modo="upsert")
+
+    incremental = pd.read_sql("SELECT * FROM compras_diarias ORDER BY fecha, producto", engine)
+    marca = (incremental["fecha"] == intacto["fecha"]) & (incremental["producto"] == intacto["producto"])
+    assert incremental.loc[marca, "compras"].tolist() == [999]
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE compras_diarias SET compras = 0 WHERE compras = 999")
+    ps.actualizar_agregados(engine)  # reconstrucción completa
+    completo = pd.read_sql("SELECT * FROM compras_diarias ORDER BY fecha, producto", engine)
+    pd.testing.assert_frame_equal(incremental[~marca].reset_index(drop=True), completo[~marca.to_numpy()].reset_index(drop=True))
+    assert completo["compras"].sum() == 2002
+
+
+# ==================== POOL DE CONEXIONES ====================
+
+def test_pool_reutiliza_conexiones_y_mide_esperas(tmp_path):
+    """
+    El motor reutiliza conexiones calientes (una sola conexión física para muchas consultas)
+    y registra checkouts, esperas y timeouts.
+    """
+    import threading
+    import pytest
+    from sqlalchemy import text
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+    from app.recomendation.infrastructure.db_connection import crear_engine, estado_pool
+
+    engine = crear_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=0.2)
+    for _ in range(20):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    estado = estado_pool(engine)
+    assert estado["checkouts"] == 20 and estado["conexiones_nuevas"] == 1
+    assert estado["en_uso"] == 0 and estado["timeouts"] == 0
+
+    # pool lleno: el segundo pedido espera hasta que se libere la conexión
+    ocupada = engine.connect()
+    threading.Timer(0.05, ocupada.close).start()
+    with engine.connect():
+        pass
+    assert estado_pool(engine)["esperas"] == 1
+
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert estado_pool(engine)["timeouts"] == 1
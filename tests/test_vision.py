@@ -42,3 +42,128 @@ def test_detect_objects_no_file():
     """🚫 Caso borde: no se manda archivo"""
     response = client.post("/vision/detect", files={})
     assert response.status_code == 422  # FastAPI valida antes de entrar al endpoint
+
+
+def test_detect_objects_batch_success():
+    """📦 Lote: devuelve un resultado por imagen, en el mismo orden"""
+    with patch("app.vision.application.vision_service.VisionService.detect_objects_batch") as mock_service:
+        mock_service.return_value = [{"status": "ok", "n": 1}, {"status": "ok", "n": 2}]
+
+        response = client.post(
+            "/vision/detect/batch",
+            files=[
+                ("files", ("a.jpg", io.BytesIO(b"img a"), "image/jpeg")),
+                ("files", ("b.jpg", io.BytesIO(b"img b"), "image/jpeg")),
+            ]
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_images"] == 2
+        assert [r["filename"] for r in data["results"]] == ["a.jpg", "b.jpg"]
+        # Una sola llamada al servicio para todo el lote
+        assert mock_service.call_count == 1
+
+
+def test_batching_detector_agrupa_peticiones(tmp_path):
+    """🧺 Micro-batching: peticiones concurrentes comparten una sola inferencia"""
+    import threading
+    from app.vision.domain.vision_interface import DetectorInterface
+    from app.vision.infrastructure.batching_detector import BatchingDetector
+
+    class FakeDetector(DetectorInterface):
+        def __init__(self):
+            self.lotes = []
+
+        def detect(self, image_path):
+            return self.detect_batch([image_path])[0]
+
+        def detect_batch(self, image_paths):
+            self.lotes.append(list(image_paths))
+            return [[{"label": path}] for path in image_paths]
+
+    fake = FakeDetector()
+    detector = BatchingDetector(fake, max_batch_size=4, max_wait_ms=200)
+
+    paths = []
+    for i in range(4):
+        p = tmp_path / f"img_{i}.jpg"
+        p.write_bytes(b"x")
+        paths.append(str(p))
+
+    resultados = {}
+    hilos = [
+        threading.Thread(target=lambda p=p: resultados.__setitem__(p, detector.detect(p)))
+        for p in paths
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    # Cada petición recibe SU resultado…
+    assert all(resultados[p] == [{"label": p}] for p in paths)
+    # …y el detector se llamó con menos lotes que peticiones
+    assert len(fake.lotes) < len(paths)
+
+
+def test_image_sink_escrituras_desde_varios_hilos(tmp_path):
+    """Escrituras encoladas desde muchos hilos a la vez: flush() espera todas y ninguna se pierde."""
+    import threading
+    from app.vision.infrastructure.image_sink import ImageSink
+
+    sink = ImageSink()
+    hilos = [
+        threading.Thread(target=lambda i=i: [sink.write_bytes(bytes([i, j]), tmp_path / f"{i}_{j}.bin") for j in range(20)])
+        for i in range(8)
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    sink.flush()
+
+    assert len(list(tmp_path.glob("*.bin"))) == 160
+    assert (tmp_path / "7_19.bin").read_bytes() == bytes([7, 19])
+    assert ImageSink(enabled=False).write_bytes(b"x", tmp_path / "no.bin") is None
+
+
+def test_result_cache_memoria_disco_y_recorte(tmp_path):
+    """Aciertos en memoria y disco, clave distinta por versión del modelo y recorte por cantidad de archivos."""
+    from app.vision.application.result_cache import ResultCache
+
+    cache = ResultCache(tmp_path, max_memoria=1, max_disco=10)
+    imagen = b"\x89PNG radiografia"
+    clave = cache.clave(imagen, "xray:eager:aaa")
+    assert clave != cache.clave(imagen, "xray:eager:bbb")  # pesos nuevos → clave nueva
+
+    assert cache.get(clave) is None
+    cache.put(clave, {"prediction": "Normal", "confidence": 0.12})
+    cache.put(cache.clave(b"otra", "xray:eager:aaa"), {"prediction": "Pneumonia", "confidence": 0.9})
+    assert cache.get(clave) == {"prediction": "Normal", "confidence": 0.12}  # desde disco (memoria de 1)
+
+    otra = ResultCache(tmp_path, max_memoria=4, max_disco=10)  # ej. después de reiniciar
+    assert otra.get(clave)["prediction"] == "Normal"
+    for i in range(12):
+        otra.put(otra.clave(bytes([i]), "v"), {"i": i})
+    assert otra.estado()["en_disco"] <= 10 and otra.estado()["desalojados"] > 0
+
+    otra.limpiar()
+    assert otra.get(clave) is None and not list(tmp_path.glob("*.json"))
+
+
+def test_entrenamiento_terminado_invalida_cache(monkeypatch, tmp_path):
+    """Al terminar bien un reentrenamiento se vacía la caché y el servicio de neumonía se recarga."""
+    from app.vision.api import routes
+    from app.vision.application.result_cache import ResultCache
+
+    cache = ResultCache(tmp_path)
+    cache.put(cache.clave(b"img", "v1"), {"prediction": "Normal"})
+    monkeypatch.setattr(routes, "get_result_cache", lambda: cache)
+    monkeypatch.setattr(routes, "_pneumonia_service", object())
+
+    routes._on_training_finished({"status": "failed"})
+    assert cache.estado()["en_disco"] == 1 and routes._pneumonia_service is not None
+
+    routes._on_training_finished({"status": "completed"})
+    assert cache.estado()["en_disco"] == 0 and routes._pneumonia_service is None